@@ -0,0 +1,99 @@
+#computer players (no pygame)
+#how the Easy and Hard AI pick a shot and where they put the cue ball with
+#ball in hand, on any list of balls (the game's, or TableState.ball_views()
+#of a headless table), so the game and tools like the tournament runner
+#play the same opponents.
+import math
+import random
+
+from physics import black, ball_radius, POCKETS
+from free_space import FreeSpace
+
+
+def get_ai_shot(balls, difficulty, my_group, thinking=None):
+    # the hard AI takes the best shot its search (an ai_search.SearchJob)
+    # has scored so far, if it got to any
+    if difficulty == 'hard' and thinking is not None and thinking.best() is not None:
+        angle, power, _ = thinking.best()
+        return angle, power
+
+    cue_ball = balls[0]
+    
+    # Filter targets based on group
+    valid_targets = []
+    for b in balls[1:]:
+        if not b.alive: continue
+        
+        is_8ball = (b.color == black)
+        if is_8ball:
+            # Only target 8-ball if group is cleared (or if open table and no other choice? No, 8-ball is last)
+            # For simplicity, AI only targets 8-ball if it's the only thing left for them
+            # But we need to know if group is cleared.
+            # Let's count remaining balls for my_group
+            pass
+        else:
+            is_stripe = b.is_striped
+            if my_group == "solids" and not is_stripe:
+                valid_targets.append(b)
+            elif my_group == "stripes" and is_stripe:
+                valid_targets.append(b)
+            elif my_group is None: # Open table
+                valid_targets.append(b)
+    
+    # If no valid targets found (group cleared), target 8-ball
+    if not valid_targets:
+        for b in balls[1:]:
+            if b.alive and b.color == black:
+                valid_targets.append(b)
+                break
+    
+    if not valid_targets:
+        return 0, 0
+
+    target = random.choice(valid_targets)
+    dx = target.x - cue_ball.x
+    dy = target.y - cue_ball.y
+    angle = math.atan2(dy, dx)
+    
+    if difficulty == 'easy':
+        angle += random.uniform(-0.3, 0.3) # Significant error
+        power = random.uniform(30, 70)
+    else: # Hard
+        # Try to find a pocket for this target
+        best_pocket = None
+        min_dist = float('inf')
+        for pocket in POCKETS:
+            d = math.hypot(target.x - pocket[0], target.y - pocket[1])
+            if d < min_dist:
+                min_dist = d
+                best_pocket = pocket
+        
+        if best_pocket:
+            # Calculate ghost ball position
+            px, py = best_pocket
+            dx_tp = px - target.x
+            dy_tp = py - target.y
+            angle_tp = math.atan2(dy_tp, dx_tp)
+            
+            aim_x = target.x - math.cos(angle_tp) * (ball_radius * 2)
+            aim_y = target.y - math.sin(angle_tp) * (ball_radius * 2)
+            
+            dx_ca = aim_x - cue_ball.x
+            dy_ca = aim_y - cue_ball.y
+            angle = math.atan2(dy_ca, dx_ca)
+            power = random.uniform(70, 100)
+        else:
+            power = random.uniform(50, 90)
+
+    return angle, power
+
+def ai_place_ball(balls, table, difficulty="easy", my_group=None):
+    # Easy drops the cue ball on any free spot, Hard on the one that opens up
+    # the best shots
+    space = FreeSpace(table)
+    spot = space.best(my_group) if difficulty == 'hard' else space.sample()
+    if spot is None:
+        return # no room anywhere, leave it where it is
+    balls[0].x, balls[0].y = spot
+    balls[0].vx = 0
+    balls[0].vy = 0
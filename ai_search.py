@@ -0,0 +1,454 @@
+#hard AI shot search
+#every (target ball, pocket, power) candidate is played out headlessly,
+#a chunk at a time with batch_sim, and scored on what it pots, whether it fouls and where the cue
+#ball is left. The candidates are spread over a pool of worker processes
+#(or one background thread) that is started once and kept warm between
+#turns, and the search stops at a time limit with the best shot found so far.
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+import numpy as np
+
+from physics import (
+    ball_radius, black, cue_power_multiplier,
+    left_bound, right_bound, top_bound, BOTTOM_BOUND, POCKETS,
+)
+import shot_cache
+from batch_sim import simulate_shots
+from occlusion import OcclusionIndex
+from bank_shots import RAILS, bank_shots, kick_shots
+from combo_shots import TOP_N, combo_shots
+from leave_map import leave_map
+from rules import resolve_turn
+
+POWER_LEVELS = (45, 70, 95)  #AI shot powers tried for every target/pocket
+MAX_CUT = math.radians(80)  #thinner cuts than this are not tried
+
+#scoring
+POT_SCORE = 100  #each of our balls potted
+OPPONENT_POT_SCORE = -30  #each of theirs
+FOUL_SCORE = -150  #cue ball potted, or the first ball hit isn't ours
+LEAVE_SCORE = 40  #cue ball left with a sure next pot (see leave_map.py), less for harder ones
+WIN_SCORE = 10000  #8-ball potted when it's our last ball
+LOSS_SCORE = -10000  #8-ball potted any other way
+
+
+def ball_group(table, i):
+    if table.colors[i] == black:
+        return "8ball"
+    return "stripes" if table.is_striped[i] else "solids"
+
+
+def own_balls(table, group):
+    #live object balls that count for group (any but the 8-ball on an open
+    #table), the 8-ball once they are all gone
+    live = np.nonzero(table.alive & ~table.is_cue)[0].tolist()
+    balls = [i for i in live if ball_group(table, i) != "8ball"
+             and (group is None or ball_group(table, i) == group)]
+    if not balls:
+        balls = [i for i in live if ball_group(table, i) == "8ball"]
+    return balls
+
+
+_pockets = np.array(POCKETS, dtype=float)
+
+
+def ghost_table(table, targets):
+    """
+    Ghost-ball geometry for every ball in targets against every pocket in one
+    pass. Each entry is a (len(targets), len(POCKETS)) array:
+        ghost_x, ghost_y    where the cue ball has to be at contact to send
+                            the target straight at the pocket
+        angle               cue ball aim angle onto the ghost ball
+        cut                 angle between the aim and the target's path, 0 is
+                            straight in, pi / 2 and up can't be made
+        cue_distance        cue ball to ghost ball
+        pocket_distance     target to pocket
+        difficulty          cue_distance * pocket_distance / cos(cut), the
+                            usual rule of thumb (lower is easier), inf for
+                            impossible cuts or a ghost ball off the table
+    """
+    cue = int(np.nonzero(table.is_cue)[0][0])
+    targets = np.asarray(targets, dtype=np.int64)
+    x = table.x[targets][:, None]
+    y = table.y[targets][:, None]
+
+    to_pocket_x = _pockets[:, 0] - x
+    to_pocket_y = _pockets[:, 1] - y
+    pocket_distance = np.hypot(to_pocket_x, to_pocket_y)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        ux = to_pocket_x / pocket_distance
+        uy = to_pocket_y / pocket_distance
+    ghost_x = x - ux * (ball_radius * 2)
+    ghost_y = y - uy * (ball_radius * 2)
+
+    aim_x = ghost_x - table.x[cue]
+    aim_y = ghost_y - table.y[cue]
+    cue_distance = np.hypot(aim_x, aim_y)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        cos_cut = np.clip((aim_x * ux + aim_y * uy) / cue_distance, -1, 1)
+    cut = np.arccos(cos_cut)
+
+    on_table = ((ghost_x >= left_bound + ball_radius) & (ghost_x <= right_bound - ball_radius)
+                & (ghost_y >= top_bound + ball_radius) & (ghost_y <= BOTTOM_BOUND - ball_radius))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        difficulty = cue_distance * pocket_distance / cos_cut
+    difficulty = np.where((cos_cut > 0) & on_table, difficulty, np.inf)
+
+    return {
+        "targets": targets,
+        "ghost_x": ghost_x,
+        "ghost_y": ghost_y,
+        "angle": np.arctan2(aim_y, aim_x),
+        "cut": cut,
+        "cue_distance": cue_distance,
+        "pocket_distance": pocket_distance,
+        "difficulty": difficulty,
+    }
+
+
+def ranked_shots(table, group, rails=RAILS, combos=TOP_N):
+    """
+    [(blocked, difficulty, angle)] for every ghost-ball pot (see
+    ghost_table()) group can try, clear ones first and easiest first within
+    each. blocked means a ball is in the way of the cue ball or of the
+    target's path to the pocket. The easiest combos clear of other balls
+    (up to combos of them, see combo_shots.py) are ranked in with the clear
+    pots. With rails, clear bank and kick shots off up to that many
+    cushions (see bank_shots.py) are as well; they are only worked out
+    where no direct shot is clear.
+    """
+    targets = own_balls(table, group)
+    if not targets:
+        return []
+    ghosts = ghost_table(table, targets)
+    on_table = np.isfinite(ghosts["difficulty"])
+    usable = (ghosts["cut"] <= MAX_CUT) & on_table
+    sight = OcclusionIndex(table)
+    shots = []
+    kicks = []  #(target, pocket, ghost x, ghost y) the cue ball can't get at directly
+    for row, pocket in zip(*np.nonzero(on_table if rails else usable)):
+        target = int(ghosts["targets"][row])
+        ghost_x, ghost_y = ghosts["ghost_x"][row, pocket].item(), ghosts["ghost_y"][row, pocket].item()
+        cue_clear = sight.cue_path_clear(ghost_x, ghost_y, (target,))
+        pocket_clear = (cue_clear or rails) and sight.pocket_path_clear(pocket, table.x[target], table.y[target], (target,))
+        if usable[row, pocket]:
+            shots.append((not (cue_clear and pocket_clear), ghosts["difficulty"][row, pocket].item(),
+                           ghosts["angle"][row, pocket].item()))
+        if pocket_clear and not (cue_clear and usable[row, pocket]):
+            kicks.append((target, int(pocket), ghost_x, ghost_y))
+    if combos:
+        shots += [(False, difficulty, angle) for difficulty, angle in combo_shots(table, targets, sight, top_n=combos)]
+    if rails and not any(not blocked for blocked, _, _ in shots):
+        shots += [(False, difficulty, angle) for difficulty, angle in
+                  bank_shots(table, targets, sight, MAX_CUT, rails) + kick_shots(table, kicks, sight, MAX_CUT, rails)]
+    shots.sort(key=lambda shot: shot[:2])
+    return shots
+
+
+def candidate_shots(table, group, power_levels=POWER_LEVELS):
+    """
+    (angle, power) pairs for every ranked_shots() pot at every power, in
+    the same order, so a search that runs out of time has looked at the
+    likeliest pots.
+    """
+    return [(angle, power) for _, _, angle in ranked_shots(table, group) for power in power_levels]
+
+
+def score_outcome(table, outcome, group):
+    """
+    How good a shot's outcome (see ShotCache.resolve()) is for the player
+    on group (None for an open table), played from table.
+    """
+    potted = outcome["potted"]
+    own = own_balls(table, group)
+    on_eight = ball_group(table, own[0]) == "8ball" if own else True
+
+    if "8ball" in potted:
+        if on_eight and "cue" not in potted:
+            return WIN_SCORE
+        return LOSS_SCORE
+
+    score = 0
+    labels = {"solid": "solids", "stripe": "stripes"}
+    for label in potted:
+        if label in labels:
+            if group is None or labels[label] == group:
+                score += POT_SCORE
+            else:
+                score += OPPONENT_POT_SCORE
+
+    first_hit = outcome["collision_info"]["first_hit"]
+    wanted = "8ball" if on_eight else group
+    foul = "cue" in potted or first_hit is None or (wanted is not None and first_hit != wanted)
+    if foul:
+        return score + FOUL_SCORE
+
+    # still at the table: where the cue ball ends up matters
+    if score > 0:
+        final = outcome["table"]
+        leave = leave_map(table, own_balls(table, group), MAX_CUT)
+        score += LEAVE_SCORE * leave.value_after(final, own_balls(final, group))
+    return score
+
+
+def next_group(table, outcome, group):
+    """
+    (turn continues, group afterwards) for the player on group after a
+    shot, straight from rules.resolve_turn() so the lookahead follows the
+    game's rules (played as player 1, the seat doesn't matter).
+    """
+    turn = resolve_turn(outcome["potted"], 1, group, outcome["table"].ball_views())
+    return turn["player_turn"] == 1 and turn["winner"] is None, turn["p1_group"]
+
+
+def evaluate(table, group, shots, keep_tables=False):
+    """
+    [(score, turn continues, group afterwards, final table)] for each
+    (angle, power) in shots, runs in the worker processes. The shots not in
+    shot_cache.outcomes are played out together with simulate_shots() (the
+    same steps as resolve_shot()) and cached. The final table is only sent
+    back with keep_tables (for the lookahead).
+    """
+    cue = int(np.nonzero(table.is_cue)[0][0])
+    cache = shot_cache.outcomes
+    speeds = [power * cue_power_multiplier for _, power in shots]
+    velocities = [(math.cos(angle) * speed, math.sin(angle) * speed) for (angle, _), speed in zip(shots, speeds)]
+    keys = [cache.key(table, vx, vy, cue_index=cue) for vx, vy in velocities]
+    outcomes = [cache.get(key) for key in keys]
+    missing = [k for k, outcome in enumerate(outcomes) if outcome is None]
+    if missing:
+        batch = simulate_shots(table, [velocities[k] for k in missing])
+        for row, k in enumerate(missing):
+            outcomes[k] = {"table": batch.table(row), "potted": batch.potted[row],
+                           "collision_info": batch.collision_info[row]}
+            cache.put(keys[k], outcomes[k])
+
+    results = []
+    for outcome in outcomes:
+        continues, group_after = next_group(table, outcome, group)
+        results.append((score_outcome(table, outcome, group), continues, group_after,
+                        outcome["table"] if keep_tables else None))
+    return results
+
+
+def _warm_up():
+    #first job of every worker, pays for imports and numpy setup up front
+    return os.getpid()
+
+
+class ShotSearch:
+    """
+    Scores candidate_shots() in parallel, either returning the best one
+    found within a time limit (best_shot()) or in the background (begin()).
+    workers=None uses every core, 0 searches on a background thread of this
+    process (background=False: only when the caller asks, see
+    SearchJob.step()). Workers are started the platform's default way
+    (spawn on Windows and macOS), which is fine since importing the game
+    opens no window.
+    With depth > 1 the search looks ahead: from the beam best tables left
+    by shots that keep the turn, the width easiest pots (at every power)
+    are played out as well, and a first shot is worth its own score plus
+    the best follow-up it leaves.
+    With a book (break_book.BreakBook) the break is looked up there instead
+    and that one shot is all the search plays out.
+    """
+    def __init__(self, workers=None, time_limit=0.5, chunk_size=6, depth=1, beam=4, width=3, book=None,
+                 background=True):
+        self.workers = os.cpu_count() if workers is None else workers
+        self.background = background
+        self.time_limit = time_limit
+        self.chunk_size = chunk_size
+        self.depth = depth
+        self.beam = beam
+        self.width = width
+        self.book = book
+        self._executor = None
+        self._job = None  #latest background search
+
+    def start(self):
+        #bring the workers (or the thread) up now instead of on the first turn
+        if self._executor is not None:
+            return
+        if self.workers:
+            self._executor = ProcessPoolExecutor(self.workers)
+            for _ in range(self.workers):
+                self._executor.submit(_warm_up)
+        elif self.background:
+            self._executor = ThreadPoolExecutor(1)
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def begin(self, table, group):
+        """
+        Start searching in the background and return the SearchJob, or None
+        if there is nothing to aim at. Nothing here waits on the search. The
+        previous search is cancelled so it can't hold up the workers.
+        """
+        if self._job is not None:
+            self._job.cancel()
+            self._job = None
+        opening = self.book.lookup(table) if self.book is not None else None
+        shots = [opening] if opening is not None else candidate_shots(table, group)
+        if not shots:
+            return None
+        self.start()
+        self._job = SearchJob(self._executor, table, group, shots,
+                              self.chunk_size, self.depth, self.beam, self.width)
+        return self._job
+
+    def best_shot(self, table, group, time_limit=None):
+        """
+        (angle, power, score) of the best scoring candidate for group, or None
+        if there is nothing to aim at. Candidates not scored when the time
+        limit runs out are skipped.
+        """
+        job = self.begin(table, group)
+        if job is None:
+            return None
+        deadline = time.perf_counter() + (self.time_limit if time_limit is None else time_limit)
+        while not job.done():
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0 and job.best() is not None:
+                break
+            job.wait(max(remaining, 0.01))
+        job.cancel()
+        return job.best()
+
+
+class SearchJob:
+    """
+    A search in progress (see ShotSearch.begin()). Results come in as the
+    executor (workers or a thread) finishes them, or one chunk per step()
+    without one, and best() is always the best first shot scored so far - an anytime
+    search that can be stopped whenever its answer is needed.
+    The search is a tree of shots: each node is one played out shot
+    {"shot", "score", "total" (score of the whole sequence), "continues",
+     "group", "table", "children", "depth"}. Tables that come up again
+    (same table_key() and group) share one list of children, so they are
+    only expanded once.
+    """
+    def __init__(self, executor, table, group, shots, chunk_size, depth=1, beam=4, width=3):
+        self.table = table.copy()
+        self.group = group
+        self.version = table.version  #table it was started on
+        self.depth = depth
+        self.beam = beam
+        self.width = width
+        self.scored = 0
+        self._executor = executor
+        self._chunk_size = chunk_size
+        self._roots = []
+        self._seen = {}  #(table_key, group) -> children list
+        self._level = 1  #depth being played out
+        self._waiting = 0  #shots of this level not scored yet
+        self._futures = {}  #future -> (parent node, shots)
+        self._queue = []  #(parent node, shots) chunks still to do in this process
+        self._submit(None, self.table, group, shots)
+
+    def _submit(self, parent, table, group, shots):
+        self._waiting += len(shots)
+        keep = self._level < self.depth
+        for k in range(0, len(shots), self._chunk_size):
+            chunk = shots[k:k + self._chunk_size]
+            if self._executor is None:
+                self._queue.append((parent, chunk))
+            else:
+                future = self._executor.submit(evaluate, table, group, chunk, keep)
+                self._futures[future] = (parent, chunk)
+
+    def _add(self, parent, shots, results):
+        for shot, (score, continues, group, final) in zip(shots, results):
+            self.scored += 1
+            self._waiting -= 1
+            node = {"shot": shot, "score": score, "continues": continues, "group": group,
+                    "table": final, "children": [], "depth": self._level,
+                    "total": score + (parent["total"] if parent is not None else 0)}
+            if continues and final is not None:
+                key = (shot_cache.table_key(final), group)
+                if key in self._seen:
+                    node["children"] = self._seen[key]
+                    node["continues"] = False  # expanded (or not) where it came up first
+                else:
+                    self._seen[key] = node["children"]
+            if parent is None:
+                self._roots.append(node)
+            else:
+                parent["children"].append(node)
+
+    def _next_level(self):
+        #once a level is done, play out the follow-ups from its best nodes
+        while self._waiting == 0 and self._level < self.depth:
+            level = [node for node in self._nodes() if node["depth"] == self._level and node["continues"]]
+            level.sort(key=lambda node: node["total"], reverse=True)
+            self._level += 1
+            for node in level[:self.beam]:
+                shots = [(angle, power) for _, _, angle in ranked_shots(node["table"], node["group"])[:self.width]
+                         for power in POWER_LEVELS]
+                if shots:
+                    self._submit(node, node["table"], node["group"], shots)
+
+    def _nodes(self):
+        stack = list(self._roots)
+        while stack:
+            node = stack.pop()
+            yield node
+            if node["continues"]:
+                stack.extend(node["children"])
+
+    def poll(self):
+        #take in whatever the executor has finished, never scores a shot
+        #itself so it is cheap enough for every frame
+        for future in [future for future in self._futures if future.done()]:
+            parent, chunk = self._futures.pop(future)
+            if not future.cancelled():
+                self._add(parent, chunk, future.result())
+        self._next_level()
+
+    def step(self):
+        #without an executor: score the next chunk here (blocking), so a
+        #headless caller decides exactly how many get scored
+        if self._queue:
+            parent, chunk = self._queue.pop(0)
+            table = self.table if parent is None else parent["table"]
+            group = self.group if parent is None else parent["group"]
+            self._add(parent, chunk, evaluate(table, group, chunk, self._level < self.depth))
+        self._next_level()
+
+    def wait(self, timeout):
+        #block until something new is scored (or timeout), then poll()
+        if self._futures:
+            wait(self._futures, timeout=timeout, return_when=FIRST_COMPLETED)
+        else:
+            self.step()
+        self.poll()
+
+    def done(self):
+        return not self._futures and not self._queue
+
+    def _value(self, node):
+        #score of the node's shot plus the best follow-up found after it.
+        #Keeping the turn is never worse than ending it (0): the player can
+        #always play safe instead of the follow-ups that were explored
+        follow_ups = [self._value(child) for child in node["children"]]
+        return node["score"] + max([0] + follow_ups)
+
+    def best(self):
+        #(angle, power, value) of the best first shot so far
+        if not self._roots:
+            return None
+        node = max(self._roots, key=self._value)
+        angle, power = node["shot"]
+        return angle, power, self._value(node)
+
+    def cancel(self):
+        #drop what hasn't started, chunks already running just finish unseen
+        for future in self._futures:
+            future.cancel()
+        self._futures = {}
+        self._queue = []
@@ -0,0 +1,182 @@
+#bank and kick shots in closed form
+#a ball coming off a cushion carries on as if it had gone straight into a
+#mirror image of the table, so reflecting a point across the cushion lines
+#gives something to aim straight at: an object ball sent at a pocket's image
+#banks into the pocket (bank shot), a cue ball sent at a ghost ball's image
+#comes off the cushions onto it (kick shot). The images for up to RAILS
+#cushions are worked out for every pocket and ghost ball, each is checked to
+#really play out that way (physics.cushion_path(), no pocket on the way) and to
+#have every leg clear (OcclusionIndex), and what is left goes to the AI as
+#extra candidates for its simulated search, instead of sweeping angles.
+import math
+from functools import lru_cache
+
+from physics import (
+    ball_radius, left_bound, right_bound, top_bound, BOTTOM_BOUND,
+    pocket_radius, POCKETS, cushion_path,
+)
+
+RAILS = 2  #most cushions a bank or kick shot may come off
+RAIL_PENALTY = 2.5  #difficulty multiplier per cushion, banks are less sure than direct pots
+MIN_LEG = ball_radius * 2  #shortest leg between cushions (a ball pinned to a cushion doesn't bank cleanly)
+
+#lines a ball centre reflects off, as (axis, position): left, right, top, bottom
+CUSHIONS = (
+    (0, left_bound + ball_radius),
+    (0, right_bound - ball_radius),
+    (1, top_bound + ball_radius),
+    (1, BOTTOM_BOUND - ball_radius),
+)
+
+
+def rail_orders(rails=RAILS):
+    #every order of 1 to rails cushions (indices into CUSHIONS), never the
+    #same one twice in a row
+    orders, level = [], [()]
+    for _ in range(rails):
+        level = [order + (c,) for order in level for c in range(len(CUSHIONS)) if not order or order[-1] != c]
+        orders.extend(level)
+    return orders
+
+
+def mirror(x, y, order):
+    #image of (x, y) for a ball that comes off the cushions in order
+    for c in reversed(order):
+        axis, line = CUSHIONS[c]
+        if axis == 0:
+            x = 2 * line - x
+        else:
+            y = 2 * line - y
+    return x, y
+
+
+def rail_path(x, y, image_x, image_y, rails):
+    """
+    Points (start, each cushion, end) of a ball centre rolling from (x, y)
+    at the image, if it comes off rails cushions without running into a
+    pocket first and every leg up to the last cushion is at least MIN_LEG,
+    else None. The last point is the image folded back onto
+    the table, or where the last leg reaches a pocket.
+    """
+    length = math.hypot(image_x - x, image_y - y)
+    points = cushion_path(x, y, math.atan2(image_y - y, image_x - x), length, rails + 1)
+    if len(points) != rails + 2:
+        return None
+    if any(math.hypot(x1 - x0, y1 - y0) < MIN_LEG for (x0, y0), (x1, y1) in zip(points, points[1:-1])):
+        return None
+    return points
+
+
+def _pocket_near(x, y):
+    #index of the pocket (x, y) is over, or None
+    for k, (px, py) in enumerate(POCKETS):
+        if math.hypot(x - px, y - py) <= pocket_radius + 1e-6:
+            return k
+    return None
+
+
+@lru_cache(maxsize=512)
+def bank_paths(x, y, rails=RAILS):
+    """
+    ((pocket, points), ...) for every way an object ball at (x, y) can bank
+    into a pocket off 1 to rails cushions, ignoring the other balls. Only
+    depends on where the ball is, so it is cached per position.
+    """
+    paths, seen = [], set()
+    for order in rail_orders(rails):
+        for pocket, (px, py) in enumerate(POCKETS):
+            points = rail_path(x, y, *mirror(px, py, order), len(order))
+            if points is None or _pocket_near(*points[-1]) != pocket:
+                continue
+            # cushions on different axes can come in either order, same path
+            key = (round(points[1][0], 6), round(points[1][1], 6))
+            if key not in seen:
+                seen.add(key)
+                paths.append((pocket, tuple(points)))
+    return tuple(paths)
+
+
+def _cos_cut(ax, ay, bx, by):
+    #cosine of the angle between two directions
+    return (ax * bx + ay * by) / (math.hypot(ax, ay) * math.hypot(bx, by))
+
+
+def _legs_clear(sight, points, ignore):
+    return all(sight.segment_clear(x0, y0, x1, y1, ignore)
+               for (x0, y0), (x1, y1) in zip(points, points[1:]))
+
+
+def _on_table(x, y):
+    return (CUSHIONS[0][1] <= x <= CUSHIONS[1][1]) and (CUSHIONS[2][1] <= y <= CUSHIONS[3][1])
+
+
+def bank_shots(table, targets, sight, max_cut, rails=RAILS):
+    """
+    [(difficulty, angle)] of the clear bank shots on targets: the cue ball
+    straight onto the ghost ball, the target off the cushions into a pocket.
+    sight is an OcclusionIndex of table. Difficulty is on the same scale as
+    ai_search.ghost_table() (cue distance * distance the target travels /
+    cos(cut)), times RAIL_PENALTY per cushion.
+    """
+    cue = sight.cue
+    cue_x, cue_y = table.x[cue].item(), table.y[cue].item()
+    shots = []
+    for target in targets:
+        tx, ty = table.x[target].item(), table.y[target].item()
+        for pocket, points in bank_paths(tx, ty, rails):
+            bx, by = points[1]
+            leg = math.hypot(bx - tx, by - ty)
+            dir_x, dir_y = (bx - tx) / leg, (by - ty) / leg
+            ghost_x, ghost_y = tx - dir_x * ball_radius * 2, ty - dir_y * ball_radius * 2
+            aim_x, aim_y = ghost_x - cue_x, ghost_y - cue_y
+            if not _on_table(ghost_x, ghost_y) or math.hypot(aim_x, aim_y) == 0:
+                continue
+            cos_cut = _cos_cut(aim_x, aim_y, dir_x, dir_y)
+            if cos_cut < math.cos(max_cut):
+                continue
+            if not (sight.cue_path_clear(ghost_x, ghost_y, (target,))
+                    and _legs_clear(sight, points[:-1], (target,))
+                    and sight.pocket_path_clear(pocket, *points[-2], (target,))):
+                continue
+            travel = sum(math.hypot(x1 - x0, y1 - y0) for (x0, y0), (x1, y1) in zip(points, points[1:]))
+            difficulty = math.hypot(aim_x, aim_y) * travel / cos_cut * RAIL_PENALTY ** (len(points) - 2)
+            shots.append((difficulty, math.atan2(aim_y, aim_x)))
+    return shots
+
+
+def kick_shots(table, ghosts, sight, max_cut, rails=RAILS):
+    """
+    [(difficulty, angle)] of the clear kick shots onto ghosts, a list of
+    (target, pocket, ghost x, ghost y) pots whose target has a clear way to
+    the pocket: the cue ball comes off 1 to rails cushions onto the ghost
+    ball. Difficulty as in bank_shots(), with the cue ball's whole path.
+    """
+    cue = sight.cue
+    cue_x, cue_y = table.x[cue].item(), table.y[cue].item()
+    shots = []
+    for target, pocket, ghost_x, ghost_y in ghosts:
+        tx, ty = table.x[target].item(), table.y[target].item()
+        px, py = POCKETS[pocket]
+        seen = set()
+        for order in rail_orders(rails):
+            image_x, image_y = mirror(ghost_x, ghost_y, order)
+            points = rail_path(cue_x, cue_y, image_x, image_y, len(order))
+            # a pocket on the way cuts the path short of the ghost ball
+            if points is None or math.hypot(points[-1][0] - ghost_x, points[-1][1] - ghost_y) > 1:
+                continue
+            key = (round(points[1][0], 6), round(points[1][1], 6))
+            if key in seen:
+                continue
+            seen.add(key)
+            (x0, y0), (x1, y1) = points[-2], points[-1]
+            cos_cut = _cos_cut(x1 - x0, y1 - y0, px - tx, py - ty)
+            if cos_cut < math.cos(max_cut):
+                continue
+            if not (sight.cue_path_clear(*points[1])
+                    and _legs_clear(sight, points[1:-1], ())
+                    and sight.segment_clear(x0, y0, x1, y1, (target,))):
+                continue
+            travel = math.hypot(image_x - cue_x, image_y - cue_y)
+            difficulty = travel * math.hypot(px - tx, py - ty) / cos_cut * RAIL_PENALTY ** len(order)
+            shots.append((difficulty, math.atan2(image_y - cue_y, image_x - cue_x)))
+    return shots
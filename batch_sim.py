@@ -0,0 +1,490 @@
+#batched multi-table simulator
+#holds many copies of the same table as [tables, balls] arrays and steps them
+#all in lockstep, so the AI, calibration and analytics can try thousands of
+#candidate shots from one position at numpy speed instead of looping the
+#scalar code once per shot. Each tick is SUBSTEPS steps of the same collide
+#/ pocket / step as TableState.advance() in run_game (and check_collisions(),
+#check_pockets(), Ball.move()), and a table drops out of the batch as soon as
+#all of its balls have stopped
+#measured with python batch_sim.py (1000 random shots off the settled rack):
+#about 250-270 shots/s against 10-11 for the scalar loop, so ~25x and not
+#the 100x hoped for. Around 40% of the time goes to the crowded fallback in
+#_collide(): pairs in a crowded spot must be resolved in scalar loop order,
+#so each one is its own wave of small numpy calls (about 40 waves per
+#collide with the rack still together), a per-step Python overhead that
+#more tables don't spread out. _near_pairs() and _step() take ~13% and ~12%
+import math
+import time
+
+import numpy as np
+
+from physics import (
+    black, ball_radius, friction, min_speed, rolled_distance, SUBSTEPS,
+    left_bound, right_bound, top_bound, BOTTOM_BOUND,
+    pocket_radius, POCKETS,
+)
+from table_state import TableState, normals
+
+_pockets = np.array(POCKETS, dtype=float)
+
+
+class TableBatch:
+    def __init__(self, tables, count, substeps=SUBSTEPS):
+        self.substeps = substeps  #physics steps per tick, like FixedTimestep
+        self.dt = 1 / substeps
+        self.x = np.zeros((tables, count))   #ball X positions
+        self.y = np.zeros((tables, count))   #ball Y positions
+        self.vx = np.zeros((tables, count))  #velocities in X direction
+        self.vy = np.zeros((tables, count))  #velocities in Y direction
+        self.alive = np.ones((tables, count), dtype=bool)
+        self.is_cue = np.zeros(count, dtype=bool)  #same balls on every table
+        self.is_striped = np.zeros(count, dtype=bool)
+        self.colors = [None] * count
+        self.awake = np.ones((tables, count), dtype=bool)  #see TableState
+        self._rest_x = np.zeros((tables, count))
+        self._rest_y = np.zeros((tables, count))
+        self.running = np.ones(tables, dtype=bool)  #not all stopped yet
+        self.ticks = np.zeros(tables, dtype=np.int64)  #ticks each table ran
+        self._steps = np.zeros(tables, dtype=np.int64)  #physics steps each table ran
+        self.potted = [[] for _ in range(tables)]  #check_pockets() labels
+        self.collision_info = [{"first_hit": None, "hit_pos": None, "hit_ball_index": None}
+                               for _ in range(tables)]
+        self._clearance = np.zeros(tables)  #gap no contact can close yet
+
+    def __len__(self):
+        return len(self.x)
+
+    @classmethod
+    def from_table(cls, table, tables, substeps=SUBSTEPS):
+        #tables copies of a TableState
+        batch = cls(tables, len(table), substeps)
+        batch.x[:] = table.x
+        batch.y[:] = table.y
+        batch.vx[:] = table.vx
+        batch.vy[:] = table.vy
+        batch.alive[:] = table.alive
+        batch.is_cue[:] = table.is_cue
+        batch.is_striped[:] = table.is_striped
+        batch.colors = list(table.colors)
+        batch.awake[:] = table.awake
+        batch._rest_x[:] = table._rest_x
+        batch._rest_y[:] = table._rest_y
+        return batch
+
+    @classmethod
+    def from_balls(cls, balls, tables, substeps=SUBSTEPS):
+        return cls.from_table(TableState.from_balls(balls), tables, substeps)
+
+    def wake(self, balls=None):
+        """
+        Mark balls (all of them by default) awake on every table. Anything
+        that writes the arrays directly (e.g. to strike the cue ball) has to
+        call this, like TableState.wake().
+        """
+        if balls is None:
+            self.awake[:] = True
+        else:
+            self.awake[:, balls] = True
+        self._clearance[:] = 0
+
+    def table(self, index):
+        #one table of the batch as a TableState
+        table = TableState(self.x.shape[1])
+        table.x[:] = self.x[index]
+        table.y[:] = self.y[index]
+        table.vx[:] = self.vx[index]
+        table.vy[:] = self.vy[index]
+        table.alive[:] = self.alive[index]
+        table.is_cue[:] = self.is_cue
+        table.is_striped[:] = self.is_striped
+        table.colors = list(self.colors)
+        table.awake[:] = self.awake[index]
+        table._rest_x[:] = self._rest_x[index]
+        table._rest_y[:] = self._rest_y[index]
+        table._count_moving()
+        return table
+
+    def run(self, cue_ball_in_hand=False, max_ticks=20000):
+        #step until every table has stopped (or max_ticks). The running
+        #tables are pulled out into their own arrays once and only written
+        #back when they stop, instead of on every step
+        tables = np.nonzero(self.running)[0]
+        work = self._gather(tables)
+        while len(tables) and self._steps[tables].max() < max_ticks * self.substeps:
+            moving = self._step(tables, work, cue_ball_in_hand)
+            done = ~moving.any(axis=1)
+            if done.any():
+                self._scatter(tables[done], [array[done] for array in work])
+                self.running[tables[done]] = False
+                tables = tables[~done]
+                work = [array[~done] for array in work]
+        self._scatter(tables, work)
+        self.running[:] = False
+
+    def tick(self, cue_ball_in_hand=False):
+        """
+        One tick on every running table, substeps steps in the same order
+        as run_game: collisions, pockets, then movement. A table stops at
+        the step its balls do. A potted cue ball is left off the table at
+        (-1000, -1000) and out of play (like TableState.pocket()).
+        """
+        for _ in range(self.substeps):
+            tables = np.nonzero(self.running)[0]
+            if len(tables) == 0:
+                return
+            work = self._gather(tables)
+            moving = self._step(tables, work, cue_ball_in_hand)
+            self._scatter(tables, work)
+
+            # tables with every ball stopped are done
+            self.running[tables[~moving.any(axis=1)]] = False
+
+    def _gather(self, tables):
+        return [self.x[tables], self.y[tables], self.vx[tables], self.vy[tables],
+                self.alive[tables], self.awake[tables], self._rest_x[tables], self._rest_y[tables],
+                self._clearance[tables]]
+
+    def _scatter(self, tables, work):
+        (self.x[tables], self.y[tables], self.vx[tables], self.vy[tables],
+         self.alive[tables], self.awake[tables], self._rest_x[tables], self._rest_y[tables],
+         self._clearance[tables]) = work
+
+    def _step(self, tables, work, cue_ball_in_hand):
+        #one physics step on the gathered arrays of tables (in place),
+        #returns which live balls are still moving
+        x, y, vx, vy, alive, awake, rest_x, rest_y, clearance = work
+
+        # a table whose closest pair (with an awake ball) was further apart
+        # than its balls have moved since can't have a contact, skip it
+        check = clearance <= 1e-6
+        if check.any():
+            found = self._collide(tables, x, y, vx, vy, alive, awake, cue_ball_in_hand, check)
+            clearance[check] = found[check]
+        if not cue_ball_in_hand:
+            self._pocket(tables, x, y, vx, vy, alive, awake)
+        start_x, start_y = x.copy(), y.copy()
+        moving = _step(x, y, vx, vy, alive, awake, rest_x, rest_y, self.dt)
+        moved = np.where(alive, np.hypot(x - start_x, y - start_y), 0)
+        clearance -= 2 * moved.max(axis=1)
+        self._steps[tables] += 1
+        self.ticks[tables] = -(-self._steps[tables] // self.substeps)
+        return moving
+
+    def _collide(self, tables, x, y, vx, vy, alive, awake, cue_ball_in_hand, check):
+        """
+        TableState.collide() for the tables (rows) in check. The tables are
+        treated as one long table (ball k of table t is t * count + k) whose
+        pairs never cross tables: isolated touching pairs go in bulk, crowded
+        spots are resolved in scalar loop order inside each table but one
+        pair per table at a time across tables.
+        Returns how far apart the closest pair with an awake ball is in each
+        table (0 if anything touched).
+        """
+        count = x.shape[1]
+        candidates = alive.copy()
+        if cue_ball_in_hand:
+            candidates[:, 0] = False
+        clearance = np.full(len(x), ball_radius * 2.0)  #nothing within reach
+
+        # pairs with an awake ball in them. A sleeper that gets touched or is
+        # close to a crowded spot wakes up and its pairs are added
+        x, y, vx, vy = x.reshape(-1), y.reshape(-1), vx.reshape(-1), vy.reshape(-1)
+        awake = awake.reshape(-1)
+        candidates = candidates.reshape(-1)
+        active = candidates & awake
+        near_i, near_j, distance = _near_pairs(x, y, count, candidates, active & check.repeat(count))
+        np.minimum.at(clearance, near_i // count, distance - ball_radius * 2)
+        clearance = np.maximum(clearance, 0)
+        while True:
+            touching = distance < ball_radius * 2
+            pairs_i, pairs_j = near_i[touching], near_j[touching]
+            if len(pairs_i) == 0:
+                return clearance
+
+            # same "crowded" rule as TableState.collide()
+            neighbours = np.bincount(np.concatenate((near_i, near_j)), minlength=len(x))
+            crowded = np.zeros(len(x), dtype=bool)
+            busy = (neighbours[pairs_i] > 1) | (neighbours[pairs_j] > 1)
+            crowded[pairs_i[busy]] = True
+            crowded[pairs_j[busy]] = True
+            while True:
+                spread = crowded[near_i] != crowded[near_j]
+                if not spread.any():
+                    break
+                crowded[near_i[spread]] = True
+                crowded[near_j[spread]] = True
+
+            touched = np.zeros(len(x), dtype=bool)
+            touched[pairs_i] = True
+            touched[pairs_j] = True
+            woken = (crowded | touched) & ~active
+            if not woken.any():
+                break
+            more_i, more_j, more = _near_pairs(x, y, count, candidates, woken, active)
+            near_i = np.concatenate((near_i, more_i))
+            near_j = np.concatenate((near_j, more_j))
+            distance = np.concatenate((distance, more))
+            active |= woken
+            awake |= woken
+
+        if not cue_ball_in_hand:
+            self._record_first_hit(tables, count, pairs_i, pairs_j, x, y)
+
+        # isolated pairs, no ball repeats so this is one vectorized update
+        bulk = ~crowded[pairs_i]
+        _resolve_pairs(x, y, vx, vy, pairs_i[bulk], pairs_j[bulk])
+
+        # crowded pairs sorted (i, j) table by table like the scalar loop,
+        # wave k is the k-th pair of every table
+        ordered = crowded[near_i]
+        near_i, near_j = near_i[ordered], near_j[ordered]
+        if len(near_i) == 0:
+            return clearance
+        order = np.argsort(near_i * len(x) + near_j)
+        near_i, near_j = near_i[order], near_j[order]
+        table = near_i // count
+        rank = np.arange(len(table)) - np.searchsorted(table, table)
+        order = np.argsort(rank, kind="stable")
+        near_i, near_j, rank = near_i[order], near_j[order], rank[order]
+        bounds = np.searchsorted(rank, np.arange(rank[-1] + 2))
+        for wave in range(rank[-1] + 1):
+            part = slice(bounds[wave], bounds[wave + 1])
+            # earlier pairs may have moved them, check again
+            _resolve_pairs(x, y, vx, vy, near_i[part], near_j[part], scalar=True)
+        return clearance
+
+    def _record_first_hit(self, tables, count, pairs_i, pairs_j, x, y):
+        #first touching pair (in scalar loop order) with the cue ball in it,
+        #for tables that have not recorded one yet
+        ball_i = pairs_i % count
+        ball_j = pairs_j % count
+        with_cue = np.nonzero(self.is_cue[ball_i] | self.is_cue[ball_j])[0]
+        with_cue = with_cue[np.argsort(pairs_i[with_cue] * len(x) + pairs_j[with_cue])]
+        rows, first = np.unique(pairs_i[with_cue] // count, return_index=True)
+        for row, pair in zip(rows.tolist(), with_cue[first].tolist()):
+            info = self.collision_info[tables[row]]
+            if info.get("first_hit") is not None:
+                continue
+            i, j = ball_i[pair].item(), ball_j[pair].item()
+            cue_index, hit_index = (i, j) if self.is_cue[i] else (j, i)
+
+            # what type of ball was hit first?
+            if self.colors[hit_index] == black:
+                info["first_hit"] = "8ball"
+            elif self.is_striped[hit_index]:
+                info["first_hit"] = "stripes"
+            else:
+                info["first_hit"] = "solids"
+
+            # extra info for prediction line
+            cue_flat = row * count + cue_index
+            info["hit_pos"] = (x[cue_flat].item(), y[cue_flat].item())
+            info["hit_ball_index"] = hit_index
+
+    def _pocket(self, tables, x, y, vx, vy, alive, awake):
+        #TableState.pocket() on every table, a potted cue ball is parked off
+        #the table and out of play like the rest. Sleeping balls
+        #stopped outside the pockets so they are left out, and so is anything
+        #too far from the cushions to reach a pocket
+        edge = ((x < left_bound + pocket_radius) | (x > right_bound - pocket_radius)
+                | (y < top_bound + pocket_radius) | (y > BOTTOM_BOUND - pocket_radius))
+        rows, balls = np.nonzero(alive & awake & edge)
+        if len(rows) == 0:
+            return
+        dist = np.hypot(x[rows, balls, None] - _pockets[:, 0], y[rows, balls, None] - _pockets[:, 1])
+        potted = (dist < pocket_radius).any(axis=1)
+        for row, ball in zip(rows[potted].tolist(), balls[potted].tolist()):
+            table = tables[row]
+            if self.is_cue[ball]:
+                # Move cue ball off screen instead of resetting
+                x[row, ball] = -1000
+                y[row, ball] = -1000
+                vx[row, ball] = 0
+                vy[row, ball] = 0
+                self.potted[table].append("cue")
+            elif self.colors[ball] == black:
+                self.potted[table].append("8ball")
+            elif self.is_striped[ball]:
+                self.potted[table].append("stripe")
+            else:
+                self.potted[table].append("solid")
+            alive[row, ball] = False
+
+
+def _near_pairs(x, y, count, candidates, wanted, skip=None):
+    """
+    Pairs of candidates (flattened indices, i < j, never across tables)
+    closer than 4 ball radii with a wanted ball in them, leaving out pairs
+    with a skip ball (already listed). Only the wanted balls are paired up,
+    so a batch of mostly sleeping tables is cheap. Squared distances are a
+    first cut, the pairs that are left get the same np.hypot() as TableState.
+    Not sorted.
+    """
+    balls = np.nonzero(wanted & candidates)[0]
+    first = np.repeat(balls, count)
+    second = ((balls - balls % count)[:, None] + np.arange(count)).reshape(-1)
+    pick = candidates[second] & (first != second)
+    # a pair of two wanted balls is found from both ends, keep one
+    pick &= ~wanted[second] | (first < second)
+    if skip is not None:
+        pick &= ~skip[second]
+    first, second = first[pick], second[pick]
+    first, second = np.minimum(first, second), np.maximum(first, second)
+
+    reach = ball_radius * 4
+    dx = x[second] - x[first]
+    dy = y[second] - y[first]
+    close = dx * dx + dy * dy < (reach + 1) ** 2
+    first, second, dx, dy = first[close], second[close], dx[close], dy[close]
+    distance = np.hypot(dx, dy)
+    keep = distance < reach
+    return first[keep], second[keep], distance[keep]
+
+
+def _resolve_pairs(x, y, vx, vy, i, j, scalar=False):
+    """
+    TableState._resolve_pairs() on flattened ball indices, no ball repeats.
+    With scalar the pairs are the ones TableState._resolve_pair() would get,
+    so the distance is checked again first. Either way the angle math goes
+    through table_state.normals() to round like check_collisions().
+    """
+    if len(i) == 0:
+        return
+    dx = x[j] - x[i]
+    dy = y[j] - y[i]
+    if scalar:
+        # most of these are not touching (any more), skip those first
+        close = np.nonzero(dx * dx + dy * dy < (ball_radius * 2 + 1) ** 2)[0]
+        i, j, dx, dy = i[close], j[close], dx[close], dy[close]
+    gap, nx, ny = normals(dx, dy)
+    if scalar:
+        touching = gap < ball_radius * 2
+        if not touching.any():
+            return
+        i, j, gap, nx, ny = i[touching], j[touching], gap[touching], nx[touching], ny[touching]
+
+    # Resolve overlap
+    overlap = ball_radius * 2 - gap
+
+    # Move balls apart
+    x[i] -= nx * overlap / 2
+    y[i] -= ny * overlap / 2
+    x[j] += nx * overlap / 2
+    y[j] += ny * overlap / 2
+
+    # Resolve velocity (Elastic collision, mass is 1 so normals swap)
+    tx = -ny
+    ty = nx
+    dpTan1 = vx[i] * tx + vy[i] * ty
+    dpTan2 = vx[j] * tx + vy[j] * ty
+    dpNorm1 = vx[i] * nx + vy[i] * ny
+    dpNorm2 = vx[j] * nx + vy[j] * ny
+
+    vx[i] = tx * dpTan1 + nx * dpNorm2
+    vy[i] = ty * dpTan1 + ny * dpNorm2
+    vx[j] = tx * dpTan2 + nx * dpNorm1
+    vy[j] = ty * dpTan2 + ny * dpNorm1
+
+
+def _step(x, y, vx, vy, alive, awake, rest_x, rest_y, dt=1):
+    #TableState.step(dt) for every table in place, returns which live balls
+    #are still moving
+    moves = alive & awake
+    distance = rolled_distance(dt)
+    x += np.where(moves, vx * distance, 0)
+    y += np.where(moves, vy * distance, 0)
+
+    # Wall collisions
+    hit_left = moves & (x - ball_radius < left_bound)
+    hit_right = moves & ~hit_left & (x + ball_radius > right_bound)
+    x[hit_left] = left_bound + ball_radius
+    x[hit_right] = right_bound - ball_radius
+    vx[hit_left | hit_right] *= -1
+
+    hit_top = moves & (y - ball_radius < top_bound)
+    hit_bottom = moves & ~hit_top & (y + ball_radius > BOTTOM_BOUND)
+    y[hit_top] = top_bound + ball_radius
+    y[hit_bottom] = BOTTOM_BOUND - ball_radius
+    vy[hit_top | hit_bottom] *= -1
+
+    decay = friction ** dt
+    vx[moves] *= decay
+    vy[moves] *= decay
+    vx[moves & (np.abs(vx) < min_speed)] = 0
+    vy[moves & (np.abs(vy) < min_speed)] = 0
+
+    # same sleeping rule as TableState.step()
+    moving = moves & ((vx != 0) | (vy != 0))
+    settled = moves & ~moving & (x == rest_x) & (y == rest_y)
+    awake &= ~settled
+    rest_x[moves] = x[moves]
+    rest_y[moves] = y[moves]
+    return moving
+
+
+def simulate_shots(table, shots, cue_ball_in_hand=False, max_ticks=20000, substeps=SUBSTEPS):
+    """
+    Play every shot in shots ((vx, vy) given to the cue ball) from the same
+    table, all at once, substeps physics steps per tick like run_game.
+    Returns the finished TableBatch: row k of its arrays is where the balls
+    ended up after shot k, potted[k] and collision_info[k] are what
+    check_pockets() and check_collisions() would have reported over the
+    shot and ticks[k] is how long it took.
+    """
+    shots = np.asarray(shots, dtype=float).reshape(-1, 2)
+    batch = TableBatch.from_table(table, len(shots), substeps)
+    cue = np.nonzero(batch.is_cue)[0][0]
+    batch.vx[:, cue] = shots[:, 0]
+    batch.vy[:, cue] = shots[:, 1]
+    batch.wake([cue])
+    batch.run(cue_ball_in_hand, max_ticks)
+    return batch
+
+
+def benchmark(shots=1000, seed=0):
+    """
+    Shots per second of simulate_shots() against looping the scalar code
+    (check_collisions(), check_pockets(), Ball.move()) one shot at a time,
+    for random shots on a settled break position.
+    """
+    import physics
+
+    rng = np.random.default_rng(seed)
+    angles = rng.uniform(0, 2 * math.pi, shots)
+    speeds = rng.uniform(2, 12, shots)
+    velocities = np.stack((np.cos(angles) * speeds, np.sin(angles) * speeds), axis=1)
+
+    # let the rack settle against the cushion first, like a real opening
+    balls = physics.create_balls()
+    dt = 1 / SUBSTEPS
+    for _ in range(300 * SUBSTEPS):
+        physics.check_collisions(balls)
+        for ball in balls:
+            ball.move(dt)
+    table = TableState.from_balls(balls)
+
+    start = time.perf_counter()
+    simulate_shots(table, velocities)
+    batched = shots / (time.perf_counter() - start)
+
+    scalar_shots = max(shots // 50, 1)
+    start = time.perf_counter()
+    for vx, vy in velocities[:scalar_shots].tolist():
+        copies = [physics.Ball(b.x, b.y, b.color, b.is_cue, b.is_striped) for b in balls]
+        copies[0].vx = vx
+        copies[0].vy = vy
+        for _ in range(20000 * SUBSTEPS):
+            physics.check_collisions(copies)
+            physics.check_pockets(copies)
+            for ball in copies:
+                if ball.alive:
+                    ball.move(dt)
+            if all(ball.vx == 0 and ball.vy == 0 for ball in copies if ball.alive):
+                break
+    scalar = scalar_shots / (time.perf_counter() - start)
+    return batched, scalar
+
+
+if __name__ == "__main__":
+    batched, scalar = benchmark()
+    print(f"batched: {batched:8.1f} shots/s  scalar: {scalar:6.1f} shots/s  ({batched / scalar:.0f}x)")
@@ -0,0 +1,215 @@
+#break shot opening book
+#every game starts from the same rack, so the break doesn't have to be
+#searched for at the table: this tool sweeps cue ball spots, angles and
+#powers offline with the batch simulator, SAMPLES jittered copies of every
+#shot so a cell's numbers hold up to a slightly missed aim, and keeps per
+#cell the balls potted, the scratch and 8-ball rates and how far the rack
+#was spread. The book is a small binary file (break_book.bin), and the hard
+#AI looks its break up there (lookup()) instead of searching.
+#  python break_book.py            build the book for the game's cue spot
+#  python break_book.py --spots 5  also sweep spots along the head string
+import argparse
+import math
+import os
+import struct
+import time
+from functools import lru_cache
+
+import numpy as np
+
+import physics
+from physics import WIDTH, HEIGHT, ball_radius, top_bound, BOTTOM_BOUND, cue_power_multiplier
+from table_state import TableState
+from batch_sim import simulate_shots
+
+BOOK_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "break_book.bin")
+SETTLE_TICKS = 300  #ticks the rack settles for before the break, like the first frames of a game
+ANGLES = 61  #aims swept per spot, evenly over ANGLE_SPREAD either side of the rack
+ANGLE_SPREAD = 0.3  #radians
+POWERS = (50, 60, 70, 80, 90, 100)  #AI shot powers swept
+SAMPLES = 16  #jittered shots per cell (within half a step of its angle and power)
+TOLERANCE = 1.0  #pixels a ball may be off the book's rack for a lookup to count
+SCRATCH_WEIGHT = 1.5  #balls potted one scratch is worth giving away
+EIGHT_WEIGHT = 100  #balls potted the 8-ball on the break is worth giving away (it loses the game)
+SPREAD_WEIGHT = 0.01  #balls potted per pixel of spread
+
+MAGIC = b"PBRK"
+VERSION = 1
+HEADER = struct.Struct("<4sHHHHH")  #magic, version, balls, spots, angles, powers
+RECORD = np.dtype([("potted", "<f2"), ("scratch", "<f2"), ("eight", "<f2"), ("spread", "<f2")])
+
+_opening = None
+
+
+def opening_table():
+    #the settled opening table (the same for every game, so made once)
+    global _opening
+    if _opening is None:
+        table = TableState.from_balls(physics.create_balls())
+        for _ in range(SETTLE_TICKS * physics.SUBSTEPS):
+            table.advance(dt=1 / physics.SUBSTEPS)
+        _opening = table
+    return _opening.copy()
+
+
+def head_spots(count):
+    #count cue ball spots on the head string (the game's spot in the middle
+    #for an odd count), evenly between the cushions
+    x = WIDTH // 4
+    if count == 1:
+        return [(x, HEIGHT // 2)]
+    return [(x, y) for y in np.linspace(top_bound + ball_radius * 2, BOTTOM_BOUND - ball_radius * 2, count).tolist()]
+
+
+class BreakBook:
+    """
+    Outcomes of the break from the opening rack: rack_x/rack_y are where
+    the balls sat, spots the (spots, 2) cue ball positions, angles the
+    (spots, angles) aims and powers the powers swept, and records a
+    (spots, angles, powers) RECORD array of means over SAMPLES shots:
+    object balls potted, scratch rate, 8-ball rate and spread (mean
+    distance of the object balls left from their centre, in pixels).
+    """
+    def __init__(self, rack_x, rack_y, spots, angles, powers, records):
+        self.rack_x = np.asarray(rack_x, dtype=np.float32)
+        self.rack_y = np.asarray(rack_y, dtype=np.float32)
+        self.spots = np.asarray(spots, dtype=np.float32).reshape(-1, 2)
+        self.angles = np.asarray(angles, dtype=np.float32).reshape(len(self.spots), -1)
+        self.powers = np.asarray(powers, dtype=np.float32)
+        self.records = np.asarray(records, dtype=RECORD).reshape(len(self.spots), self.angles.shape[1], -1)
+
+    def values(self, spot):
+        #(angles, powers) worth of every cell for a spot, in balls potted
+        r = self.records[spot].astype([(name, "<f4") for name in RECORD.names])
+        return (r["potted"] - SCRATCH_WEIGHT * r["scratch"] - EIGHT_WEIGHT * r["eight"]
+                + SPREAD_WEIGHT * r["spread"])
+
+    def best(self, spot):
+        #(angle, power) of the best cell for a spot
+        a, p = np.unravel_index(np.argmax(self.values(spot)), self.records.shape[1:])
+        return self.angles[spot, a].item(), self.powers[p].item()
+
+    def spot_of(self, table):
+        """
+        Index of the book's spot the cue ball is on if table is the opening
+        rack (every ball on the table and within TOLERANCE of where the book
+        had it), else None.
+        """
+        if len(table.x) != len(self.rack_x) or not table.alive.all():
+            return None
+        cue = np.nonzero(table.is_cue)[0][0]
+        balls = ~table.is_cue
+        if (np.hypot(table.x[balls] - self.rack_x[balls], table.y[balls] - self.rack_y[balls]) > TOLERANCE).any():
+            return None
+        off = np.hypot(self.spots[:, 0] - table.x[cue], self.spots[:, 1] - table.y[cue])
+        spot = int(np.argmin(off))
+        return spot if off[spot] <= TOLERANCE else None
+
+    def lookup(self, table):
+        #(angle, power) to break with from table, None if it isn't in the book
+        spot = self.spot_of(table)
+        return None if spot is None else self.best(spot)
+
+    def save(self, path=BOOK_FILE):
+        with open(path, "wb") as f:
+            f.write(HEADER.pack(MAGIC, VERSION, len(self.rack_x), len(self.spots),
+                                self.angles.shape[1], len(self.powers)))
+            for array in (self.rack_x, self.rack_y, self.spots, self.angles, self.powers):
+                f.write(array.astype("<f4").tobytes())
+            f.write(self.records.tobytes())
+
+    @classmethod
+    def load(cls, path=BOOK_FILE):
+        with open(path, "rb") as f:
+            data = f.read()
+        magic, version, balls, spots, angles, powers = HEADER.unpack_from(data)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a version {VERSION} break book")
+        offset = HEADER.size
+        arrays = []
+        for count in (balls, balls, spots * 2, spots * angles, powers):
+            arrays.append(np.frombuffer(data, "<f4", count, offset))
+            offset += count * 4
+        records = np.frombuffer(data, RECORD, spots * angles * powers, offset)
+        return cls(*arrays, records)
+
+
+@lru_cache(maxsize=4)
+def load_book(path=BOOK_FILE):
+    #the book at path, None if it hasn't been built
+    if not os.path.exists(path):
+        return None
+    return BreakBook.load(path)
+
+
+def _outcomes(batch, rows):
+    #RECORD fields for the finished shots in batch rows
+    objects = ~batch.is_cue
+    potted = np.array([sum(1 for p in batch.potted[k] if p in ("solid", "stripe")) for k in rows], dtype=float)
+    scratch = np.array(["cue" in batch.potted[k] for k in rows], dtype=float)
+    eight = np.array(["8ball" in batch.potted[k] for k in rows], dtype=float)
+    left = batch.alive[rows][:, objects]
+    x, y = batch.x[rows][:, objects], batch.y[rows][:, objects]
+    count = np.maximum(left.sum(axis=1), 1)
+    cx = np.where(left, x, 0).sum(axis=1) / count
+    cy = np.where(left, y, 0).sum(axis=1) / count
+    spread = np.where(left, np.hypot(x - cx[:, None], y - cy[:, None]), 0).sum(axis=1) / count
+    return potted, scratch, eight, spread
+
+
+def build(spots=None, angles=ANGLES, powers=POWERS, samples=SAMPLES, seed=0):
+    """
+    Sweep the break from the opening rack: for every spot (default the
+    game's cue spot), angles aims spread across the rack and every power,
+    samples shots jittered by up to half a step each way, all played with
+    simulate_shots(). Returns the BreakBook.
+    """
+    rng = np.random.default_rng(seed)
+    rack = opening_table()
+    cue = np.nonzero(rack.is_cue)[0][0]
+    objects = ~rack.is_cue
+    centre_x, centre_y = rack.x[objects].mean(), rack.y[objects].mean()
+    spots = [(rack.x[cue].item(), rack.y[cue].item())] if spots is None else spots
+    offsets = np.linspace(-ANGLE_SPREAD, ANGLE_SPREAD, angles)
+    angle_step = offsets[1] - offsets[0] if angles > 1 else 0.0
+    powers = np.asarray(powers, dtype=float)
+    power_step = powers[1] - powers[0] if len(powers) > 1 else 0.0
+
+    aims = np.zeros((len(spots), angles))
+    records = np.zeros((len(spots), angles, len(powers)), dtype=RECORD)
+    for s, (x, y) in enumerate(spots):
+        table = rack.copy()
+        table.x[cue], table.y[cue] = x, y
+        aims[s] = math.atan2(centre_y - y, centre_x - x) + offsets
+
+        shot_angle = np.repeat(aims[s], len(powers) * samples)
+        shot_power = np.tile(np.repeat(powers, samples), angles)
+        shot_angle = shot_angle + rng.uniform(-0.5, 0.5, len(shot_angle)) * angle_step
+        shot_power = np.minimum(shot_power + rng.uniform(-0.5, 0.5, len(shot_power)) * power_step, 100)
+        speed = shot_power * cue_power_multiplier
+        batch = simulate_shots(table, np.stack((np.cos(shot_angle) * speed, np.sin(shot_angle) * speed), axis=1))
+
+        fields = _outcomes(batch, np.arange(len(batch)))
+        for name, values in zip(RECORD.names, fields):
+            records[name][s] = values.reshape(angles, len(powers), samples).mean(axis=2)
+    return BreakBook(rack.x, rack.y, spots, aims, powers, records)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the break shot opening book.")
+    parser.add_argument("--spots", type=int, default=1, help="cue ball spots along the head string")
+    parser.add_argument("--samples", type=int, default=SAMPLES)
+    parser.add_argument("--out", default=BOOK_FILE)
+    args = parser.parse_args()
+    start = time.perf_counter()
+    book = build(head_spots(args.spots), samples=args.samples)
+    book.save(args.out)
+    print(f"{book.records.size} cells ({book.records.size * args.samples} shots) in "
+          f"{time.perf_counter() - start:.1f}s, {os.path.getsize(args.out)} bytes -> {args.out}")
+    for s, (x, y) in enumerate(book.spots.tolist()):
+        angle, power = book.best(s)
+        a, p = np.unravel_index(np.argmax(book.values(s)), book.records.shape[1:])
+        r = book.records[s, a, p]
+        print(f"  spot ({x:.0f}, {y:.0f}): angle {math.degrees(angle):.1f} power {power:.0f}  "
+              f"potted {float(r['potted']):.2f} scratch {float(r['scratch']):.0%} "
+              f"8-ball {float(r['eight']):.0%} spread {float(r['spread']):.0f}px")
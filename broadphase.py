@@ -0,0 +1,171 @@
+#uniform grid broadphase for ball-ball collisions
+#balls are bucketed into square cells (about one ball wide) and only balls in
+#neighbouring cells are paired up, so crowded tables cost about O(n) per frame
+#instead of the O(n^2) pair loop
+import math
+import time
+
+import numpy as np
+
+from physics import ball_radius
+
+
+class SpatialHash:
+    def __init__(self, cell_size=ball_radius * 2):
+        self.cell_size = cell_size
+        self.cells = {}  #(cell x, cell y) -> set of ball indices
+        self._cx = np.zeros(0, dtype=np.int64)  #cell each ball is filed under
+        self._cy = np.zeros(0, dtype=np.int64)
+        self._active = np.zeros(0, dtype=bool)
+        self._stencils = {}
+
+    def update(self, x, y, active):
+        """
+        Re-file the balls after they moved. Only balls whose cell changed (or
+        that were added/removed through active) touch the dict, so a mostly
+        still table is cheap to keep up to date.
+        """
+        cx = np.floor(np.asarray(x) / self.cell_size).astype(np.int64)
+        cy = np.floor(np.asarray(y) / self.cell_size).astype(np.int64)
+        active = np.asarray(active, dtype=bool)
+
+        if len(cx) != len(self._cx):
+            # ball count changed, start over
+            self.cells = {}
+            self._cx = np.zeros_like(cx)
+            self._cy = np.zeros_like(cy)
+            self._active = np.zeros_like(active)
+
+        changed = (active != self._active) | (active & ((cx != self._cx) | (cy != self._cy)))
+        cells = self.cells
+        for i in np.nonzero(changed)[0].tolist():
+            if self._active[i]:
+                old_key = (int(self._cx[i]), int(self._cy[i]))
+                members = cells[old_key]
+                members.discard(i)
+                if not members:
+                    del cells[old_key]
+            if active[i]:
+                cells.setdefault((int(cx[i]), int(cy[i])), set()).add(i)
+
+        self._cx = cx
+        self._cy = cy
+        self._active = active
+
+    def _stencil(self, reach):
+        #"forward" half of the neighbouring cells so each pair is found once
+        steps = int(math.ceil(reach / self.cell_size))
+        stencil = self._stencils.get(steps)
+        if stencil is None:
+            stencil = []
+            for oy in range(0, steps + 1):
+                for ox in range(-steps, steps + 1):
+                    if oy == 0 and ox <= 0:
+                        continue
+                    stencil.append((ox, oy))
+            self._stencils[steps] = stencil
+        return stencil
+
+    def pairs(self, reach=ball_radius * 2, subset=None):
+        """
+        Candidate pairs (i < j) of balls in cells close enough that their
+        centres could be within reach of each other, sorted by (i, j) like the
+        scalar double loop visits them. Callers still have to check the actual
+        distance. With subset (ball indices) only pairs that
+        have one of those balls in them are returned, at a cost that depends
+        on the size of the subset rather than the whole table.
+        """
+        if subset is not None:
+            subset = np.asarray(subset, dtype=np.int64)
+            if len(subset) * 2 < np.count_nonzero(self._active):
+                return self._pairs_of(subset, reach)
+            # most of the table is in the subset, a full sweep is cheaper
+            first, second = self.pairs(reach)
+            wanted = np.zeros(len(self._active), dtype=bool)
+            wanted[subset] = True
+            keep = wanted[first] | wanted[second]
+            return first[keep], second[keep]
+        stencil = self._stencil(reach)
+        cells = self.cells
+        first = []
+        second = []
+        for (kx, ky), members in cells.items():
+            members = sorted(members)
+            # pairs inside the same cell
+            for a, i in enumerate(members):
+                for j in members[a + 1:]:
+                    first.append(i)
+                    second.append(j)
+            # pairs with the neighbouring cells
+            for ox, oy in stencil:
+                others = cells.get((kx + ox, ky + oy))
+                if others is None:
+                    continue
+                for i in members:
+                    for j in others:
+                        first.append(i)
+                        second.append(j)
+
+        first = np.array(first, dtype=np.int64)
+        second = np.array(second, dtype=np.int64)
+        first, second = np.minimum(first, second), np.maximum(first, second)
+        #cells come out in dict order, callers rely on the scalar (i, j) order
+        order = np.lexsort((second, first))
+        return first[order], second[order]
+
+    def _pairs_of(self, subset, reach):
+        steps = int(math.ceil(reach / self.cell_size))
+        cells = self.cells
+        found = set()
+        for i in subset.tolist():
+            if not self._active[i]:
+                continue
+            kx = int(self._cx[i])
+            ky = int(self._cy[i])
+            for oy in range(-steps, steps + 1):
+                for ox in range(-steps, steps + 1):
+                    others = cells.get((kx + ox, ky + oy))
+                    if others is None:
+                        continue
+                    for j in others:
+                        if j != i:
+                            found.add((i, j) if i < j else (j, i))
+
+        found = sorted(found)
+        first = np.array([i for i, _ in found], dtype=np.int64)
+        second = np.array([j for _, j in found], dtype=np.int64)
+        return first, second
+
+
+def benchmark(counts=(16, 100, 500, 1000, 2000, 5000), frames=20, seed=0):
+    """
+    Time TableState.collide() on random tables of growing size at the same
+    ball density as a full rack. With the broadphase the time per ball should
+    stay about flat. Returns [(count, seconds per frame)].
+    """
+    from table_state import TableState
+
+    rng = np.random.default_rng(seed)
+    results = []
+    for count in counts:
+        # keep about one ball per 8 ball-sized cells, like a racked table
+        side = math.sqrt(count * 8) * ball_radius * 2
+        table = TableState(count)
+        table.x[:] = rng.uniform(0, side, count)
+        table.y[:] = rng.uniform(0, side, count)
+        table.vx[:] = rng.uniform(-5, 5, count)
+        table.vy[:] = rng.uniform(-5, 5, count)
+
+        start = time.perf_counter()
+        for _ in range(frames):
+            table.collide()
+            table.x += table.vx
+            table.y += table.vy
+        per_frame = (time.perf_counter() - start) / frames
+        results.append((count, per_frame))
+    return results
+
+
+if __name__ == "__main__":
+    for count, per_frame in benchmark():
+        print(f"{count:5d} balls: {per_frame * 1000:8.3f} ms/frame  {per_frame / count * 1e6:6.2f} us/ball")
@@ -0,0 +1,138 @@
+#combination shots
+#a combo is the cue ball onto ball A, A onto ball B and B into a pocket: two
+#ghost balls chained, B's ghost ball for the pocket is where A has to be when
+#it touches B, and A's ghost ball for that spot is where the cue ball has to
+#be. Trying every A against every B and pocket grows with balls^2 * pockets,
+#so the enumeration prunes as it goes: only the MAX_FINISHES shortest
+#B-into-pocket finishes with a clear path are kept, every A is tried against
+#all of them in one NumPy pass (cut angle limits, ghost balls on the table),
+#and the corridors - the only per-shot Python - are checked easiest first
+#until top_n combos are found or MAX_CHECKS is used up.
+import math
+import time
+
+import numpy as np
+
+from physics import ball_radius, left_bound, right_bound, top_bound, BOTTOM_BOUND, POCKETS
+
+COMBO_CUT = math.radians(60)  #thinner cuts than this at either ball are not tried
+COMBO_PENALTY = 2.0  #difficulty multiplier for the extra contact
+TOP_N = 4  #combos handed on
+MAX_FINISHES = 12  #B-into-pocket finishes each A is tried against
+MAX_CHECKS = 48  #corridor checks (finishes and combos) per call
+
+_pockets = np.array(POCKETS, dtype=float)
+
+
+def _on_table(x, y):
+    return ((x >= left_bound + ball_radius) & (x <= right_bound - ball_radius)
+            & (y >= top_bound + ball_radius) & (y <= BOTTOM_BOUND - ball_radius))
+
+
+def combo_shots(table, targets, sight, max_cut=COMBO_CUT, top_n=TOP_N):
+    """
+    [(difficulty, angle)] of up to top_n clear combos, easiest first: the
+    cue ball aimed at angle hits ball A, which sends ball B into a pocket
+    (A and B both from targets). sight is an OcclusionIndex of table.
+    difficulty estimates how far off the pot is per radian of aim error,
+    on the same scale as ai_search.ghost_table() (cue distance * distance
+    to the pocket / cos(cut) for a direct pot): every contact multiplies
+    the error by the distance the next ball travels over 2 radii * cos(cut).
+    """
+    targets = np.asarray(targets, dtype=np.int64)
+    if len(targets) < 2:
+        return []
+    cue_x, cue_y = table.x[sight.cue].item(), table.y[sight.cue].item()
+    x, y = table.x[targets], table.y[targets]
+    checks = 0
+
+    # B into each pocket: direction, distance and ghost ball
+    to_x = _pockets[:, 0] - x[:, None]
+    to_y = _pockets[:, 1] - y[:, None]
+    pocket_distance = np.hypot(to_x, to_y)
+    unit_x, unit_y = to_x / pocket_distance, to_y / pocket_distance
+    ghost_x = x[:, None] - unit_x * ball_radius * 2
+    ghost_y = y[:, None] - unit_y * ball_radius * 2
+
+    # keep the shortest finishes whose way to the pocket is clear
+    rows, pockets = np.nonzero(_on_table(ghost_x, ghost_y))
+    finishes = []
+    for k in np.argsort(pocket_distance[rows, pockets], kind="stable").tolist():
+        if len(finishes) == MAX_FINISHES or checks == MAX_CHECKS:
+            break
+        b, pocket = rows[k].item(), pockets[k].item()
+        checks += 1
+        if sight.pocket_path_clear(pocket, x[b], y[b], (targets[b].item(),)):
+            finishes.append((b, pocket))
+    if not finishes:
+        return []
+    b_rows = np.array([b for b, _ in finishes])
+    b_pockets = np.array([pocket for _, pocket in finishes])
+
+    # every A against every finish at once, shape (finishes, targets)
+    target_x = ghost_x[b_rows, b_pockets][:, None]
+    target_y = ghost_y[b_rows, b_pockets][:, None]
+    dx, dy = target_x - x[None, :], target_y - y[None, :]
+    travel = np.hypot(dx, dy)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        dir_x, dir_y = dx / travel, dy / travel
+        cos_b = dir_x * unit_x[b_rows, b_pockets][:, None] + dir_y * unit_y[b_rows, b_pockets][:, None]
+        a_ghost_x = x[None, :] - dir_x * ball_radius * 2
+        a_ghost_y = y[None, :] - dir_y * ball_radius * 2
+        aim_x, aim_y = a_ghost_x - cue_x, a_ghost_y - cue_y
+        cue_distance = np.hypot(aim_x, aim_y)
+        cos_a = (aim_x * dir_x + aim_y * dir_y) / cue_distance
+        limit = math.cos(max_cut)
+        valid = ((b_rows[:, None] != np.arange(len(targets))[None, :]) & (travel > 0) & (cue_distance > 0)
+                 & (cos_a >= limit) & (cos_b >= limit) & _on_table(a_ghost_x, a_ghost_y))
+        difficulty = (cue_distance * travel / (ball_radius * 2 * cos_a)
+                      * pocket_distance[b_rows, b_pockets][:, None] / cos_b * COMBO_PENALTY)
+    difficulty = np.where(valid, difficulty, np.inf)
+
+    shots = []
+    for k in np.argsort(difficulty, axis=None, kind="stable").tolist():
+        f, a = divmod(k, len(targets))
+        if len(shots) == top_n or checks == MAX_CHECKS or not valid[f, a]:
+            break
+        checks += 1
+        ball_a, ball_b = targets[a].item(), targets[b_rows[f]].item()
+        if (sight.cue_path_clear(a_ghost_x[f, a], a_ghost_y[f, a], (ball_a,))
+                and sight.segment_clear(x[a], y[a], target_x[f, 0], target_y[f, 0], (ball_a, ball_b))):
+            shots.append((difficulty[f, a].item(), math.atan2(aim_y[f, a], aim_x[f, a])))
+    return shots
+
+
+def benchmark(counts=(4, 8, 16, 32, 64, 128), repeats=20, seed=0):
+    """
+    Time combo_shots() (with its OcclusionIndex) on random tables of growing
+    size, every object ball a target. The pruning keeps the Python work
+    bounded, so the time should grow far slower than balls^2 * pockets.
+    Returns [(count, seconds per call, combos found)].
+    """
+    from table_state import TableState
+    from occlusion import OcclusionIndex
+
+    rng = np.random.default_rng(seed)
+    results = []
+    for count in counts:
+        table = TableState(count)
+        table.is_cue[0] = True
+        placed = 0
+        while placed < count:
+            px = rng.uniform(left_bound + ball_radius, right_bound - ball_radius)
+            py = rng.uniform(top_bound + ball_radius, BOTTOM_BOUND - ball_radius)
+            if (np.hypot(table.x[:placed] - px, table.y[:placed] - py) >= ball_radius * 2).all():
+                table.x[placed], table.y[placed] = px, py
+                placed += 1
+        targets = list(range(1, count))
+
+        start = time.perf_counter()
+        for _ in range(repeats):
+            found = combo_shots(table, targets, OcclusionIndex(table))
+        results.append((count, (time.perf_counter() - start) / repeats, len(found)))
+    return results
+
+
+if __name__ == "__main__":
+    for count, per_call, found in benchmark():
+        print(f"{count:4d} balls: {per_call * 1000:7.3f} ms/call  {found} combos")
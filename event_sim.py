@@ -0,0 +1,249 @@
+#event driven shot resolver
+#most ticks of a shot are free rolling: nothing touches and nothing drops,
+#so collide() and pocket() find nothing to do and only step() changes the
+#table. The resolver keeps a clearance - how far any ball can still move
+#before two balls could touch or one could reach a pocket - and only runs
+#the contact tests once the balls have moved that far. In between, the few
+#awake balls are rolled with plain floats, the same arithmetic as step()
+#ball by ball, in the same SUBSTEPS steps per tick as run_game, so the shot
+#ends exactly where the game's frame loop would leave it (a closed-form jump would round differently, and on a break the
+#last bit decides which balls drop).
+import math
+import time
+
+import numpy as np
+
+from physics import (
+    Ball, ball_radius, friction, min_speed, rolled_distance, swept_step, SUBSTEPS,
+    left_bound, right_bound, top_bound, BOTTOM_BOUND,
+    pocket_radius, POCKETS,
+)
+from table_state import TableState
+
+CLEARANCE_MARGIN = 1e-6  #px, clearance treated as used up (covers rounding in the bound)
+
+_pockets = np.array(POCKETS, dtype=float)
+
+
+def clearance(table, cue_ball_in_hand=False):
+    """
+    How far (px) every ball can move before collide() or pocket() could do
+    anything on table: half the smallest gap between two balls with an
+    awake one among them (both may close it) and the smallest distance an
+    awake ball is from reaching a pocket. 0 once something touches.
+    Sleeping balls only wake up through collide(), so pairs of them don't
+    count (e.g. a rack squashed against a cushion).
+    """
+    candidates = table.alive.copy()
+    if cue_ball_in_hand and len(table):
+        candidates[0] = False
+    active = candidates & table.awake
+    a = np.nonzero(active)[0]
+    if len(a) == 0:
+        return math.inf
+    c = np.nonzero(candidates)[0]
+
+    gap = np.hypot(table.x[a, None] - table.x[c], table.y[a, None] - table.y[c])
+    gap[a[:, None] == c] = math.inf
+    room = (gap.min() - ball_radius * 2) / 2 if len(c) > 1 else math.inf
+    if not cue_ball_in_hand:
+        live = np.nonzero(table.alive & table.awake)[0]
+        to_pocket = np.hypot(table.x[live, None] - _pockets[:, 0], table.y[live, None] - _pockets[:, 1])
+        room = min(room, to_pocket.min() - pocket_radius)
+    return max(room, 0.0)
+
+
+def _roll(table, room, step, max_steps, substeps, events):
+    """
+    TableState.step(1 / substeps) step after step on the awake balls, as
+    plain floats, until the balls have moved room px (or stopped, or
+    max_steps). Only valid while nothing can touch. Returns (step, room left).
+    """
+    idx = np.nonzero(table.awake & table.alive)[0].tolist()
+    x, y = table.x[idx].tolist(), table.y[idx].tolist()
+    vx, vy = table.vx[idx].tolist(), table.vy[idx].tolist()
+    rest_x, rest_y = table._rest_x[idx].tolist(), table._rest_y[idx].tolist()
+    awake = [True] * len(idx)
+    dt = 1 / substeps
+    distance = rolled_distance(dt)
+    decay = friction ** dt
+    low_x, high_x = left_bound + ball_radius, right_bound - ball_radius
+    low_y, high_y = top_bound + ball_radius, BOTTOM_BOUND - ball_radius
+    moved_any = False
+    moving_count = table.moving_count
+
+    while room > CLEARANCE_MARGIN and moving_count and step < max_steps:
+        step += 1
+        farthest = 0.0
+        moving_count = 0
+        for k in range(len(idx)):
+            if not awake[k]:
+                continue
+            px, py, pvx, pvy = x[k], y[k], vx[k], vy[k]
+            nx = px + pvx * distance
+            ny = py + pvy * distance
+            bounced = False
+            if nx - ball_radius < left_bound:
+                nx, pvx, bounced = low_x, -pvx, True
+            elif nx + ball_radius > right_bound:
+                nx, pvx, bounced = high_x, -pvx, True
+            if ny - ball_radius < top_bound:
+                ny, pvy, bounced = low_y, -pvy, True
+            elif ny + ball_radius > BOTTOM_BOUND:
+                ny, pvy, bounced = high_y, -pvy, True
+            pvx *= decay
+            pvy *= decay
+            if abs(pvx) < min_speed:
+                pvx = 0.0
+            if abs(pvy) < min_speed:
+                pvy = 0.0
+            if bounced and (pvx * vx[k] < 0 or pvy * vy[k] < 0):
+                # same test as resolve_shot(): a velocity component flipped
+                events.append({"tick": (step - 1) // substeps + 1, "type": "cushion", "ball": idx[k]})
+            if nx != px or ny != py:
+                moved_any = True
+                farthest = max(farthest, math.hypot(nx - px, ny - py))
+            if pvx != 0 or pvy != 0:
+                moving_count += 1
+            elif nx == rest_x[k] and ny == rest_y[k]:
+                awake[k] = False
+            rest_x[k], rest_y[k] = nx, ny
+            x[k], y[k], vx[k], vy[k] = nx, ny, pvx, pvy
+        room -= farthest
+
+    table.x[idx], table.y[idx] = x, y
+    table.vx[idx], table.vy[idx] = vx, vy
+    table._rest_x[idx], table._rest_y[idx] = rest_x, rest_y
+    table.awake[idx] = awake
+    table.moving_count = moving_count
+    if moved_any:
+        table.version += 1
+    return step, room
+
+
+def resolve_shot(table, cue_ball_in_hand=False, collision_info=None, max_ticks=20000, substeps=SUBSTEPS):
+    """
+    Run a shot to rest, same steps as run_game (substeps per tick) but with
+    the contact tests skipped while nothing can touch (see clearance()).
+    Works on a copy of table and returns (final table, events). Each event is
+    a dict with the tick it happened on and its type:
+        {"tick": t, "type": "ball", "balls": (i, j)}
+        {"tick": t, "type": "cushion", "ball": i}
+        {"tick": t, "type": "pocket", "ball": i, "potted": "solid"}
+    collision_info is filled in like check_collisions() does. A potted cue
+    ball is out of play off the table at (-1000, -1000), like TableState.pocket().
+    """
+    table = table.copy()
+    events = []
+    dt = 1 / substeps
+    max_steps = max_ticks * substeps
+    step = 0
+    room = 0.0
+
+    while step < max_steps and not table.all_stopped():
+        step += 1
+        tick = (step - 1) // substeps + 1
+        if room <= CLEARANCE_MARGIN:
+            # same order as run_game: collisions, pockets, movement
+            still = (table.vx == 0) & (table.vy == 0)
+            pairs_i, pairs_j = table.collide(cue_ball_in_hand, collision_info)
+            for i, j in zip(pairs_i.tolist(), pairs_j.tolist()):
+                # balls resting against each other are not an impact
+                if not (still[i] and still[j]):
+                    events.append({"tick": tick, "type": "ball", "balls": (i, j)})
+
+            if not cue_ball_in_hand:
+                potted = np.nonzero(table.pocketed())[0].tolist()
+                for i, label in zip(potted, table.pocket()):
+                    events.append({"tick": tick, "type": "pocket", "ball": i, "potted": label})
+            room = clearance(table, cue_ball_in_hand)
+
+        x_before, y_before = table.x.copy(), table.y.copy()
+        vx_before, vy_before = table.vx.copy(), table.vy.copy()
+        table.step(dt)
+        bounced = table.alive & ((np.sign(table.vx) == -np.sign(vx_before)) & (vx_before != 0)
+                                 | (np.sign(table.vy) == -np.sign(vy_before)) & (vy_before != 0))
+        for i in np.nonzero(bounced)[0].tolist():
+            events.append({"tick": tick, "type": "cushion", "ball": i})
+        moved = np.hypot(table.x - x_before, table.y - y_before)
+        room -= moved[table.alive].max(initial=0.0)
+
+        # free rolling until something could touch
+        if room > CLEARANCE_MARGIN:
+            step, room = _roll(table, room, step, max_steps, substeps, events)
+
+    return table, events
+
+
+def potted_in(events):
+    #potted list in the same format as check_pockets() for a whole shot
+    return [event["potted"] for event in events if event["type"] == "pocket"]
+
+
+def frame_loop(table, cue_ball_in_hand=False, max_ticks=20000, substeps=SUBSTEPS):
+    #the plain run_game step loop on a copy of table, (final table, potted)
+    table = table.copy()
+    potted = []
+    step = 0
+    while step < max_ticks * substeps and not table.all_stopped():
+        step += 1
+        potted += table.advance(cue_ball_in_hand, 1 / substeps)
+    return table, potted
+
+
+def swept_shot(table, cue_ball_in_hand=False, collision_info=None, max_ticks=20000, dt=1):
+    """
+    Run a shot to rest with physics.swept_step() steps of dt ticks instead of
+    the overlap checks, (final table, potted). Contacts are found at their
+    exact time, so long steps (dt of a tick or more) and very hard shots
+    can't pass through balls, cushions or pockets. Not the game's physics to
+    the last bit: cushions reflect instead of clamping and balls bounce from
+    the touching point, so positions differ from frame_loop() by a few px.
+    """
+    balls = []
+    for view in table.ball_views(Ball):
+        ball = Ball(view.x, view.y, view.color, view.is_cue, view.is_striped)
+        ball.vx, ball.vy, ball.alive = view.vx, view.vy, view.alive
+        balls.append(ball)
+    potted = []
+    ticks = 0
+    while ticks < max_ticks and any(ball.alive and (ball.vx or ball.vy) for ball in balls):
+        ticks += dt
+        potted += swept_step(balls, dt, cue_ball_in_hand, collision_info)
+    return TableState.from_balls(balls), potted
+
+
+def benchmark(shots=40, seed=0):
+    """
+    ms per shot of resolve_shot() against frame_loop() for random shots
+    from the settled rack, at full range of powers and at power 5.
+    Returns {"powers 5-100": (event ms, loop ms), "power 5": (...)}.
+    """
+    from break_book import opening_table
+    from physics import cue_power_multiplier
+
+    rng = np.random.default_rng(seed)
+    rack = opening_table()
+    results = {}
+    for name, low, high in (("powers 5-100", 5, 100), ("power 5", 5, 5)):
+        tables = []
+        for _ in range(shots):
+            angle = rng.uniform(-math.pi, math.pi)
+            speed = rng.uniform(low, high) * cue_power_multiplier
+            table = rack.copy()
+            table.vx[0], table.vy[0] = math.cos(angle) * speed, math.sin(angle) * speed
+            table.wake([0])
+            tables.append(table)
+        times = []
+        for run in (resolve_shot, frame_loop):
+            start = time.perf_counter()
+            for table in tables:
+                run(table)
+            times.append((time.perf_counter() - start) / shots * 1000)
+        results[name] = tuple(times)
+    return results
+
+
+if __name__ == "__main__":
+    for name, (event, loop) in benchmark().items():
+        print(f"{name:>12}: resolve_shot {event:6.1f} ms/shot  frame loop {loop:6.1f} ms/shot  ({loop / event:.1f}x)")
@@ -0,0 +1,99 @@
+#where the cue ball can go with ball in hand
+#the playable area is covered by a grid of candidate spots (a few per ball
+#width) and every spot is checked against the live object balls and the
+#pockets with NumPy, so finding a legal spot is picking a free cell
+#instead of guessing positions until one fits
+import random
+
+import numpy as np
+
+from physics import (
+    ball_radius, left_bound, right_bound, top_bound, BOTTOM_BOUND,
+    pocket_radius, POCKETS,
+)
+from ai_search import ranked_shots
+
+_pockets = np.array(POCKETS, dtype=float)
+
+
+class FreeSpace:
+    """
+    Free spots for the cue ball on a table (the table is copied). A spot is
+    free if the cue ball fits there between the cushions without touching
+    another ball and isn't over a pocket (it would drop straight in).
+    """
+    def __init__(self, table, step=ball_radius / 2):
+        self.table = table.copy()
+        self.step = step
+        self.cue = int(np.nonzero(table.is_cue)[0][0])
+        others = self.table.alive & ~self.table.is_cue
+        self._x = self.table.x[others]
+        self._y = self.table.y[others]
+        self._spots = None
+
+    def is_free(self, x, y):
+        if not (left_bound + ball_radius <= x <= right_bound - ball_radius
+                and top_bound + ball_radius <= y <= BOTTOM_BOUND - ball_radius):
+            return False
+        if (np.hypot(self._x - x, self._y - y) < ball_radius * 2).any():
+            return False
+        return not (np.hypot(_pockets[:, 0] - x, _pockets[:, 1] - y) < pocket_radius).any()
+
+    def spots(self):
+        #(n, 2) array of the free grid spots, worked out on first use
+        if self._spots is None:
+            xs = np.arange(left_bound + ball_radius, right_bound - ball_radius + 1e-9, self.step)
+            ys = np.arange(top_bound + ball_radius, BOTTOM_BOUND - ball_radius + 1e-9, self.step)
+            grid_x, grid_y = np.meshgrid(xs, ys)
+            grid_x, grid_y = grid_x.ravel(), grid_y.ravel()
+            free = np.ones(len(grid_x), dtype=bool)
+            for bx, by in zip(self._x.tolist(), self._y.tolist()):
+                free &= np.hypot(grid_x - bx, grid_y - by) >= ball_radius * 2
+            for px, py in POCKETS:
+                free &= np.hypot(grid_x - px, grid_y - py) >= pocket_radius
+            self._spots = np.column_stack((grid_x[free], grid_y[free]))
+        return self._spots
+
+    def sample(self, rng=random):
+        """
+        A random free (x, y), or None if the table has no room at all. Picks
+        a free grid spot and nudges it up to half a cell, keeping the nudge
+        only if it is still free, so it never loops.
+        """
+        spots = self.spots()
+        if len(spots) == 0:
+            return None
+        x, y = spots[rng.randrange(len(spots))].tolist()
+        nudged_x = x + rng.uniform(-self.step / 2, self.step / 2)
+        nudged_y = y + rng.uniform(-self.step / 2, self.step / 2)
+        if self.is_free(nudged_x, nudged_y):
+            return nudged_x, nudged_y
+        return x, y
+
+    def shot_value(self, x, y, group):
+        """
+        How much a cue ball at (x, y) opens up for group: every clear
+        ghost-ball pot counts, easier ones (see ai_search.ghost_table()) more.
+        Combos, banks and kicks are left out, with ball in hand a direct
+        shot is what the spot is for.
+        """
+        self.table.x[self.cue] = x
+        self.table.y[self.cue] = y
+        return sum(1e5 / difficulty for blocked, difficulty, _ in ranked_shots(self.table, group, rails=0, combos=0) if not blocked)
+
+    def best(self, group, tries=48, rng=random):
+        """
+        The free spot (out of tries spread over the free grid) that opens up
+        the most for group, or None if nothing is free.
+        """
+        spots = self.spots()
+        if len(spots) == 0:
+            return None
+        if len(spots) > tries:
+            # every n-th spot covers the table evenly, a random start keeps
+            # it from always trying the same ones
+            stride = len(spots) / tries
+            start = rng.uniform(0, stride)
+            spots = spots[(start + np.arange(tries) * stride).astype(np.int64)]
+        values = [self.shot_value(x, y, group) for x, y in spots.tolist()]
+        return tuple(spots[int(np.argmax(values))].tolist())
@@ -0,0 +1,224 @@
+#where the cue ball should end up
+#a LeaveMap covers the playable area with a grid of cue ball positions and
+#scores each by the best next shot from there: every target against every
+#pocket is a ghost-ball pot, and for all cells at once NumPy works out the
+#cut, the distances and whether another ball is in the cue ball's way. A
+#shot usually moves only a couple of balls, so the map for the table after
+#it is made from the map before it by redoing just those balls (the map
+#keeps, per pot and cell, how many balls block it) - for the whole grid, or
+#for the one cell the cue ball stopped in when judging a candidate shot.
+import math
+from collections import OrderedDict
+
+import numpy as np
+
+from physics import (
+    ball_radius, left_bound, right_bound, top_bound, BOTTOM_BOUND,
+    pocket_radius, POCKETS,
+)
+import shot_cache
+
+EASY_SHOT = 150 * 150  #difficulty (cue distance * pocket distance / cos(cut)) that counts as a sure pot
+MAX_MOVED = 4  #balls that may have moved for a map to be updated instead of rebuilt
+CACHE_SIZE = 16  #maps kept by leave_map()
+
+_pockets = np.array(POCKETS, dtype=float)
+
+
+class LeaveMap:
+    """
+    Leave quality for a cue ball anywhere on table, for a player whose
+    next pots are on targets (ball indices). A cell's quality runs from 0
+    (no clear pot from there, or over a pocket) to 1 (a pot at least as
+    easy as EASY_SHOT). cells (indices into the full grid) limits the map
+    to those cells. The table is copied.
+    """
+    def __init__(self, table, targets, max_cut=math.radians(80), step=ball_radius, cells=None):
+        self.max_cut = max_cut
+        self.step = step
+        self.cue = int(np.nonzero(table.is_cue)[0][0])
+        self.x = table.x.copy()
+        self.y = table.y.copy()
+        self.alive = table.alive.copy()
+        self.targets = np.asarray(targets, dtype=np.int64)
+
+        self.xs = np.arange(left_bound + ball_radius, right_bound - ball_radius + 1e-9, step)
+        self.ys = np.arange(top_bound + ball_radius, BOTTOM_BOUND - ball_radius + 1e-9, step)
+        self.cells = np.arange(len(self.xs) * len(self.ys)) if cells is None else np.asarray(cells, dtype=np.int64)
+        self.cell_x = self.xs[self.cells % len(self.xs)]
+        self.cell_y = self.ys[self.cells // len(self.xs)]
+        self._open = (np.hypot(self.cell_x[:, None] - _pockets[:, 0], self.cell_y[:, None] - _pockets[:, 1])
+                      >= pocket_radius).all(axis=1)
+
+        # one pot per (target, pocket), rows of the per-pot arrays
+        self.shot_target = np.repeat(self.targets, len(POCKETS))
+        self.shot_pocket = np.tile(np.arange(len(POCKETS)), len(self.targets))
+        self.quality = np.zeros((len(self.shot_target), len(self.cells)))  #if nothing is in the way
+        self.blockers = np.zeros(self.quality.shape, dtype=np.int64)  #balls in the cue ball's way
+        self._aim_x = np.zeros(self.quality.shape)  #cell to ghost ball
+        self._aim_y = np.zeros(self.quality.shape)
+        self._pot(np.arange(len(self.shot_target)))
+        for i in self._blocking_balls():
+            self.blockers += self._blocks(i)
+        self._combine()
+
+    def _blocking_balls(self):
+        balls = np.nonzero(self.alive)[0]
+        return balls[balls != self.cue].tolist()
+
+    def _pot(self, shots):
+        #aim and quality per cell for the pots in shots, from the target's
+        #current position
+        tx, ty = self.x[self.shot_target[shots]], self.y[self.shot_target[shots]]
+        px, py = _pockets[self.shot_pocket[shots], 0], _pockets[self.shot_pocket[shots], 1]
+        pocket_distance = np.hypot(px - tx, py - ty)
+        ux, uy = (px - tx) / pocket_distance, (py - ty) / pocket_distance
+        gx, gy = tx - ux * ball_radius * 2, ty - uy * ball_radius * 2
+
+        aim_x = gx[:, None] - self.cell_x
+        aim_y = gy[:, None] - self.cell_y
+        self._aim_x[shots], self._aim_y[shots] = aim_x, aim_y
+        cue_distance = np.hypot(aim_x, aim_y)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            cos_cut = (aim_x * ux[:, None] + aim_y * uy[:, None]) / cue_distance
+            difficulty = cue_distance * pocket_distance[:, None] / cos_cut
+        on_table = ((gx >= self.xs[0]) & (gx <= self.xs[-1] + 1e-9)
+                    & (gy >= self.ys[0]) & (gy <= self.ys[-1] + 1e-9))
+        usable = (cos_cut >= math.cos(self.max_cut)) & on_table[:, None] & self.alive[self.shot_target[shots]][:, None]
+        self.quality[shots] = np.where(usable, np.minimum(1.0, EASY_SHOT / np.maximum(difficulty, 1e-9)), 0.0)
+
+    def _blocks(self, i):
+        #(pots, cells) 1 where ball i is in the cue ball's way from the cell
+        #to the pot's ghost ball (never for its own pots)
+        dx, dy = self._aim_x, self._aim_y
+        bx, by = self.x[i] - self.cell_x, self.y[i] - self.cell_y
+        t = np.clip((bx * dx + by * dy) / np.maximum(dx * dx + dy * dy, 1e-12), 0.0, 1.0)
+        ex, ey = bx - t * dx, by - t * dy
+        hit = (ex * ex + ey * ey) < (ball_radius * 2) ** 2
+        hit[self.shot_target == i] = False
+        return hit.astype(np.int64)
+
+    def _pocket_clear(self):
+        #per pot: nothing (but the target and the cue ball) between target and pocket
+        tx, ty = self.x[self.shot_target], self.y[self.shot_target]
+        dx = _pockets[self.shot_pocket, 0] - tx
+        dy = _pockets[self.shot_pocket, 1] - ty
+        others = np.array(self._blocking_balls(), dtype=np.int64)
+        bx = self.x[others][None, :] - tx[:, None]
+        by = self.y[others][None, :] - ty[:, None]
+        t = np.clip((bx * dx[:, None] + by * dy[:, None]) / (dx * dx + dy * dy)[:, None], 0.0, 1.0)
+        ex, ey = bx - t * dx[:, None], by - t * dy[:, None]
+        hit = ((ex * ex + ey * ey) < (ball_radius * 2) ** 2) & (others[None, :] != self.shot_target[:, None])
+        return ~hit.any(axis=1)
+
+    def _combine(self):
+        clear = (self.blockers == 0) & self._pocket_clear()[:, None]
+        best = np.where(clear, self.quality, 0.0).max(axis=0, initial=0.0)
+        self.values = np.where(self._open, best, 0.0)  #per cell in self.cells
+
+    @property
+    def grid(self):
+        #(rows, columns) quality over the whole table, for a full map
+        return self.values.reshape(len(self.ys), len(self.xs))
+
+    def cell(self, x, y):
+        #index in the full grid of the cell (x, y) is in, None off the table
+        col = int(round((x - self.xs[0]) / self.step))
+        row = int(round((y - self.ys[0]) / self.step))
+        if 0 <= row < len(self.ys) and 0 <= col < len(self.xs):
+            return row * len(self.xs) + col
+        return None
+
+    def value_at(self, x, y):
+        #quality of the cell (x, y) is in, 0 off the table or outside the map
+        k = self.cell(x, y)
+        if k is None:
+            return 0.0
+        pos = np.searchsorted(self.cells, k)
+        if pos < len(self.cells) and self.cells[pos] == k:
+            return self.values[pos].item()
+        return 0.0
+
+    def update(self, table, targets, cells=None):
+        """
+        The map for table (e.g. where a shot left the balls) and targets,
+        over cells (default: this map's). Made from this one if at most
+        MAX_MOVED balls moved or were potted and no new targets came up
+        (say, the 8-ball once the group is cleared), otherwise built from
+        scratch. Pots of balls that are no longer targets are dropped. The
+        cue ball never counts, the map is about where it goes.
+        """
+        changed = (table.alive != self.alive) | (table.alive & ((table.x != self.x) | (table.y != self.y)))
+        changed[self.cue] = False
+        moved = np.nonzero(changed)[0].tolist()
+        cells = self.cells if cells is None else np.asarray(cells, dtype=np.int64)
+        targets = np.asarray(targets, dtype=np.int64)
+        if len(moved) > MAX_MOVED or not set(targets.tolist()) <= set(self.targets.tolist()):
+            return LeaveMap(table, targets, self.max_cut, self.step, cells)
+        same_targets = set(targets.tolist()) == set(self.targets.tolist())
+        if not moved and same_targets and len(cells) == len(self.cells):
+            return self
+
+        new = object.__new__(LeaveMap)
+        new.__dict__.update(self.__dict__)
+        rows = np.nonzero(np.isin(self.shot_target, targets))[0]
+        cols = np.searchsorted(self.cells, cells)
+        new.targets = targets
+        new.shot_target, new.shot_pocket = self.shot_target[rows], self.shot_pocket[rows]
+        new.cells, new.cell_x, new.cell_y, new._open = cells, self.cell_x[cols], self.cell_y[cols], self._open[cols]
+        new.quality = self.quality[np.ix_(rows, cols)]
+        new.blockers = self.blockers[np.ix_(rows, cols)]
+        new._aim_x, new._aim_y = self._aim_x[np.ix_(rows, cols)], self._aim_y[np.ix_(rows, cols)]
+        for i in moved:
+            if self.alive[i]:
+                new.blockers -= new._blocks(i)
+        new.x, new.y, new.alive = table.x.copy(), table.y.copy(), table.alive.copy()
+
+        # pots of a moved target have a new ghost ball, so everything in
+        # their corridors is counted again
+        redo = np.nonzero(np.isin(new.shot_target, moved))[0]
+        if len(redo):
+            new._pot(redo)
+            new.blockers[redo] = 0
+            for i in new._blocking_balls():
+                new.blockers[redo] += new._blocks(i)[redo]
+        for i in moved:
+            if new.alive[i]:
+                counted = new._blocks(i)
+                counted[redo] = 0
+                new.blockers += counted
+        new._combine()
+        return new
+
+    def value_after(self, table, targets):
+        """
+        Quality of where the cue ball is on table for targets, the same as
+        update(table, targets).value_at() but only worked out for that one
+        cell.
+        """
+        k = self.cell(table.x[self.cue].item(), table.y[self.cue].item())
+        if k is None or not table.alive[self.cue]:
+            return 0.0
+        return self.update(table, targets, [k]).values[0].item()
+
+
+_maps = OrderedDict()  #(table_key, targets) -> LeaveMap, most recent last
+
+
+def leave_map(table, targets, max_cut=math.radians(80)):
+    #full LeaveMap for table and targets, cached so a turn's candidates
+    #share it. A new table is made from the latest map (see update()), so
+    #next turn's map only redoes the balls this turn's shot moved
+    key = (shot_cache.table_key(table), tuple(targets), max_cut)
+    leave = _maps.get(key)
+    if leave is None:
+        latest = next(reversed(_maps.values()), None)
+        if latest is not None and latest.max_cut == max_cut:
+            leave = latest.update(table, targets)
+        else:
+            leave = LeaveMap(table, targets, max_cut)
+        _maps[key] = leave
+        while len(_maps) > CACHE_SIZE:
+            _maps.popitem(last=False)
+    _maps.move_to_end(key)
+    return leave
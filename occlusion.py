@@ -0,0 +1,109 @@
+#line of sight index for the AI
+#every shot the AI looks at runs along a corridor (one ball wide on either
+#side) that starts at the cue ball or ends in a pocket, so the index keeps an
+#angular sweep around the cue ball and around each of the six pockets: the
+#directions from an origin are split into bins and every ball is filed
+#under the bins its shadow (the directions a ball rolling out of the origin
+#would hit it in) covers. A corridor query only has to look at the few
+#balls in one bin instead of every ball on the table.
+import math
+
+import numpy as np
+
+from physics import ball_radius, POCKETS
+
+
+class OcclusionIndex:
+    """
+    Built once per table state (the table is copied, later changes to it
+    are not seen). Origin 0 is the cue ball, 1 to 6 are the pockets in
+    POCKETS order. Sweeps are made the first time an origin is asked about.
+    """
+    def __init__(self, table, bins=128):
+        self.bins = bins
+        cue = int(np.nonzero(table.is_cue)[0][0])
+        self.cue = cue
+        self.x = table.x.copy()
+        self.y = table.y.copy()
+        self.live = table.alive.copy()
+        self.origins = [(self.x[cue].item(), self.y[cue].item())] + [(float(px), float(py)) for px, py in POCKETS]
+        self._sweeps = [None] * len(self.origins)
+
+    def _sweep(self, origin):
+        #bin -> ball indices whose shadow from this origin covers it
+        sweep = self._sweeps[origin]
+        if sweep is not None:
+            return sweep
+        ox, oy = self.origins[origin]
+        balls = np.nonzero(self.live)[0]
+        if origin == 0:
+            balls = balls[balls != self.cue]
+        dx = self.x[balls] - ox
+        dy = self.y[balls] - oy
+        distance = np.hypot(dx, dy)
+        centre = np.arctan2(dy, dx)
+        with np.errstate(divide="ignore"):
+            half = np.arcsin(np.minimum(ball_radius * 2 / distance, 1))
+        # a ball touching the origin is in the way whichever way you go
+        half[distance < ball_radius * 2] = math.pi
+
+        scale = self.bins / (2 * math.pi)
+        first = np.floor((centre - half) * scale).astype(np.int64)
+        last = np.floor((centre + half) * scale).astype(np.int64)
+        sweep = [[] for _ in range(self.bins)]
+        for i, start, end in zip(balls.tolist(), first.tolist(), last.tolist()):
+            for b in range(start, min(end + 1, start + self.bins)):
+                sweep[b % self.bins].append(i)
+        self._sweeps[origin] = sweep
+        return sweep
+
+    def clear(self, origin, x, y, ignore=()):
+        """
+        True if a ball centre could roll in a straight line from the origin
+        to (x, y) without touching any live ball other than those in ignore
+        (and the cue ball, which is never in the way of itself or, by the
+        time the object ball rolls, of a pocket path).
+        """
+        ox, oy = self.origins[origin]
+        dx, dy = x - ox, y - oy
+        length_sq = dx * dx + dy * dy
+        if length_sq == 0:
+            return True
+        b = int(math.floor(math.atan2(dy, dx) * self.bins / (2 * math.pi))) % self.bins
+        reach_sq = (ball_radius * 2) ** 2
+        for i in self._sweep(origin)[b]:
+            if i in ignore or i == self.cue:
+                continue
+            bx, by = self.x[i] - ox, self.y[i] - oy
+            t = min(max((bx * dx + by * dy) / length_sq, 0.0), 1.0)
+            ex, ey = bx - t * dx, by - t * dy
+            if ex * ex + ey * ey < reach_sq:
+                return False
+        return True
+
+    def segment_clear(self, x0, y0, x1, y1, ignore=()):
+        """
+        Same test as clear() for a leg that doesn't start at an origin (e.g.
+        between two cushions of a bank shot), checked against every live
+        ball instead of one bin.
+        """
+        others = self.live.copy()
+        others[self.cue] = False
+        others[list(ignore)] = False
+        dx, dy = x1 - x0, y1 - y0
+        length_sq = dx * dx + dy * dy
+        bx, by = self.x[others] - x0, self.y[others] - y0
+        if length_sq == 0:
+            t = 0.0
+        else:
+            t = np.clip((bx * dx + by * dy) / length_sq, 0.0, 1.0)
+        ex, ey = bx - t * dx, by - t * dy
+        return not (ex * ex + ey * ey < (ball_radius * 2) ** 2).any()
+
+    def cue_path_clear(self, x, y, ignore=()):
+        #cue ball to (x, y), e.g. a ghost ball position
+        return self.clear(0, x, y, ignore)
+
+    def pocket_path_clear(self, pocket, x, y, ignore=()):
+        #(x, y) (e.g. an object ball) to the pocket with index pocket
+        return self.clear(pocket + 1, x, y, ignore)
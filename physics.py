@@ -0,0 +1,647 @@
+#headless physics core for the pool game
+#no pygame in here so this can be imported by batch workers, the AI and
+#tools without opening a window or an audio device
+import math
+
+#table settings
+WIDTH, HEIGHT = 900, 500 # table area is laid out inside a window this size
+
+#colors of the balls (also used to tell the 8-ball apart)
+white = (255, 255, 255)
+red = (255, 0, 0)
+yellow = (255, 255, 0)
+blue = (0, 0, 255)
+black = (0, 0, 0)
+purple = (128, 0, 128)
+orange = (255, 165, 0)
+maroon = (128, 0, 0)
+green = (0, 128, 0)
+
+#constants
+ball_radius = 20 #balls radius
+TICK_RATE = 60 #physics ticks per second, velocities are in pixels per tick
+SUBSTEPS = 2 #physics steps per tick in run_game and every simulator, more = hard shots can't skip through balls
+friction = 0.99 #slows down the ball (fraction of speed kept per tick)
+cue_power_multiplier = 0.12 #controls the strength of the shots
+min_speed = 0.01 #stops the ball completely
+
+#table boundaries
+left_bound = 70
+right_bound = WIDTH - 70
+top_bound = 50
+BOTTOM_BOUND = HEIGHT - 50
+
+#pockets
+pocket_radius = 60
+POCKETS = [
+    #3 pockets on top
+    (left_bound, top_bound),
+    ((left_bound + right_bound) // 2, top_bound),
+    (right_bound, top_bound),
+    #3 pockets on bottom
+    (left_bound, BOTTOM_BOUND),
+    ((left_bound + right_bound) // 2, BOTTOM_BOUND),
+    (right_bound, BOTTOM_BOUND)
+]
+
+def rolled_distance(ticks):
+    #how far (in multiples of its starting velocity) a ball rolls in ticks,
+    #1 for a single tick. Using this instead of velocity * ticks means a tick
+    #split into substeps covers exactly the same distance as a whole one
+    return (1 - friction ** ticks) / (1 - friction)
+
+
+class FixedTimestep:
+    """
+    Turns real elapsed time into a whole number of fixed physics steps so the
+    game runs at the same speed (and shots end up the same) no matter how
+    fast frames are drawn. Each tick is split into substeps steps of dt ticks
+    (SUBSTEPS, the same steps the headless simulators take).
+    """
+    def __init__(self, substeps=SUBSTEPS, max_ticks=8):
+        self.substeps = substeps
+        self.dt = 1 / substeps #length of one step in ticks
+        self.max_ticks = max_ticks #most ticks caught up in one frame
+        self.accumulator = 0.0 #ticks owed but not run yet
+
+    def steps(self, elapsed_ms):
+        #number of dt sized steps to run for elapsed_ms of real time
+        self.accumulator += elapsed_ms * TICK_RATE / 1000
+        ticks = int(self.accumulator)
+        self.accumulator -= ticks
+        if ticks > self.max_ticks:
+            # way behind (window dragged, debugger...), let the game slow
+            # down instead of trying to catch up all at once
+            ticks = self.max_ticks
+        return ticks * self.substeps
+
+#the ball itself (state + movement only, drawing lives in pool.py)
+class Ball:
+    def __init__(self, x, y, color, is_cue=False, is_striped=False):
+        self.x = x         #Balls X Position
+        self.y = y         #Balls Y Position
+        self.vx = 0        #Velocity in X direction
+        self.vy = 0        #Velocity in Y direction
+        self.color = color  #Color of ball
+        self.is_cue = is_cue #cue ball
+        self.is_striped = is_striped #striped ball
+        self.alive = True #still in game
+
+    def move(self, dt=1):
+        #dt is the step length in ticks, smaller steps (substeps) trace the
+        #same path but check walls and contacts more often
+        distance = rolled_distance(dt)
+        self.x += self.vx * distance
+        self.y += self.vy * distance
+
+        # Wall collisions
+        # Check left and right boundaries
+        if self.x - ball_radius < left_bound:
+            self.x = left_bound + ball_radius
+            self.vx *= -1
+        elif self.x + ball_radius > right_bound:
+            self.x = right_bound - ball_radius
+            self.vx *= -1
+
+        # Check top and bottom boundaries
+        if self.y - ball_radius < top_bound:
+            self.y = top_bound + ball_radius
+            self.vy *= -1
+        elif self.y + ball_radius > BOTTOM_BOUND:
+            self.y = BOTTOM_BOUND - ball_radius
+            self.vy *= -1
+
+        self.vx *= friction ** dt
+        self.vy *= friction ** dt
+        if abs(self.vx) < min_speed:
+            self.vx = 0
+        if abs(self.vy) < min_speed:
+            self.vy = 0
+
+
+#closed form lookahead for a single ball (no other balls, no pockets)
+#x and y never affect each other in Ball.move(), so each axis is solved on
+#its own: n steps of Ball.move(dt) roll x + vx * rolled_distance(n * dt), a
+#cushion puts the ball back on the cushion line and flips the velocity, and
+#every component snaps to zero on a step that only depends on its speed
+def _ticks_to_snap(speed, dt=1):
+    #step on which a velocity of this size drops below min_speed, 0 if still
+    if speed == 0:
+        return 0
+    decay = friction ** dt
+    ticks = max(int(math.floor(math.log(min_speed / speed) / math.log(decay))) + 1, 1)
+    # guard against log rounding right at the threshold
+    while ticks > 1 and speed * decay ** (ticks - 1) < min_speed:
+        ticks -= 1
+    while speed * decay ** ticks >= min_speed:
+        ticks += 1
+    return ticks
+
+
+def _ticks_to_cross(gap, dt=1):
+    #first step on which a ball has rolled further than gap velocities
+    if gap < 0:
+        return 1
+    remaining = 1 - gap * (1 - friction)
+    if remaining <= 0:
+        return math.inf
+    return max(int(math.floor(math.log(remaining) / (dt * math.log(friction)))) + 1, 1)
+
+
+def _roll_axis(pos, vel, low, high, ticks, dt=1):
+    #(position, velocity) along one axis after ticks steps of length dt,
+    #low/high are the lowest and highest centre positions the cushions allow
+    snap = _ticks_to_snap(abs(vel), dt)
+    while ticks > 0:
+        if low <= pos <= high:
+            if vel == 0:
+                break
+            wall = low if vel < 0 else high
+            bounce = _ticks_to_cross((wall - pos) / vel, dt)
+            run = min(ticks, snap)
+            if bounce <= run:
+                pos = wall
+                vel = -vel * friction ** (bounce * dt)
+                run = bounce
+            else:
+                pos += vel * rolled_distance(run * dt)
+                vel *= friction ** (run * dt)
+        else:
+            # starting past a cushion (e.g. the back of the rack), the next
+            # step gets clamped whichever way the ball is going
+            run = 1
+            pos += vel * rolled_distance(dt)
+            if pos < low:
+                pos = low
+                vel = -vel
+            elif pos > high:
+                pos = high
+                vel = -vel
+            vel *= friction ** dt
+        ticks -= run
+        snap -= run
+        if snap <= 0:
+            vel = 0
+    return pos, vel
+
+
+def ticks_to_rest(ball, dt=1):
+    #number of Ball.move(dt) steps until both velocity components have
+    #snapped to zero (ticks for the default dt=1)
+    return max(_ticks_to_snap(abs(ball.vx), dt), _ticks_to_snap(abs(ball.vy), dt))
+
+
+def state_at(ball, ticks, dt=1):
+    """
+    (x, y, vx, vy) of a lone ball after ticks steps of Ball.move(dt),
+    bouncing off the cushions, without stepping it. Matches stepping up to
+    floating point rounding, pass dt=1 / SUBSTEPS for the game's steps.
+    """
+    x, vx = _roll_axis(ball.x, ball.vx, left_bound + ball_radius, right_bound - ball_radius, ticks, dt)
+    y, vy = _roll_axis(ball.y, ball.vy, top_bound + ball_radius, BOTTOM_BOUND - ball_radius, ticks, dt)
+    return x, y, vx, vy
+
+
+def position_at(ball, ticks, dt=1):
+    return state_at(ball, ticks, dt)[:2]
+
+
+def stop_position(ball, dt=1):
+    #where a lone ball stepped with Ball.move(dt) comes to rest
+    return position_at(ball, ticks_to_rest(ball, dt), dt)
+
+
+#ghost path: reflecting a straight line off the cushions is the same as
+#drawing it straight across mirrored copies of the table and folding it back,
+#so the cushion hits along each axis are evenly spaced and come out in
+#closed form
+def _fold(u, width):
+    #position on the table of a point u along the unfolded axis
+    u = u % (2 * width)
+    return u if u <= width else 2 * width - u
+
+
+def _axis_hits(pos, direction, low, high, length, bounces):
+    #distances along the line at which the first bounces cushions of one axis
+    #are reached (within length)
+    width = high - low
+    if direction > 0:
+        first = (high - pos) / direction
+    elif direction < 0:
+        first = (pos - low) / -direction
+    else:
+        return []
+    spacing = width / abs(direction)
+    hits = [first + k * spacing for k in range(bounces)]
+    return [t for t in hits if t < length]
+
+
+def cushion_path(x, y, angle, length, bounces=3):
+    """
+    Points (start, each cushion bounce, end) of a ball centre rolling from
+    (x, y) along angle for length pixels, reflecting off the cushions up to
+    bounces times. The path stops early where the centre enters a pocket.
+    Worked out on the mirrored table instead of stepping, so the cost only
+    depends on the number of bounces.
+    """
+    low_x, high_x = left_bound + ball_radius, right_bound - ball_radius
+    low_y, high_y = top_bound + ball_radius, BOTTOM_BOUND - ball_radius
+    x = min(max(x, low_x), high_x)
+    y = min(max(y, low_y), high_y)
+    dir_x = math.cos(angle)
+    dir_y = math.sin(angle)
+
+    # a corner is one bounce on both axes at once
+    hits = sorted(set(_axis_hits(x, dir_x, low_x, high_x, length, bounces)
+                      + _axis_hits(y, dir_y, low_y, high_y, length, bounces)))[:bounces]
+    if len(hits) < bounces:
+        hits.append(length)
+
+    width, height = high_x - low_x, high_y - low_y
+    points = [(x, y)]
+    for t in hits:
+        point = (low_x + _fold(x - low_x + dir_x * t, width),
+                 low_y + _fold(y - low_y + dir_y * t, height))
+
+        # cut the leg short if it runs into a pocket
+        start_x, start_y = points[-1]
+        leg_x, leg_y = point[0] - start_x, point[1] - start_y
+        soonest = None
+        for px, py in POCKETS:
+            s = _touch_time(start_x - px, start_y - py, leg_x, leg_y, pocket_radius)
+            if s is not None and (soonest is None or s < soonest):
+                soonest = s
+        if soonest is not None:
+            points.append((start_x + leg_x * soonest, start_y + leg_y * soonest))
+            break
+        points.append(point)
+    return points
+
+
+def _record_first_hit(b1, b2, i, j, cue_ball_in_hand, collision_info):
+    #fill in collision_info the first time the cue ball touches another ball
+    if collision_info is None or collision_info.get("first_hit") is not None:
+        return
+    cue_ball = None
+    other = None
+    hit_index = None
+
+    if b1.is_cue and not cue_ball_in_hand:
+        cue_ball = b1
+        other = b2
+        hit_index = j
+    elif b2.is_cue and not cue_ball_in_hand:
+        cue_ball = b2
+        other = b1
+        hit_index = i
+
+    if cue_ball is not None and other is not None and other.alive:
+        # what type of ball was hit first?
+        if other.color == black:
+            collision_info["first_hit"] = "8ball"
+        elif other.is_striped:
+            collision_info["first_hit"] = "stripes"
+        else:
+            collision_info["first_hit"] = "solids"
+
+        # extra info for prediction line
+        collision_info["hit_pos"] = (cue_ball.x, cue_ball.y)
+        collision_info["hit_ball_index"] = hit_index
+
+
+def check_collisions(balls, cue_ball_in_hand=False, collision_info=None):
+    for i in range(len(balls)):
+        # If cue ball is in hand, skip checking it against other balls
+        if cue_ball_in_hand and i == 0:
+            continue
+
+        for j in range(i + 1, len(balls)):
+            b1 = balls[i]
+            b2 = balls[j]
+
+            if not b1.alive or not b2.alive:
+                continue
+
+            dx = b2.x - b1.x
+            dy = b2.y - b1.y
+            distance = math.hypot(dx, dy)
+
+            if distance < ball_radius * 2:
+                # Collision detected
+
+                # track first ball hit by cue ball this turn
+                _record_first_hit(b1, b2, i, j, cue_ball_in_hand, collision_info)
+
+                # Resolve overlap
+                overlap = ball_radius * 2 - distance
+                angle = math.atan2(dy, dx)
+
+                # Move balls apart
+                b1.x -= math.cos(angle) * overlap / 2
+                b1.y -= math.sin(angle) * overlap / 2
+                b2.x += math.cos(angle) * overlap / 2
+                b2.y += math.sin(angle) * overlap / 2
+
+                # Resolve velocity (Elastic collision)
+                # Normal vector
+                nx = math.cos(angle)
+                ny = math.sin(angle)
+
+                # Tangent vector
+                tx = -ny
+                ty = nx
+
+                # Dot product tangent
+                dpTan1 = b1.vx * tx + b1.vy * ty
+                dpTan2 = b2.vx * tx + b2.vy * ty
+
+                # Dot product normal
+                dpNorm1 = b1.vx * nx + b1.vy * ny
+                dpNorm2 = b2.vx * nx + b2.vy * ny
+
+                # Conservation of momentum in 1D
+                m1 = (dpNorm1 * (1 - 1) + 2 * 1 * dpNorm2) / (1 + 1) # Mass is 1
+                m2 = (dpNorm2 * (1 - 1) + 2 * 1 * dpNorm1) / (1 + 1)
+
+                # Update velocities
+                b1.vx = tx * dpTan1 + nx * m1
+                b1.vy = ty * dpTan1 + ny * m1
+                b2.vx = tx * dpTan2 + nx * m2
+                b2.vy = ty * dpTan2 + ny * m2
+
+def check_pockets(balls):
+    potted_info = []
+    for ball in balls:
+        if not ball.alive:
+            continue
+
+        for pocket in POCKETS:
+            px, py = pocket
+            dist = math.hypot(ball.x - px, ball.y - py)
+
+            if dist < pocket_radius:
+                # Ball in pocket
+                potted_info.append(_pot(ball))
+    return potted_info
+
+
+def _pot(ball):
+    #take a ball that reached a pocket off the table, returns its label
+    ball.alive = False
+    if ball.is_cue:
+        # Move cue ball off screen instead of resetting, out of play until
+        # it is given back as ball in hand (otherwise the cushion clamp puts
+        # it back by the top left pocket and it gets potted again)
+        ball.x = -1000
+        ball.y = -1000
+        ball.vx = 0
+        ball.vy = 0
+        return "cue"
+    if ball.color == black:
+        return "8ball"
+    elif ball.is_striped:
+        return "stripe"
+    else:
+        return "solid"
+
+
+#swept (continuous) collision detection
+#Ball.move() and check_collisions() only look at where balls are at the end
+#of each step, so a fast enough ball can jump over another ball, a pocket or
+#the corner of a cushion. Inside a step every ball moves in a straight line
+#(x + vx * rolled_distance(dt) * s for s from 0 to 1), so the exact fraction
+#of the step at which two balls touch, or a ball reaches a cushion or pocket,
+#is the root of a quadratic (or linear) equation.
+def _touch_time(dx, dy, wx, wy, reach, limit=1):
+    #first s in [0, limit] at which (dx, dy) + s * (wx, wy) comes within
+    #reach of the origin, None if it doesn't. Already inside counts as 0
+    #while still closing in
+    b = dx * wx + dy * wy
+    c = dx * dx + dy * dy - reach * reach
+    if b >= 0:
+        return None
+    if c <= 0:
+        return 0.0
+    a = wx * wx + wy * wy
+    disc = b * b - a * c
+    if disc < 0:
+        return None
+    s = c / (-b + math.sqrt(disc))  # same root as (-b - sqrt(disc)) / a, without the cancellation
+    return s if s <= limit else None
+
+
+def ball_contact_time(b1, b2, dt=1, limit=1):
+    #fraction of a dt long step at which two balls first touch, or None
+    distance = rolled_distance(dt)
+    return _touch_time(b2.x - b1.x, b2.y - b1.y,
+                       (b2.vx - b1.vx) * distance, (b2.vy - b1.vy) * distance,
+                       ball_radius * 2, limit)
+
+
+def wall_contact_time(ball, dt=1, limit=1):
+    """
+    (fraction of a dt long step, "x" or "y") at which the ball reaches the
+    first cushion it is heading for, or None. A ball already past a cushion
+    (like the back of the rack) counts as touching it at 0.
+    """
+    distance = rolled_distance(dt)
+    soonest = None
+    for axis, pos, vel, low, high in (("x", ball.x, ball.vx, left_bound, right_bound),
+                                      ("y", ball.y, ball.vy, top_bound, BOTTOM_BOUND)):
+        if pos - ball_radius < low or pos + ball_radius > high:
+            return (0.0, axis)
+        if vel < 0:
+            s = (low + ball_radius - pos) / (vel * distance)
+        elif vel > 0:
+            s = (high - ball_radius - pos) / (vel * distance)
+        else:
+            continue
+        s = max(s, 0.0)
+        if s <= limit and (soonest is None or s < soonest[0]):
+            soonest = (s, axis)
+    return soonest
+
+
+def pocket_contact_time(ball, dt=1, limit=1):
+    #fraction of a dt long step at which the ball's centre enters a pocket
+    #(0 if it is already in one), or None
+    distance = rolled_distance(dt)
+    soonest = None
+    for px, py in POCKETS:
+        if math.hypot(ball.x - px, ball.y - py) < pocket_radius:
+            return 0.0
+        s = _touch_time(ball.x - px, ball.y - py, ball.vx * distance, ball.vy * distance, pocket_radius, limit)
+        if s is not None and (soonest is None or s < soonest):
+            soonest = s
+    return soonest
+
+
+def swept_step(balls, dt=1, cue_ball_in_hand=False, collision_info=None, max_events=1000):
+    """
+    One physics step (collisions, pockets and Ball.move() in one go) with
+    swept contacts instead of overlap checks, so no shot is too fast to hit
+    what is in its way. The step is advanced from one contact to the next:
+    every ball rolls to the moment of the contact, the two balls exchange
+    velocity along the line between them (or the ball bounces off the cushion
+    or drops into the pocket) and the rest of the step carries on from there.
+    Cushions reflect the ball instead of clamping it, so no distance is lost.
+    collision_info is filled in like check_collisions() does and the potted
+    list is returned like check_pockets(). Pockets are skipped while the cue
+    ball is in hand, like run_game does.
+    Meant for headless simulation with long steps or very hard shots, the
+    game itself keeps the per-tick overlap checks. max_events caps the
+    contacts handled in one step, anything left just rolls to the end of it.
+    """
+    distance = rolled_distance(dt)
+    potted_info = []
+    left = 1.0  # fraction of the step still to go
+    potted = set()  # off the table for the rest of this step
+    for _ in range(max_events):
+        live = [i for i, ball in enumerate(balls) if ball.alive and i not in potted]
+        soonest = left
+        event = None
+        for a, i in enumerate(live):
+            b1 = balls[i]
+            if not cue_ball_in_hand or i != 0:
+                for j in live[a + 1:]:
+                    s = ball_contact_time(b1, balls[j], dt, soonest)
+                    if s is not None and (event is None or s < soonest):
+                        soonest, event = s, ("ball", i, j)
+            hit = wall_contact_time(b1, dt, soonest)
+            if hit is not None and (event is None or hit[0] < soonest):
+                soonest, event = hit[0], ("wall", i, hit[1])
+            if not cue_ball_in_hand:
+                s = pocket_contact_time(b1, dt, soonest)
+                if s is not None and (event is None or s < soonest):
+                    soonest, event = s, ("pocket", i, None)
+        if event is None:
+            break
+
+        for i in live:
+            balls[i].x += balls[i].vx * distance * soonest
+            balls[i].y += balls[i].vy * distance * soonest
+        left -= soonest
+
+        kind, i, other = event
+        ball = balls[i]
+        if kind == "ball":
+            _record_first_hit(ball, balls[other], i, other, cue_ball_in_hand, collision_info)
+            _bounce(ball, balls[other])
+        elif kind == "wall":
+            _cushion(ball, other)
+        else:
+            potted_info.append(_pot(ball))
+            potted.add(i)
+
+    # nothing else happens in the rest of the step (or max_events ran out)
+    for i, ball in enumerate(balls):
+        if not ball.alive or i in potted:
+            continue
+        ball.x += ball.vx * distance * left
+        ball.y += ball.vy * distance * left
+        ball.vx *= friction ** dt
+        ball.vy *= friction ** dt
+        if abs(ball.vx) < min_speed:
+            ball.vx = 0
+        if abs(ball.vy) < min_speed:
+            ball.vy = 0
+    return potted_info
+
+
+def _cushion(ball, axis):
+    #put a ball that reached (or sits past) a cushion on the cushion line and
+    #send it back in, a ball that is already heading back in keeps going
+    if axis == "x":
+        pos, vel, low, high = ball.x, ball.vx, left_bound + ball_radius, right_bound - ball_radius
+    else:
+        pos, vel, low, high = ball.y, ball.vy, top_bound + ball_radius, BOTTOM_BOUND - ball_radius
+    if pos < (low + high) / 2:
+        pos = max(pos, low)
+        if vel < 0:
+            vel *= -1
+    else:
+        pos = min(pos, high)
+        if vel > 0:
+            vel *= -1
+    if axis == "x":
+        ball.x, ball.vx = pos, vel
+    else:
+        ball.y, ball.vy = pos, vel
+
+
+def _bounce(b1, b2):
+    #equal mass elastic collision of two touching (or overlapping) balls
+    dx = b2.x - b1.x
+    dy = b2.y - b1.y
+    gap = math.hypot(dx, dy)
+    if gap == 0:
+        return
+    nx = dx / gap
+    ny = dy / gap
+
+    # push overlapping balls apart like check_collisions() does
+    overlap = ball_radius * 2 - gap
+    if overlap > 0:
+        b1.x -= nx * overlap / 2
+        b1.y -= ny * overlap / 2
+        b2.x += nx * overlap / 2
+        b2.y += ny * overlap / 2
+
+    # swap the velocity components along the normal
+    dpNorm1 = b1.vx * nx + b1.vy * ny
+    dpNorm2 = b2.vx * nx + b2.vy * ny
+    b1.vx += (dpNorm2 - dpNorm1) * nx
+    b1.vy += (dpNorm2 - dpNorm1) * ny
+    b2.vx += (dpNorm1 - dpNorm2) * nx
+    b2.vy += (dpNorm1 - dpNorm2) * ny
+
+
+def create_balls(ball_class=Ball):
+    #ball_class lets the pygame front end rack its drawable Ball subclass
+    balls = []
+    # Cue ball
+    balls.append(ball_class(WIDTH//4, HEIGHT//2, white, is_cue=True))
+
+    # 15 balls in triangle
+    start_x = 3 * WIDTH // 4
+    start_y = HEIGHT // 2
+    rows = 5
+
+    # Define the 14 object balls (excluding 8-ball)
+    # 7 Solids and 7 Stripes
+    # Colors: Yellow, Blue, Red, Purple, Orange, Green, Maroon
+    colors = [yellow, blue, red, purple, orange, green, maroon]
+    object_balls = []
+
+    # Add solids
+    for c in colors:
+        object_balls.append({'color': c, 'striped': False})
+    # Add stripes
+    for c in colors:
+        object_balls.append({'color': c, 'striped': True})
+
+    # Let's interleave them to mix solids and stripes
+    mixed_balls = []
+    for i in range(7):
+        mixed_balls.append(object_balls[i]) # Solid
+        mixed_balls.append(object_balls[i+7]) # Stripe
+
+    # We need to assign them to positions.
+    # Position (2, 1) is the 8-ball (Black, Solid).
+
+    ball_idx = 0
+    for col in range(rows):
+        for row in range(col + 1):
+            x = start_x + col * (ball_radius * 2 + 1)
+            y = start_y - (col * ball_radius) + (row * (ball_radius * 2 + 1))
+
+            if col == 2 and row == 1:
+                # 8-Ball
+                balls.append(ball_class(x, y, black, is_striped=False))
+            else:
+                # Other balls
+                props = mixed_balls[ball_idx]
+                balls.append(ball_class(x, y, props['color'], is_striped=props['striped']))
+                ball_idx += 1
+
+    return balls
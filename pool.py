@@ -2,60 +2,49 @@
 import pygame
 import math
 import random
-
-#pygame is intiated
-pygame.init()
-pygame.mixer.init()
+from collections import OrderedDict
+
+#headless physics core (table constants, balls, collisions, pockets, rack)
+import physics
+from physics import (
+    WIDTH, HEIGHT,
+    white, red, yellow, black,
+    ball_radius, friction, cue_power_multiplier,
+    left_bound, right_bound, top_bound, BOTTOM_BOUND,
+    pocket_radius, POCKETS,
+    FixedTimestep,
+)
+from table_state import TableState
+from preview import ShotPreview
+import shot_cache
+from ai_search import ShotSearch
+from free_space import FreeSpace
+from ai_player import get_ai_shot, ai_place_ball
+from rules import resolve_turn
+from break_book import load_book
 
 #Visuals:
 
-#basic settings
-WIDTH, HEIGHT = 900, 500 # window size
-screen = pygame.display.set_mode((WIDTH, HEIGHT))
-pygame.display.set_caption("2D Pool Game_ECE160") #title of game
-clock = pygame.time.Clock() #creates a clocked controled by FPS
+#basic settings, the window and clock are made by init_display() in main()
+#so importing this module (e.g. in an AI worker process) opens nothing
+screen = None
+clock = None #creates a clocked controled by FPS
 FPS = 60
+AI_WORKERS = None #processes the hard AI searches shots with (None = every core, 0 = a background thread)
+AI_TIME_LIMIT = 1.0 #seconds the hard AI thinks before it shoots (and ShotSearch.best_shot() may take)
+AI_DEPTH = 2 #shots the hard AI looks ahead (1 = only the shot it is taking)
 
 #colors
 table_boarder = (50, 50, 50) #sets the boarder
-#color of the balls
 table_color = (0, 100, 200) # Blue table
-green = (0, 128, 0)
-white = (255, 255, 255)
-red = (255, 0, 0)
-yellow = (255, 255, 0)
-blue = (0, 0, 255)
-black = (0, 0, 0)
-purple = (128, 0, 128)
-orange = (255, 165, 0)
-maroon = (128, 0, 0)
 gray = (128, 128, 128)
 light_blue = (173, 216, 230)  # for prediction lines
+PREDICTION_CACHE_SIZE = 32 #aim lines kept for recent (angle, power, table) keys
+PREDICTION_BOUNCES = 3 #cushions the aim line reflects off
+PREDICTION_ANGLE_STEP = 0.0005 #aim angle is rounded to this (radians), under 0.5px at the line end
+PREVIEW_POWER_STEP = 0.5 #power (percent) is rounded to this for the aim lines and physics preview
+PREVIEW_BUDGET = 0.004 #seconds per frame spent simulating the physics preview
 
-#constants
-ball_radius = 20 #balls radius
-friction = 0.99 #slows down the ball
-cue_power_multiplier = 0.12 #controls the strength of the shots
-min_speed = 0.01 #stops the ball completely
-
-#table boundaries
-left_bound = 70
-right_bound = WIDTH - 70 
-top_bound = 50 
-BOTTOM_BOUND = HEIGHT - 50
-
-#pockets 
-pocket_radius = 60
-POCKETS = [
-    #3 pockets on top
-    (left_bound, top_bound),
-    ((left_bound + right_bound) // 2, top_bound),
-    (right_bound, top_bound),
-    #3 pockets on bottom
-    (left_bound, BOTTOM_BOUND),
-    ((left_bound + right_bound) // 2, BOTTOM_BOUND),
-    (right_bound, BOTTOM_BOUND)
-]
 
 #confetti class for winner
 class Confetti:
@@ -100,17 +89,8 @@ class Confetti:
 
 #th balls
 
-#the ball itself 
-class Ball: 
-    def __init__(self, x, y, color, is_cue=False, is_striped=False):
-        self.x = x         #Balls X Position
-        self.y = y         #Balls Y Position
-        self.vx = 0        #Velocity in X direction
-        self.vy = 0        #Velocity in Y direction
-        self.color = color  #Color of ball
-        self.is_cue = is_cue #cue ball
-        self.is_striped = is_striped #striped ball
-        self.alive = True #still in game
+#the ball itself (position, velocity and movement come from physics.Ball)
+class Ball(physics.Ball):
 
 #draws the balls
     def draw(self, screen):
@@ -138,37 +118,9 @@ class Ball:
         else:
             pygame.draw.circle(screen, self.color, (int(self.x), int(self.y)), ball_radius)
 
-    def move(self):
-        self.x += self.vx
-        self.y += self.vy
-        
-        # Wall collisions
-        # Check left and right boundaries
-        if self.x - ball_radius < left_bound:
-            self.x = left_bound + ball_radius
-            self.vx *= -1
-        elif self.x + ball_radius > right_bound:
-            self.x = right_bound - ball_radius
-            self.vx *= -1
-            
-        # Check top and bottom boundaries
-        if self.y - ball_radius < top_bound:
-            self.y = top_bound + ball_radius
-            self.vy *= -1
-        elif self.y + ball_radius > BOTTOM_BOUND:
-            self.y = BOTTOM_BOUND - ball_radius
-            self.vy *= -1
-
-        self.vx *= friction
-        self.vy *= friction
-        if abs(self.vx) < min_speed:
-            self.vx = 0
-        if abs(self.vy) < min_speed:
-            self.vy = 0
-
 #Cue
 class Cue:
-    def __init__(self, ball):
+    def __init__(self, ball, timestep=None):
         self.ball = ball
         self.angle = 0
         self.power = 0
@@ -176,6 +128,9 @@ class Cue:
         self.is_striking = False
         self.strike_progress = 0
         self.max_pullback = 200
+        # (aim step, power step, table version) -> prediction lines, most recent last
+        self.prediction_cache = OrderedDict()
+        self.preview = ShotPreview(cache=shot_cache.outcomes, timestep=timestep)
 
     def update(self, mouse_pos):
         if not self.is_striking:
@@ -238,37 +193,122 @@ class Cue:
             text = font.render(f"Power: {int(self.power)}%", True, (255, 255, 255))
             screen.blit(text, (self.ball.x + 20, self.ball.y + 20))
 
-    def draw_prediction(self, screen, balls):
+    def draw_prediction(self, screen, balls, table=None):
         """
         Draw a prediction:
-        - A light blue line showing where the cue ball will travel
+        - A light blue line showing where the cue ball will travel, reflected off
+          the cushions, as far as the shot power rolls it
         - A second line showing the approximate direction the first object ball will go
-        This uses simple geometry, not a heavy physics simulation.
+        from simple geometry. With table (the TableState the balls live on) the
+        lines are cached per rounded aim angle, power and table.version, and a
+        full physics preview of the shot is worked on a few ms per frame. Once
+        it has finished for the current aim its paths are drawn instead of the
+        straight lines.
         """
         cue_ball = self.ball
         if not cue_ball.alive or self.power <= 0:
             return
 
-        start_x = cue_ball.x
-        start_y = cue_ball.y
+        if table is None:
+            force = (self.power / 100) * 15
+            lines = self.prediction_lines(balls, self.angle, force / (1 - friction))
+        else:
+            step = round(self.angle / PREDICTION_ANGLE_STEP)
+            power_step = round(self.power / PREVIEW_POWER_STEP)
+            angle = step * PREDICTION_ANGLE_STEP
+            force = (power_step * PREVIEW_POWER_STEP / 100) * 15  # same as calculate_velocity()
+            key = (step, power_step, table.version)
+            self.preview.aim(key, table, math.cos(angle) * force, math.sin(angle) * force)
+            if self.preview.work(PREVIEW_BUDGET):
+                self.draw_preview(screen, self.preview.result)
+                return
+
+            lines = self.prediction_cache.get(key)
+            if lines is None:
+                # a lone ball rolls force / (1 - friction) pixels in total
+                lines = self.prediction_lines(balls, angle, force / (1 - friction), table)
+                self.prediction_cache[key] = lines
+                if len(self.prediction_cache) > PREDICTION_CACHE_SIZE:
+                    self.prediction_cache.popitem(last=False)
+            else:
+                self.prediction_cache.move_to_end(key)
+
+        for start, end in lines:
+            pygame.draw.line(screen, light_blue, start, end, 2)
+
+    def draw_preview(self, screen, result):
+        #paths of every ball the simulated shot moved, with a ring where each
+        #one comes to rest (or drops)
+        for points in result["paths"].values():
+            pygame.draw.lines(screen, light_blue, False, points, 2)
+            end_x, end_y = points[-1]
+            pygame.draw.circle(screen, light_blue, (int(end_x), int(end_y)), ball_radius, 1)
+
+    def prediction_lines(self, balls, angle, length=800, table=None):
+        #the prediction as a list of (start, end) lines: the cue ball path
+        #(bouncing off up to PREDICTION_BOUNCES cushions, length pixels long)
+        #and, if it hits a ball, that ball's approximate outgoing direction.
+        #table (the TableState behind the balls) is read directly if given,
+        #going through the ball views costs more than the geometry
+        if table is not None:
+            xs, ys, alive = table.x.tolist(), table.y.tolist(), table.alive.tolist()
+        else:
+            xs, ys, alive = [b.x for b in balls], [b.y for b in balls], [b.alive for b in balls]
+        # skip the cue ball itself (index 0)
+        targets = [(xs[i], ys[i]) for i in range(1, len(balls)) if alive[i]]
+
+        path = physics.cushion_path(xs[0], ys[0], angle, length, PREDICTION_BOUNCES)
+
+        lines = []
+        hit_ball = None
+        for (start_x, start_y), (leg_end_x, leg_end_y) in zip(path, path[1:]):
+            leg_length = math.hypot(leg_end_x - start_x, leg_end_y - start_y)
+            if leg_length == 0:
+                continue
+            hit_t, hit_ball = self._first_hit(targets, start_x, start_y,
+                                              (leg_end_x - start_x) / leg_length,
+                                              (leg_end_y - start_y) / leg_length)
+            if hit_t is not None and hit_t < leg_length:
+                end_x = start_x + (leg_end_x - start_x) * hit_t / leg_length
+                end_y = start_y + (leg_end_y - start_y) * hit_t / leg_length
+                lines.append(((start_x, start_y), (end_x, end_y)))
+                break
+            hit_ball = None
+            lines.append(((start_x, start_y), (leg_end_x, leg_end_y)))
+
+        # If we hit a ball, its approximate outgoing direction
+        if hit_ball is not None:
+            # Collision point is (end_x, end_y)
+            # Normal from collision point to ball center
+            ball_x, ball_y = hit_ball
+            nx = ball_x - end_x
+            ny = ball_y - end_y
+            n_len = math.hypot(nx, ny)
+            if n_len != 0:
+                nx /= n_len
+                ny /= n_len
+
+                obj_start_x = ball_x
+                obj_start_y = ball_y
+                obj_end_x = obj_start_x + nx * 200
+                obj_end_y = obj_start_y + ny * 200
 
-        # Unit direction vector of the shot
-        dir_x = math.cos(self.angle)
-        dir_y = math.sin(self.angle)
+                lines.append(((obj_start_x, obj_start_y), (obj_end_x, obj_end_y)))
 
-        max_length = 800  # how far to draw if no ball is hit
+        return lines
 
+    def _first_hit(self, targets, start_x, start_y, dir_x, dir_y):
+        #(distance, (x, y)) of the first of the target ball centres a ray from
+        #(start_x, start_y) along the unit vector (dir_x, dir_y) runs into,
+        #(None, None) if it misses them all
         hit_t = None
         hit_ball = None
 
-        # Find the earliest collision between the cue path and any other ball
-        for b in balls[1:]:  # skip the cue ball itself (index 0)
-            if not b.alive:
-                continue
-
+        # Find the earliest collision between this leg and any other ball
+        for b in targets:
             # Vector from cue start to this ball center
-            cx = b.x - start_x
-            cy = b.y - start_y
+            cx = b[0] - start_x
+            cy = b[1] - start_y
 
             # Projection of that vector onto the shot direction
             proj = cx * dir_x + cy * dir_y
@@ -302,213 +342,11 @@ class Cue:
                 hit_t = t
                 hit_ball = b
 
-        # Compute end of cue prediction line
-        if hit_t is not None and hit_t < max_length:
-            end_x = start_x + dir_x * hit_t
-            end_y = start_y + dir_y * hit_t
-        else:
-            # No collision; just draw a long line
-            end_x = start_x + dir_x * max_length
-            end_y = start_y + dir_y * max_length
-
-        # 1) Draw cue ball path prediction
-        pygame.draw.line(
-            screen,
-            light_blue,
-            (start_x, start_y),
-            (end_x, end_y),
-            2,
-        )
-
-        # 2) If we hit a ball, draw its approximate outgoing direction
-        if hit_ball is not None:
-            # Collision point is (end_x, end_y)
-            # Normal from collision point to ball center
-            nx = hit_ball.x - end_x
-            ny = hit_ball.y - end_y
-            n_len = math.hypot(nx, ny)
-            if n_len != 0:
-                nx /= n_len
-                ny /= n_len
-
-                obj_start_x = hit_ball.x
-                obj_start_y = hit_ball.y
-                obj_end_x = obj_start_x + nx * 200
-                obj_end_y = obj_start_y + ny * 200
-
-                pygame.draw.line(
-                    screen,
-                    light_blue,
-                    (obj_start_x, obj_start_y),
-                    (obj_end_x, obj_end_y),
-                    2,
-                )
+        return hit_t, hit_ball
 
 
-def check_collisions(balls, cue_ball_in_hand=False, collision_info=None):
-    for i in range(len(balls)):
-        # If cue ball is in hand, skip checking it against other balls
-        if cue_ball_in_hand and i == 0:
-            continue
-            
-        for j in range(i + 1, len(balls)):
-            b1 = balls[i]
-            b2 = balls[j]
-            
-            if not b1.alive or not b2.alive:
-                continue
-
-            dx = b2.x - b1.x
-            dy = b2.y - b1.y
-            distance = math.hypot(dx, dy)
-
-            if distance < ball_radius * 2:
-                # Collision detected
-                
-                # track first ball hit by cue ball this turn
-                if collision_info is not None and collision_info.get("first_hit") is None:
-                    cue_ball = None
-                    other = None
-                    hit_index = None
-
-                    if b1.is_cue and not cue_ball_in_hand:
-                        cue_ball = b1
-                        other = b2
-                        hit_index = j
-                    elif b2.is_cue and not cue_ball_in_hand:
-                        cue_ball = b2
-                        other = b1
-                        hit_index = i
-
-                    if cue_ball is not None and other is not None and other.alive:
-                        # what type of ball was hit first?
-                        if other.color == black:
-                            collision_info["first_hit"] = "8ball"
-                        elif other.is_striped:
-                            collision_info["first_hit"] = "stripes"
-                        else:
-                            collision_info["first_hit"] = "solids"
-
-                        # extra info for prediction line
-                        collision_info["hit_pos"] = (cue_ball.x, cue_ball.y)
-                        collision_info["hit_ball_index"] = hit_index
-                
-                # Resolve overlap
-                overlap = ball_radius * 2 - distance
-                angle = math.atan2(dy, dx)
-                
-                # Move balls apart
-                b1.x -= math.cos(angle) * overlap / 2
-                b1.y -= math.sin(angle) * overlap / 2
-                b2.x += math.cos(angle) * overlap / 2
-                b2.y += math.sin(angle) * overlap / 2
-                
-                # Resolve velocity (Elastic collision)
-                # Normal vector
-                nx = math.cos(angle)
-                ny = math.sin(angle)
-                
-                # Tangent vector
-                tx = -ny
-                ty = nx
-                
-                # Dot product tangent
-                dpTan1 = b1.vx * tx + b1.vy * ty
-                dpTan2 = b2.vx * tx + b2.vy * ty
-                
-                # Dot product normal
-                dpNorm1 = b1.vx * nx + b1.vy * ny
-                dpNorm2 = b2.vx * nx + b2.vy * ny
-                
-                # Conservation of momentum in 1D
-                m1 = (dpNorm1 * (1 - 1) + 2 * 1 * dpNorm2) / (1 + 1) # Mass is 1
-                m2 = (dpNorm2 * (1 - 1) + 2 * 1 * dpNorm1) / (1 + 1)
-                
-                # Update velocities
-                b1.vx = tx * dpTan1 + nx * m1
-                b1.vy = ty * dpTan1 + ny * m1
-                b2.vx = tx * dpTan2 + nx * m2
-                b2.vy = ty * dpTan2 + ny * m2
-
-def check_pockets(balls):
-    potted_info = []
-    for ball in balls:
-        if not ball.alive:
-            continue
-            
-        for pocket in POCKETS:
-            px, py = pocket
-            dist = math.hypot(ball.x - px, ball.y - py)
-            
-            if dist < pocket_radius:
-                # Ball in pocket
-                if ball.is_cue:
-                    # Move cue ball off screen instead of resetting
-                    ball.x = -1000
-                    ball.y = -1000
-                    ball.vx = 0
-                    ball.vy = 0
-                    potted_info.append("cue")
-                else:
-                    ball.alive = False
-                    if ball.color == black:
-                        potted_info.append("8ball")
-                    elif ball.is_striped:
-                        potted_info.append("stripe")
-                    else:
-                        potted_info.append("solid")
-    return potted_info
-
 def create_balls():
-    balls = []
-    # Cue ball
-    balls.append(Ball(WIDTH//4, HEIGHT//2, white, is_cue=True))
-    
-    # 15 balls in triangle
-    start_x = 3 * WIDTH // 4
-    start_y = HEIGHT // 2
-    rows = 5
-    
-    # Define the 14 object balls (excluding 8-ball)
-    # 7 Solids and 7 Stripes
-    # Colors: Yellow, Blue, Red, Purple, Orange, Green, Maroon
-    colors = [yellow, blue, red, purple, orange, green, maroon]
-    object_balls = []
-    
-    # Add solids
-    for c in colors:
-        object_balls.append({'color': c, 'striped': False})
-    # Add stripes
-    for c in colors:
-        object_balls.append({'color': c, 'striped': True})
-        
-    # Simple shuffle by alternating or just using the list as is (it's mixed enough for now)
-    # Or we can just pop from it.
-    # Let's interleave them to mix solids and stripes
-    mixed_balls = []
-    for i in range(7):
-        mixed_balls.append(object_balls[i]) # Solid
-        mixed_balls.append(object_balls[i+7]) # Stripe
-    
-    # We need to assign them to positions.
-    # Position (2, 1) is the 8-ball (Black, Solid).
-    
-    ball_idx = 0
-    for col in range(rows):
-        for row in range(col + 1):
-            x = start_x + col * (ball_radius * 2 + 1)
-            y = start_y - (col * ball_radius) + (row * (ball_radius * 2 + 1))
-            
-            if col == 2 and row == 1:
-                # 8-Ball
-                balls.append(Ball(x, y, black, is_striped=False))
-            else:
-                # Other balls
-                props = mixed_balls[ball_idx]
-                balls.append(Ball(x, y, props['color'], is_striped=props['striped']))
-                ball_idx += 1
-            
-    return balls
+    return physics.create_balls(Ball)
 
 # Menu and AI Helpers
 
@@ -626,122 +464,6 @@ def menu():
         
         pygame.display.flip()
 
-def get_ai_shot(balls, difficulty, my_group):
-    cue_ball = balls[0]
-    
-    # Filter targets based on group
-    valid_targets = []
-    for b in balls[1:]:
-        if not b.alive: continue
-        
-        is_8ball = (b.color == black)
-        if is_8ball:
-            # Only target 8-ball if group is cleared (or if open table and no other choice? No, 8-ball is last)
-            # For simplicity, AI only targets 8-ball if it's the only thing left for them
-            # But we need to know if group is cleared.
-            # Let's count remaining balls for my_group
-            pass
-        else:
-            is_stripe = b.is_striped
-            if my_group == "solids" and not is_stripe:
-                valid_targets.append(b)
-            elif my_group == "stripes" and is_stripe:
-                valid_targets.append(b)
-            elif my_group is None: # Open table
-                valid_targets.append(b)
-    
-    # If no valid targets found (group cleared), target 8-ball
-    if not valid_targets:
-        for b in balls[1:]:
-            if b.alive and b.color == black:
-                valid_targets.append(b)
-                break
-    
-    if not valid_targets:
-        return 0, 0
-
-    target = random.choice(valid_targets)
-    dx = target.x - cue_ball.x
-    dy = target.y - cue_ball.y
-    angle = math.atan2(dy, dx)
-    
-    if difficulty == 'easy':
-        angle += random.uniform(-0.3, 0.3) # Significant error
-        power = random.uniform(30, 70)
-    else: # Hard
-        # Try to find a pocket for this target
-        best_pocket = None
-        min_dist = float('inf')
-        for pocket in POCKETS:
-            d = math.hypot(target.x - pocket[0], target.y - pocket[1])
-            if d < min_dist:
-                min_dist = d
-                best_pocket = pocket
-        
-        if best_pocket:
-            # Calculate ghost ball position
-            px, py = best_pocket
-            dx_tp = px - target.x
-            dy_tp = py - target.y
-            angle_tp = math.atan2(dy_tp, dx_tp)
-            
-            aim_x = target.x - math.cos(angle_tp) * (ball_radius * 2)
-            aim_y = target.y - math.sin(angle_tp) * (ball_radius * 2)
-            
-            dx_ca = aim_x - cue_ball.x
-            dy_ca = aim_y - cue_ball.y
-            angle = math.atan2(dy_ca, dx_ca)
-            power = random.uniform(70, 100)
-        else:
-            power = random.uniform(50, 90)
-
-    return angle, power
-
-def ai_place_ball(balls):
-    while True:
-        x = random.randint(left_bound + ball_radius, right_bound - ball_radius)
-        y = random.randint(top_bound + ball_radius, BOTTOM_BOUND - ball_radius)
-        valid = True
-        for ball in balls[1:]:
-            if ball.alive:
-                dist = math.hypot(x - ball.x, y - ball.y)
-                if dist < ball_radius * 2:
-                    valid = False
-                    break
-        if valid:
-            balls[0].x = x
-            balls[0].y = y
-            balls[0].vx = 0
-            balls[0].vy = 0
-            return
-
-def check_win_condition(balls, player_group):
-    
-    if player_group is None:
-        return False  # Can't win without an assigned group
-    
-    # Check if 8-ball (last ball in list) is pocketed
-    eight_ball = balls[-1]  # 8-ball is the last ball created
-    if eight_ball.alive:
-        return False  # 8-ball must be pocketed to win
-    
-    # Check if all player's balls are pocketed
-    for i, ball in enumerate(balls):
-        if i == 0:  # Skip cue ball
-            continue
-        if i == len(balls) - 1:  # Skip 8-ball (already checked)
-            continue
-            
-        # Check if this is one of the player's balls
-        if player_group == "solids" and not ball.is_striped:
-            if ball.alive:
-                return False  # Player still has solid balls on table
-        elif player_group == "stripes" and ball.is_striped:
-            if ball.alive:
-                return False  # Player still has striped balls on table
-    
-    return True  # All conditions met!
-
 def show_lose_screen(screen, loser_name):
     # display lose screen for the player who lost
     
@@ -880,9 +602,15 @@ def show_win_screen(screen, winner_name, confetti_particles):
     return "MENU"
 
 # Main Game Loop
-def run_game(config):
-    balls = create_balls()
-    cue = Cue(balls[0]) # Attach cue to the cue ball (first in list)
+def run_game(config, search=None):
+    # Ball state lives in arrays, balls are views onto the table rows
+    table = TableState.from_balls(create_balls())
+    balls = table.ball_views(Ball)
+
+    # Physics runs on its own fixed clock, a slow frame just runs more steps
+    # (physics.SUBSTEPS per tick, the same steps the AI and preview simulate)
+    timestep = FixedTimestep()
+    cue = Cue(balls[0], timestep) # Attach cue to the cue ball (first in list)
     
     # Game State
     player_turn = 1 # 1 or 2
@@ -910,12 +638,16 @@ def run_game(config):
     btn_menu = Button(10, 5, 100, 40, "Menu")
     btn_quit = Button(120, 5, 100, 40, "Quit")
     
-    # AI Timer
+    # AI Timer, counts frames up to a 1 second wait (the hard AI's think time)
     ai_timer = 0
+    ai_wait = FPS
+    if search is not None and config["difficulty"] == "hard":
+        ai_wait = max(1, round(search.time_limit * FPS))
+    ai_job = None # hard AI search running while the timer counts down
     
     running = True
     while running:
-        clock.tick(FPS)
+        elapsed = clock.tick(FPS)
         screen.fill(table_boarder) # Background
         
         # Draw table (blue rect)
@@ -989,15 +721,8 @@ def run_game(config):
 
                     if cue_ball_in_hand:
                         # Try to place ball
-                        # Check if valid placement (not colliding with others)
-                        can_place = True
-                        # Check collision with other balls
-                        for ball in balls[1:]: # Skip cue ball
-                            if ball.alive:
-                                dist = math.hypot(balls[0].x - ball.x, balls[0].y - ball.y)
-                                if dist < ball_radius * 2:
-                                    can_place = False
-                                    break
+                        # Check if valid placement (not colliding with others or over a pocket)
+                        can_place = FreeSpace(table).is_free(balls[0].x, balls[0].y)
                         if can_place:
                             cue_ball_in_hand = False
                             balls[0].vx = 0
@@ -1020,25 +745,33 @@ def run_game(config):
         # AI Logic
         if is_ai_turn and not shot_in_progress:
             # Check if balls are stopped
-            all_stopped = True
-            for ball in balls:
-                if ball.alive and (abs(ball.vx) > 0 or abs(ball.vy) > 0):
-                    all_stopped = False
-                    break
-            
-            if all_stopped:
+            if table.all_stopped():
+                # Determine AI Group
+                ai_group = None
+                if p1_group:
+                    ai_group = "stripes" if p1_group == "solids" else "solids"
+
                 if cue_ball_in_hand:
-                    ai_place_ball(balls)
+                    ai_place_ball(balls, table, config["difficulty"], ai_group)
                     cue_ball_in_hand = False
                 else:
+                    # Think while waiting: start the search as soon as the
+                    # balls stop and take its best shot so far when the
+                    # time limit is up
+                    if search is not None and config["difficulty"] == "hard":
+                        if ai_job is None or ai_job.version != table.version:
+                            if ai_job is not None:
+                                ai_job.cancel()
+                            ai_job = search.begin(table, ai_group)
+                        if ai_job is not None:
+                            ai_job.poll()
+
                     ai_timer += 1
-                    if ai_timer > 60: # Wait 1 second
-                        # Determine AI Group
-                        ai_group = None
-                        if p1_group:
-                            ai_group = "stripes" if p1_group == "solids" else "solids"
-                            
-                        angle, power = get_ai_shot(balls, config["difficulty"], ai_group)
+                    if ai_timer > ai_wait:
+                        angle, power = get_ai_shot(balls, config["difficulty"], ai_group, ai_job)
+                        if ai_job is not None:
+                            ai_job.cancel()
+                            ai_job = None
                         balls[0].vx = math.cos(angle) * (power * cue_power_multiplier)
                         balls[0].vy = math.sin(angle) * (power * cue_power_multiplier)
                         shot_in_progress = True
@@ -1052,136 +785,63 @@ def run_game(config):
             balls[0].vx = 0
             balls[0].vy = 0
         
-        # Physics Updates
-        check_collisions(balls, cue_ball_in_hand)
-        
-        if not cue_ball_in_hand:
-            potted = check_pockets(balls)
+        # Physics Updates (fixed timestep, independent of the frame rate)
+        for _ in range(timestep.steps(elapsed)):
+            potted = table.advance(cue_ball_in_hand, timestep.dt)
             if shot_in_progress:
                 potted_this_turn.extend(potted)
         
         # Check if all balls stopped
-        all_stopped = True
-        for ball in balls:
-            if ball.alive and (abs(ball.vx) > 0 or abs(ball.vy) > 0):
-                all_stopped = False
-                break
-        
-        if shot_in_progress and all_stopped:
+        if shot_in_progress and table.all_stopped():
             shot_in_progress = False
-            # Turn Logic
-            
-            # Analyze potted balls
-            potted_cue = "cue" in potted_this_turn
-            potted_8ball = "8ball" in potted_this_turn
-            potted_stripes = [x for x in potted_this_turn if x == "stripe"]
-            potted_solids = [x for x in potted_this_turn if x == "solid"]
-            
-            # Assign Groups if Open Table
-            if p1_group is None and not potted_cue and not potted_8ball:
-                if potted_solids and not potted_stripes:
-                    p1_group = "solids" if player_turn == 1 else "stripes"
-                elif potted_stripes and not potted_solids:
-                    p1_group = "stripes" if player_turn == 1 else "solids"
-            
+            # Turn Logic (rules.py, shared with the headless tournament)
+            turn = resolve_turn(potted_this_turn, player_turn, p1_group, balls)
+            p1_group = turn["p1_group"]
+
             # Scoring conditions
-            for p in potted_this_turn:
-                if p == "solid":
-                    if player_turn == 1:
-                        p1_score += 1
-                    else:
-                        p2_score += 1
-                
-                if p == "stripe":
-                    if player_turn == 1:
-                        p1_score += 1
-                    else:
-                        p2_score += 1
-            
-            # Determine if turn should switch
-            switch_turn = True
-            
-            if potted_cue:
-                switch_turn = True
+            if player_turn == 1:
+                p1_score += turn["scored"]
+            else:
+                p2_score += turn["scored"]
+
+            if turn["ball_in_hand"]:
                 cue_ball_in_hand = True
                 balls[0].alive = True
-            elif potted_8ball:
-                # check if cue ball and 8-ball were potted together - automatic loss
-                if potted_cue:
-                    loser_name = config["p1"] if player_turn == 1 else config["p2"]
-                    winner = 3 - player_turn
-                    winner_name = config["p1"] if winner == 1 else config["p2"]
-                    
-                    # Show brief game over message
-                    screen.fill(table_boarder)
-                    draw_text(screen, f"{loser_name} potted the cue ball with the 8-ball!", font, red, WIDTH // 2, HEIGHT // 2 - 20, center=True)
-                    draw_text(screen, f"{winner_name} wins!", font, yellow, WIDTH // 2, HEIGHT // 2 + 20, center=True)
-                    pygame.display.update()
-                    pygame.time.delay(3000)
-                    
-                    result = show_lose_screen(screen, loser_name)
-                    return result
-                
-                # Check if this is a legitimate win (all player's balls cleared)
-                current_player_group = None
-                if p1_group:
-                    if player_turn == 1:
-                        current_player_group = p1_group
-                    else:
-                        current_player_group = "stripes" if p1_group == "solids" else "solids"
-                
-                # check win condition
-                if current_player_group and check_win_condition(balls, current_player_group):
-                    # player wins!
-                    winner_name = config["p1"] if player_turn == 1 else config["p2"]
-                    
-                    # show win screen for winner
-                    result = show_win_screen(screen, winner_name, confetti_particles)
-                    return result
-                else:
-                    # potted 8-ball too early - current player loses
-                    loser_name = config["p1"] if player_turn == 1 else config["p2"]
-                    winner = 3 - player_turn
-                    winner_name = config["p1"] if winner == 1 else config["p2"]
-                    
-                    # Show brief game over message
-                    screen.fill(table_boarder)
-                    draw_text(screen, f"{loser_name} potted the 8-ball too early!", font, red, WIDTH // 2, HEIGHT // 2 - 20, center=True)
-                    draw_text(screen, f"{winner_name} wins!", font, yellow, WIDTH // 2, HEIGHT // 2 + 20, center=True)
-                    pygame.display.update()
-                    pygame.time.delay(3000)
-                    
-                    # show lose screen for the player who made the mistake
-                    result = show_lose_screen(screen, loser_name)
-                    return result
-            else:
-                # Check if current player potted their own ball
-                my_group = None
-                if p1_group:
-                    if player_turn == 1: my_group = p1_group
-                    else: my_group = "stripes" if p1_group == "solids" else "solids"
-                
-                if my_group == "solids":
-                    if potted_solids: switch_turn = False
-                elif my_group == "stripes":
-                    if potted_stripes: switch_turn = False
-                else: # Open Table
-                    if potted_solids or potted_stripes: switch_turn = False
-            
-            if switch_turn:
-                player_turn = 3 - player_turn
-            
-        # Update and Draw Balls
+            elif turn["winner"] == player_turn:
+                # player wins!
+                winner_name = config["p1"] if player_turn == 1 else config["p2"]
+
+                # show win screen for winner
+                result = show_win_screen(screen, winner_name, confetti_particles)
+                return result
+            elif turn["early_8ball"]:
+                # potted 8-ball too early - current player loses
+                loser_name = config["p1"] if player_turn == 1 else config["p2"]
+                winner_name = config["p1"] if turn["winner"] == 1 else config["p2"]
+
+                # Show brief game over message
+                screen.fill(table_boarder)
+                draw_text(screen, f"{loser_name} potted the 8-ball too early!", font, red, WIDTH // 2, HEIGHT // 2 - 20, center=True)
+                draw_text(screen, f"{winner_name} wins!", font, yellow, WIDTH // 2, HEIGHT // 2 + 20, center=True)
+                pygame.display.update()
+                pygame.time.delay(3000)
+
+                # show lose screen for the player who made the mistake
+                result = show_lose_screen(screen, loser_name)
+                return result
+
+            player_turn = turn["player_turn"]
+
+        # Draw Balls (moved in the physics update above)
         for ball in balls:
             if ball.alive:
-                ball.move()
                 ball.draw(screen)
             
         # Update and Draw Cue if cue ball is stopped
         if balls[0].vx == 0 and balls[0].vy == 0 and balls[0].alive and not cue_ball_in_hand and not is_ai_turn and not shot_in_progress:
             cue.update(mouse_pos)
             cue.draw(screen)
-            cue.draw_prediction(screen, balls)
+            cue.draw_prediction(screen, balls, table)
         
         # Update strike animation
         if cue.is_striking:
@@ -1203,16 +863,34 @@ def run_game(config):
     
     return "MENU"
 
+def init_display():
+    global screen, clock
+    #pygame is intiated
+    pygame.init()
+    pygame.mixer.init()
+    screen = pygame.display.set_mode((WIDTH, HEIGHT))
+    pygame.display.set_caption("2D Pool Game_ECE160") #title of game
+    clock = pygame.time.Clock()
+
 def main():
+    init_display()
+    search = None  # hard AI worker pool, kept warm from game to game
     while True:
         config = menu()
         if config is None:
             break
+
+        if config["mode"] == "ai" and config["difficulty"] == "hard" and search is None:
+            search = ShotSearch(config.get("ai_workers", AI_WORKERS), config.get("ai_time_limit", AI_TIME_LIMIT),
+                                depth=config.get("ai_depth", AI_DEPTH), book=load_book())
+            search.start()
         
-        result = run_game(config)
+        result = run_game(config, search)
         if result == "QUIT":
             break
-            
+
+    if search is not None:
+        search.close()
     pygame.quit()
 
 if __name__ == "__main__":
@@ -0,0 +1,122 @@
+#full physics shot preview, computed a slice at a time
+#the shot is simulated step by step inside a generator, with the game's
+#FixedTimestep substeps and the same collide / pocket / step(dt) order as
+#run_game, so the preview ends where the real shot will. work() runs it for a
+#fixed amount of time per frame, so a long shot takes a few frames to
+#preview instead of stalling one, and aiming somewhere else just drops the
+#unfinished run. It runs between frames on the game loop rather than in a
+#thread: pure Python physics would hold the GIL against the renderer anyway.
+import time
+
+import numpy as np
+
+from physics import FixedTimestep
+
+
+class ShotPreview:
+    def __init__(self, max_ticks=3000, sample_every=4, cache=None, timestep=None):
+        self.max_ticks = max_ticks
+        self.cache = cache  #optional shot_cache.ShotCache to share results through
+        self.timestep = timestep or FixedTimestep()  #the game's, for its substeps
+        self.sample_every = sample_every  #ticks between path points
+        self.key = None  #shot being (or last) asked for
+        self.result = None  #most recent finished preview
+        self.result_key = None
+        self._job = None
+        self._cache_key = None
+
+    def aim(self, key, table, vx, vy, cue_index=0):
+        """
+        Ask for a preview of the ball at cue_index being struck with (vx, vy)
+        on a copy of table. key identifies the shot (e.g. rounded angle and
+        power plus table.version): asking for the same key again does
+        nothing, a new one cancels the run in progress. With a cache a
+        preview finished earlier for the same table and shot is reused.
+        """
+        if key == self.key:
+            return
+        self.key = key
+        self._job = None
+        if key == self.result_key:
+            return
+        if self.cache is not None:
+            self._cache_key = self.cache.key(table, vx, vy, cue_index=cue_index,
+                                             substeps=self.timestep.substeps)
+            outcome = self.cache.get(self._cache_key)
+            if outcome is not None and "paths" in outcome:
+                self.result = outcome
+                self.result_key = key
+                return
+        self._job = self._simulate(table.copy(), vx, vy, cue_index)
+
+    def cancel(self):
+        self.key = None
+        self._job = None
+
+    def work(self, budget):
+        #run the current job for up to budget seconds, True once the
+        #result for the current key is ready
+        if self._job is not None:
+            deadline = time.perf_counter() + budget
+            try:
+                while time.perf_counter() < deadline:
+                    next(self._job)
+            except StopIteration as done:
+                self.result = done.value
+                self.result_key = self.key
+                self._job = None
+                if self.cache is not None:
+                    self.cache.put(self._cache_key, self.result)
+        return self.ready()
+
+    def ready(self):
+        return self.key is not None and self.result_key == self.key
+
+    def _simulate(self, table, vx, vy, cue_index):
+        """
+        Generator that plays the shot out one physics step per next() and
+        returns
+        {"paths": {ball index: [(x, y), ...]}, "potted": [...],
+         "collision_info": {...}, "ticks": n, "table": final TableState}
+        (a ShotCache outcome plus the paths) with a path for every ball that
+        moved. A potted ball's path ends over the pocket, a potted cue ball
+        is out of play like TableState.pocket() leaves it.
+        """
+        table.vx[cue_index] = vx
+        table.vy[cue_index] = vy
+        table.wake([cue_index])
+        collision_info = {"first_hit": None, "hit_pos": None, "hit_ball_index": None}
+        paths = [[point] for point in zip(table.x.tolist(), table.y.tolist())]
+        potted = []
+        substeps, dt = self.timestep.substeps, self.timestep.dt
+
+        step = 0
+        while step < self.max_ticks * substeps and not table.all_stopped():
+            step += 1
+            table.collide(False, collision_info)
+
+            falling = np.nonzero(table.pocketed())[0].tolist()
+            for i in falling:
+                paths[i].append((table.x[i].item(), table.y[i].item()))
+            potted += table.pocket()
+
+            table.step(dt)
+            if step % (self.sample_every * substeps) == 0:
+                moving = table.alive & ((table.vx != 0) | (table.vy != 0))
+                for i in np.nonzero(moving)[0].tolist():
+                    paths[i].append((table.x[i].item(), table.y[i].item()))
+            yield
+
+        # where everything still on the table ended up
+        for i in np.nonzero(table.alive)[0].tolist():
+            end = (table.x[i].item(), table.y[i].item())
+            if paths[i][-1] != end:
+                paths[i].append(end)
+
+        return {
+            "paths": {i: path for i, path in enumerate(paths) if len(path) > 1},
+            "potted": potted,
+            "collision_info": collision_info,
+            "ticks": -(-step // substeps),
+            "table": table,
+        }
@@ -0,0 +1,104 @@
+#8-ball rules (no pygame)
+#what a finished shot means for the game: group assignment, scoring, ball in
+#hand, whose turn it is and whether somebody won. run_game and the headless
+#tournament runner both go through resolve_turn(), so a simulated game is
+#played by exactly the same rules as one on screen.
+
+
+def other_group(group):
+    return "stripes" if group == "solids" else "solids"
+
+
+def player_group(p1_group, player):
+    #group of player 1 or 2, None while the table is open
+    if p1_group is None:
+        return None
+    return p1_group if player == 1 else other_group(p1_group)
+
+
+def check_win_condition(balls, player_group):
+
+    if player_group is None:
+        return False  # Can't win without an assigned group
+
+    # Check if 8-ball (last ball in list) is pocketed
+    eight_ball = balls[-1]  # 8-ball is the last ball created
+    if eight_ball.alive:
+        return False  # 8-ball must be pocketed to win
+
+    # Check if all player's balls are pocketed
+    for i, ball in enumerate(balls):
+        if i == 0:  # Skip cue ball
+            continue
+        if i == len(balls) - 1:  # Skip 8-ball (already checked)
+            continue
+
+        # Check if this is one of the player's balls
+        if player_group == "solids" and not ball.is_striped:
+            if ball.alive:
+                return False  # Player still has solid balls on table
+        elif player_group == "stripes" and ball.is_striped:
+            if ball.alive:
+                return False  # Player still has striped balls on table
+
+    return True  # All conditions met!
+
+
+def resolve_turn(potted, player_turn, p1_group, balls):
+    """
+    Apply the rules to a finished shot by player_turn (1 or 2) that potted
+    the labels in potted (check_pockets() format), with balls as they are
+    after it. Returns
+        {"p1_group": player 1's group afterwards,
+         "scored": points for the shooter,
+         "ball_in_hand": the cue ball was potted,
+         "player_turn": who shoots next,
+         "winner": None, or 1 / 2 once the 8-ball is down,
+         "early_8ball": the shooter lost by potting the 8-ball too early}
+    """
+    potted_cue = "cue" in potted
+    potted_8ball = "8ball" in potted
+    potted_stripes = "stripe" in potted
+    potted_solids = "solid" in potted
+
+    # Assign Groups if Open Table
+    if p1_group is None and not potted_cue and not potted_8ball:
+        if potted_solids and not potted_stripes:
+            p1_group = "solids" if player_turn == 1 else "stripes"
+        elif potted_stripes and not potted_solids:
+            p1_group = "stripes" if player_turn == 1 else "solids"
+
+    result = {
+        "p1_group": p1_group,
+        "scored": sum(1 for p in potted if p in ("solid", "stripe")),
+        "ball_in_hand": potted_cue,
+        "player_turn": 3 - player_turn,
+        "winner": None,
+        "early_8ball": False,
+    }
+
+    if potted_cue:
+        # scratch: opponent gets ball in hand (this comes first, even if the
+        # 8-ball went down on the same shot)
+        return result
+
+    if potted_8ball:
+        # legitimate win only once all the shooter's balls are cleared
+        if check_win_condition(balls, player_group(p1_group, player_turn)):
+            result["winner"] = player_turn
+        else:
+            result["winner"] = 3 - player_turn
+            result["early_8ball"] = True
+        return result
+
+    # Check if current player potted their own ball
+    my_group = player_group(p1_group, player_turn)
+    if my_group == "solids":
+        keep = potted_solids
+    elif my_group == "stripes":
+        keep = potted_stripes
+    else: # Open Table
+        keep = potted_solids or potted_stripes
+    if keep:
+        result["player_turn"] = player_turn
+    return result
@@ -0,0 +1,92 @@
+#shot outcome cache
+#the AI, the aim preview and any analysis end up resolving the same shot
+#from the same table many times. Outcomes are stored under a hash of the
+#table (positions and velocities rounded to a fine grid, alive flags) plus
+#the rounded cue velocity and the physics substeps it was played with, so asking again - later in the turn, or next
+#turn if nothing moved - is a dict lookup instead of a simulation.
+import hashlib
+from collections import OrderedDict
+
+import numpy as np
+
+from physics import SUBSTEPS
+from event_sim import resolve_shot, potted_in
+
+POSITION_STEP = 1e-3  #px, tables closer than this share an outcome
+VELOCITY_STEP = 1e-6  #px per tick
+
+
+def table_key(table):
+    #content hash of everything about the table that changes a shot
+    h = hashlib.blake2b(digest_size=16)
+    live = table.alive
+    for array, step in ((table.x, POSITION_STEP), (table.y, POSITION_STEP),
+                        (table.vx, VELOCITY_STEP), (table.vy, VELOCITY_STEP)):
+        h.update(np.where(live, np.round(array / step), 0).astype(np.int64).tobytes())
+    h.update(live.tobytes())
+    return h.digest()
+
+
+class ShotCache:
+    def __init__(self, max_entries=4096):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()  #key -> outcome, most recent last
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def key(self, table, vx, vy, cue_ball_in_hand=False, cue_index=0, substeps=SUBSTEPS):
+        return (table_key(table), cue_index, round(vx / VELOCITY_STEP), round(vy / VELOCITY_STEP),
+                cue_ball_in_hand, substeps)
+
+    def get(self, key):
+        outcome = self.entries.get(key)
+        if outcome is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.entries.move_to_end(key)
+        return outcome
+
+    def put(self, key, outcome):
+        self.entries[key] = outcome
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def resolve(self, table, vx, vy, cue_ball_in_hand=False, cue_index=0, substeps=SUBSTEPS):
+        """
+        Outcome of striking the ball at cue_index with (vx, vy):
+            {"table": final TableState, "potted": [...], "collision_info": {...}}
+        Resolved with event_sim.resolve_shot() (substeps physics steps per
+        tick, like run_game) the first time and looked up
+        after that. The outcome is shared, copy() the table before changing it.
+        """
+        key = self.key(table, vx, vy, cue_ball_in_hand, cue_index, substeps)
+        outcome = self.get(key)
+        if outcome is None:
+            start = table.copy()
+            start.vx[cue_index] = vx
+            start.vy[cue_index] = vy
+            start.wake([cue_index])
+            collision_info = {"first_hit": None, "hit_pos": None, "hit_ball_index": None}
+            final, events = resolve_shot(start, cue_ball_in_hand, collision_info, substeps=substeps)
+            outcome = {"table": final, "potted": potted_in(events), "collision_info": collision_info}
+            self.put(key, outcome)
+        return outcome
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {"hits": self.hits, "misses": self.misses, "entries": len(self.entries),
+                "hit_rate": self.hits / total if total else 0.0}
+
+    def clear(self):
+        self.entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+
+#shared by the AI and the aim preview
+outcomes = ShotCache()
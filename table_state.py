@@ -0,0 +1,421 @@
+#array backed table state for fast (headless) simulation
+#positions, velocities and alive flags live in contiguous numpy arrays
+#(struct of arrays) so a whole table can be stepped in one go instead of
+#calling Ball.move() once per ball
+#balls that have come to rest are put to sleep and skipped by step(),
+#collide() and pocket() until something touches them, so a frame costs
+#about as much as the number of moving balls
+import math
+
+import numpy as np
+
+from broadphase import SpatialHash
+from physics import (
+    Ball, black, ball_radius, friction, min_speed, rolled_distance,
+    left_bound, right_bound, top_bound, BOTTOM_BOUND,
+    pocket_radius, POCKETS,
+)
+
+#tables with more balls than this use the spatial hash to find nearby pairs
+BROADPHASE_MIN_BALLS = 64
+
+
+class TableState:
+    def __init__(self, count):
+        self.x = np.zeros(count)   #ball X positions
+        self.y = np.zeros(count)   #ball Y positions
+        self.vx = np.zeros(count)  #velocities in X direction
+        self.vy = np.zeros(count)  #velocities in Y direction
+        self.alive = np.ones(count, dtype=bool)  #still in game
+        self.is_cue = np.zeros(count, dtype=bool)
+        self.is_striped = np.zeros(count, dtype=bool)
+        self.colors = [None] * count
+        self.awake = np.ones(count, dtype=bool)  #not known to be at rest
+        self.moving_count = 0  #live balls with a non-zero velocity
+        self.version = 0  #goes up whenever a ball moves, is potted or is written to
+        self._rest_x = np.zeros(count)  #position after the last step, to
+        self._rest_y = np.zeros(count)  #tell if a still ball really settled
+        self._view_classes = {}
+        self._grid = None  #spatial hash, made on first use for big tables
+
+    def __len__(self):
+        return len(self.x)
+
+    @classmethod
+    def from_balls(cls, balls):
+        table = cls(len(balls))
+        for i, ball in enumerate(balls):
+            table.x[i] = ball.x
+            table.y[i] = ball.y
+            table.vx[i] = ball.vx
+            table.vy[i] = ball.vy
+            table.alive[i] = ball.alive
+            table.is_cue[i] = ball.is_cue
+            table.is_striped[i] = ball.is_striped
+            table.colors[i] = ball.color
+        table.wake()
+        return table
+
+    def copy(self):
+        table = TableState(len(self))
+        table.x[:] = self.x
+        table.y[:] = self.y
+        table.vx[:] = self.vx
+        table.vy[:] = self.vy
+        table.alive[:] = self.alive
+        table.is_cue[:] = self.is_cue
+        table.is_striped[:] = self.is_striped
+        table.colors = list(self.colors)
+        table.awake[:] = self.awake
+        table.moving_count = self.moving_count
+        table.version = self.version
+        table._rest_x[:] = self._rest_x
+        table._rest_y[:] = self._rest_y
+        return table
+
+    def wake(self, indices=None):
+        """
+        Mark balls (all of them by default) as awake. Anything that writes the
+        x, y, vx, vy or alive arrays directly (e.g. to strike the cue ball)
+        has to wake the balls it changed, views do this on their own.
+        """
+        if indices is None:
+            self.awake[:] = True
+        else:
+            self.awake[indices] = True
+        self.version += 1
+        self._count_moving()
+
+    def _count_moving(self):
+        #sleeping balls never move, so only the awake ones need a look
+        awake = self.awake & self.alive
+        self.moving_count = int(np.count_nonzero(awake & ((self.vx != 0) | (self.vy != 0))))
+
+    def ball_views(self, ball_class=Ball):
+        """
+        Return one Ball-like object per row. Reading or writing x, y, vx, vy or
+        alive on a view goes straight to the arrays, so the game can keep using
+        the balls list while the table is stepped with step().
+        ball_class is mixed in so subclasses (e.g. the drawable pool.Ball) work.
+        """
+        view_class = self._view_classes.get(ball_class)
+        if view_class is None:
+            view_class = type(ball_class.__name__, (BallView, ball_class), {})
+            self._view_classes[ball_class] = view_class
+        return [view_class(self, i) for i in range(len(self))]
+
+    def step(self, dt=1):
+        """Vectorized Ball.move(dt) for every awake ball (same results as the loop)."""
+        idx = np.nonzero(self.awake & self.alive)[0]
+        if len(idx) == 0:
+            return
+        x, y, vx, vy = self.x[idx], self.y[idx], self.vx[idx], self.vy[idx]
+
+        distance = rolled_distance(dt)
+        x += vx * distance
+        y += vy * distance
+
+        # Wall collisions
+        # Check left and right boundaries
+        hit_left = x - ball_radius < left_bound
+        hit_right = ~hit_left & (x + ball_radius > right_bound)
+        x[hit_left] = left_bound + ball_radius
+        x[hit_right] = right_bound - ball_radius
+        vx[hit_left | hit_right] *= -1
+
+        # Check top and bottom boundaries
+        hit_top = y - ball_radius < top_bound
+        hit_bottom = ~hit_top & (y + ball_radius > BOTTOM_BOUND)
+        y[hit_top] = top_bound + ball_radius
+        y[hit_bottom] = BOTTOM_BOUND - ball_radius
+        vy[hit_top | hit_bottom] *= -1
+
+        decay = friction ** dt
+        vx *= decay
+        vy *= decay
+        vx[np.abs(vx) < min_speed] = 0
+        vy[np.abs(vy) < min_speed] = 0
+
+        if ((x != self.x[idx]) | (y != self.y[idx])).any():
+            self.version += 1
+        self.x[idx] = x
+        self.y[idx] = y
+        self.vx[idx] = vx
+        self.vy[idx] = vy
+
+        # a ball goes to sleep once it is still and the whole tick (pushes
+        # from other balls and cushion clamps included) left it in place
+        moving = (vx != 0) | (vy != 0)
+        settled = ~moving & (x == self._rest_x[idx]) & (y == self._rest_y[idx])
+        self.awake[idx[settled]] = False
+        self._rest_x[idx] = x
+        self._rest_y[idx] = y
+        self.moving_count = int(np.count_nonzero(moving))
+
+    def collide(self, cue_ball_in_hand=False, collision_info=None):
+        """
+        Batched version of physics.check_collisions() for the whole table.
+        All pair distances are computed at once and overlapping pairs that are
+        on their own get the overlap push and equal-mass elastic exchange in
+        bulk. Crowded spots (e.g. the rack on the break) fall back to the
+        scalar loop order, so the results match check_collisions().
+        collision_info gets the same first_hit / hit_pos / hit_ball_index.
+        Returns the (i, j) index arrays of the pairs that were touching.
+        """
+        x, y = self.x, self.y
+        candidates = self.alive.copy()
+        if cue_ball_in_hand and len(self):
+            candidates[0] = False
+        active = candidates & self.awake
+
+        # every pair (with an awake ball in it) close enough that resolving
+        # one ball could reach the other. A sleeping ball that gets touched
+        # or is close to a crowded spot wakes up and the pairs are redone
+        reach = ball_radius * 4
+        while True:
+            near_i, near_j = self._near_pairs(candidates, active, reach)
+            distance = np.hypot(x[near_j] - x[near_i], y[near_j] - y[near_i])
+            keep = distance < reach
+            near_i, near_j, distance = near_i[keep], near_j[keep], distance[keep]
+
+            touching = distance < ball_radius * 2
+            pairs_i, pairs_j = near_i[touching], near_j[touching]
+            if len(pairs_i) == 0:
+                return pairs_i, pairs_j
+
+            # pushing two balls apart can make one of them touch a third
+            # ball, which the scalar loop then resolves in the same pass.
+            # Pairs with nothing else within reach can go in bulk, the rest
+            # of the neighbourhood (closed over "within reach") is resolved
+            # in order
+            neighbours = np.bincount(np.concatenate((near_i, near_j)), minlength=len(self))
+            crowded = np.zeros(len(self), dtype=bool)
+            busy = (neighbours[pairs_i] > 1) | (neighbours[pairs_j] > 1)
+            crowded[pairs_i[busy]] = True
+            crowded[pairs_j[busy]] = True
+            while True:
+                spread = crowded[near_i] != crowded[near_j]
+                if not spread.any():
+                    break
+                crowded[near_i[spread]] = True
+                crowded[near_j[spread]] = True
+
+            # sleeping balls in the way have to take part as well (their
+            # pairs with each other were left out above)
+            touched = np.zeros(len(self), dtype=bool)
+            touched[pairs_i] = True
+            touched[pairs_j] = True
+            woken = (crowded | touched) & ~active
+            if not woken.any():
+                break
+            active |= woken
+            self.awake |= woken
+
+        if collision_info is not None and collision_info.get("first_hit") is None and not cue_ball_in_hand:
+            self._record_first_hit(pairs_i, pairs_j, collision_info)
+        self.version += 1
+
+        bulk = ~crowded[pairs_i]
+        self._resolve_pairs(pairs_i[bulk], pairs_j[bulk])
+
+        ordered = crowded[near_i]
+        for i, j in sorted(zip(near_i[ordered].tolist(), near_j[ordered].tolist())):
+            self._resolve_pair(i, j)
+
+        return pairs_i, pairs_j
+
+    def _near_pairs(self, candidates, active, reach):
+        #pairs of candidates with at least one active ball in them
+        #small tables: every pair, big tables: ask the spatial hash
+        if len(self) <= BROADPHASE_MIN_BALLS:
+            either = active[:, None] | active[None, :]
+            pairs = candidates[:, None] & candidates[None, :] & either
+            pairs_i, pairs_j = np.nonzero(np.triu(pairs, 1))
+            return pairs_i, pairs_j
+        if self._grid is None:
+            self._grid = SpatialHash()
+        self._grid.update(self.x, self.y, candidates)
+        return self._grid.pairs(reach, np.nonzero(active)[0])
+
+    def _record_first_hit(self, pairs_i, pairs_j, collision_info):
+        # first pair (in scalar loop order) that has the cue ball in it
+        cue_pairs = np.nonzero(self.is_cue[pairs_i] | self.is_cue[pairs_j])[0]
+        if len(cue_pairs) == 0:
+            return
+        i = int(pairs_i[cue_pairs[0]])
+        j = int(pairs_j[cue_pairs[0]])
+        cue_index, hit_index = (i, j) if self.is_cue[i] else (j, i)
+
+        # what type of ball was hit first?
+        if self.colors[hit_index] == black:
+            collision_info["first_hit"] = "8ball"
+        elif self.is_striped[hit_index]:
+            collision_info["first_hit"] = "stripes"
+        else:
+            collision_info["first_hit"] = "solids"
+
+        # extra info for prediction line
+        collision_info["hit_pos"] = (self.x[cue_index].item(), self.y[cue_index].item())
+        collision_info["hit_ball_index"] = hit_index
+
+    def _resolve_pairs(self, i, j):
+        #i and j never repeat a ball here, so fancy indexing writes are safe
+        if len(i) == 0:
+            return
+        x, y, vx, vy = self.x, self.y, self.vx, self.vy
+        dx = x[j] - x[i]
+        dy = y[j] - y[i]
+
+        # Resolve overlap
+        gap, nx, ny = normals(dx, dy)
+        overlap = ball_radius * 2 - gap
+
+        # Move balls apart
+        x[i] -= nx * overlap / 2
+        y[i] -= ny * overlap / 2
+        x[j] += nx * overlap / 2
+        y[j] += ny * overlap / 2
+
+        # Resolve velocity (Elastic collision, mass is 1 so normals swap)
+        tx = -ny
+        ty = nx
+        dpTan1 = vx[i] * tx + vy[i] * ty
+        dpTan2 = vx[j] * tx + vy[j] * ty
+        dpNorm1 = vx[i] * nx + vy[i] * ny
+        dpNorm2 = vx[j] * nx + vy[j] * ny
+
+        vx[i] = tx * dpTan1 + nx * dpNorm2
+        vy[i] = ty * dpTan1 + ny * dpNorm2
+        vx[j] = tx * dpTan2 + nx * dpNorm1
+        vy[j] = ty * dpTan2 + ny * dpNorm1
+
+    def _resolve_pair(self, i, j):
+        #scalar fallback for balls touching more than one other ball, the
+        #distance is checked again because earlier pairs may have moved them
+        x, y, vx, vy = self.x, self.y, self.vx, self.vy
+        dx = float(x[j] - x[i])
+        dy = float(y[j] - y[i])
+        distance = math.hypot(dx, dy)
+        if distance >= ball_radius * 2:
+            return
+
+        overlap = ball_radius * 2 - distance
+        angle = math.atan2(dy, dx)
+        nx = math.cos(angle)
+        ny = math.sin(angle)
+
+        x[i] -= nx * overlap / 2
+        y[i] -= ny * overlap / 2
+        x[j] += nx * overlap / 2
+        y[j] += ny * overlap / 2
+
+        tx = -ny
+        ty = nx
+        dpTan1 = vx[i] * tx + vy[i] * ty
+        dpTan2 = vx[j] * tx + vy[j] * ty
+        dpNorm1 = vx[i] * nx + vy[i] * ny
+        dpNorm2 = vx[j] * nx + vy[j] * ny
+
+        vx[i] = tx * dpTan1 + nx * dpNorm2
+        vy[i] = ty * dpTan1 + ny * dpNorm2
+        vx[j] = tx * dpTan2 + nx * dpNorm1
+        vy[j] = ty * dpTan2 + ny * dpNorm1
+
+    def pocketed(self):
+        #live balls that are over a pocket right now (a sleeping ball stopped
+        #somewhere outside the pockets, so only awake balls are checked)
+        potted = np.zeros(len(self), dtype=bool)
+        idx = np.nonzero(self.awake & self.alive)[0]
+        pockets = np.array(POCKETS, dtype=float)
+        dist = np.hypot(self.x[idx, None] - pockets[:, 0], self.y[idx, None] - pockets[:, 1])
+        potted[idx] = (dist < pocket_radius).any(axis=1)
+        return potted
+
+    def pocket(self):
+        """Vectorized physics.check_pockets(), returns the same potted list."""
+        potted_info = []
+        for i in np.nonzero(self.pocketed())[0].tolist():
+            # Ball in pocket
+            self.alive[i] = False
+            if self.is_cue[i]:
+                # Move cue ball off screen instead of resetting, out of play
+                # until it is given back as ball in hand
+                self.x[i] = -1000
+                self.y[i] = -1000
+                self.vx[i] = 0
+                self.vy[i] = 0
+                potted_info.append("cue")
+            elif self.colors[i] == black:
+                potted_info.append("8ball")
+            elif self.is_striped[i]:
+                potted_info.append("stripe")
+            else:
+                potted_info.append("solid")
+        if potted_info:
+            self.version += 1
+            self._count_moving()
+        return potted_info
+
+    def advance(self, cue_ball_in_hand=False, dt=1, collision_info=None):
+        """
+        One physics step as run_game takes it: collisions, pockets (not
+        while the cue ball is in hand), then movement by dt ticks. Returns
+        the potted list.
+        """
+        self.collide(cue_ball_in_hand, collision_info)
+        potted = [] if cue_ball_in_hand else self.pocket()
+        self.step(dt)
+        return potted
+
+    def all_stopped(self):
+        return self.moving_count == 0
+
+
+def _column(name, wakes=True):
+    #property that reads/writes one row of a TableState array, changing how
+    #a ball moves wakes it up
+    def get(self):
+        return getattr(self._table, name)[self._index].item()
+
+    def set(self, value):
+        getattr(self._table, name)[self._index] = value
+        if wakes:
+            self._table.wake(self._index)
+
+    return property(get, set)
+
+
+def normals(dx, dy):
+    """
+    Distances and unit normals (cos, sin of the angle) for arrays of pair
+    offsets, worked out with the math module like check_collisions() does:
+    numpy's SIMD np.hypot() / np.arctan2() can round the last bit differently.
+    """
+    dx, dy = dx.tolist(), dy.tolist()
+    angle = list(map(math.atan2, dy, dx))
+    return (np.array(list(map(math.hypot, dx, dy))),
+            np.array(list(map(math.cos, angle))),
+            np.array(list(map(math.sin, angle))))
+
+
+class BallView:
+    #a single ball row of a TableState, usable anywhere a Ball is expected
+    def __init__(self, table, index):
+        self._table = table
+        self._index = index
+
+    x = _column("x")
+    y = _column("y")
+    vx = _column("vx")
+    vy = _column("vy")
+    alive = _column("alive")
+    is_cue = _column("is_cue", wakes=False)
+    is_striped = _column("is_striped", wakes=False)
+
+    @property
+    def color(self):
+        return self._table.colors[self._index]
+
+    @color.setter
+    def color(self, value):
+        self._table.colors[self._index] = value
@@ -0,0 +1,73 @@
+#shared tables and the equivalence contract every fast path is held to:
+#the final table, the potted list and collision_info of a shot all match
+#run_game's physics loop to the last bit
+import math
+
+import numpy as np
+
+import physics
+from table_state import TableState
+
+
+def new_info():
+    return {"first_hit": None, "hit_pos": None, "hit_ball_index": None}
+
+
+def random_balls(rng, count):
+    #count balls dropped at random on the table, none overlapping
+    balls = physics.create_balls()[:count]
+    placed = []
+    for ball in balls:
+        while True:
+            x = rng.uniform(physics.left_bound + 30, physics.right_bound - 30)
+            y = rng.uniform(physics.top_bound + 30, physics.BOTTOM_BOUND - 30)
+            if all(math.hypot(x - px, y - py) >= physics.ball_radius * 2 for px, py in placed):
+                break
+        ball.x, ball.y = x, y
+        placed.append((x, y))
+    return balls
+
+
+def settled_rack():
+    table = TableState.from_balls(physics.create_balls())
+    for _ in range(300 * physics.SUBSTEPS):
+        table.advance(dt=1 / physics.SUBSTEPS)
+    return table
+
+
+def strike(table, angle, speed):
+    table = table.copy()
+    table.vx[0], table.vy[0] = math.cos(angle) * speed, math.sin(angle) * speed
+    table.wake([0])
+    return table
+
+
+def every_tick(table, cue_ball_in_hand=False, substeps=physics.SUBSTEPS):
+    #run_game's physics loop, step by step: (final table, [(tick, potted)], collision_info)
+    table = table.copy()
+    timestep = physics.FixedTimestep(substeps)
+    info = new_info()
+    potted = []
+    step = 0
+    while not table.all_stopped():
+        step += 1
+        tick = (step - 1) // substeps + 1
+        potted += [(tick, label) for label in table.advance(cue_ball_in_hand, timestep.dt, info)]
+    return table, potted, info
+
+
+def assert_same_table(table, expected):
+    #expected is a TableState or a list of Balls
+    if not isinstance(expected, TableState):
+        expected = TableState.from_balls(expected)
+    for name in ("x", "y", "vx", "vy", "alive"):
+        assert np.array_equal(getattr(table, name), getattr(expected, name)), name
+
+
+def assert_same_shot(shot, expected):
+    #shot and expected are (final table, potted list, collision_info)
+    table, potted, info = shot
+    expected_table, expected_potted, expected_info = expected
+    assert_same_table(table, expected_table)
+    assert potted == expected_potted
+    assert info == expected_info
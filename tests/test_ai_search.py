@@ -0,0 +1,49 @@
+#ShotSearch / SearchJob scoring
+from physics import black
+from ai_search import SearchJob, next_group
+from helpers import settled_rack
+
+
+def node(shot, score, children=()):
+    return {"shot": shot, "score": score, "total": score, "continues": bool(children), "group": None,
+            "table": None, "children": list(children), "depth": 1}
+
+
+def test_pot_beats_miss_whatever_its_follow_ups():
+    #a pot whose only explored follow-up fouls is still worth the pot: the
+    #player can end the turn safely instead, like the miss does
+    job = SearchJob(None, settled_rack(), None, [], chunk_size=6, depth=2)
+    pot = node((0.1, 70), 120, [node((0.5, 45), -150)])
+    miss = node((0.2, 70), 0)
+    job._roots = [miss, pot]
+    assert job.best() == (0.1, 70, 120)
+
+
+def test_good_follow_up_adds_to_pot():
+    job = SearchJob(None, settled_rack(), None, [], chunk_size=6, depth=2)
+    job._roots = [node((0.1, 70), 120, [node((0.5, 45), -150), node((0.6, 95), 100)]),
+                  node((0.2, 70), 150)]
+    assert job.best() == (0.1, 70, 220)
+
+
+def outcome(table, potted, first_hit, gone=()):
+    final = table.copy()
+    final.alive[list(gone)] = False
+    return {"table": final, "potted": potted, "collision_info": {"first_hit": first_hit}}
+
+
+def test_next_group_follows_the_game_rules():
+    table = settled_rack()
+    solid = next(i for i in range(1, len(table)) if not table.is_striped[i] and table.colors[i] != black)
+    stripe = next(i for i in range(1, len(table)) if table.is_striped[i])
+    eight = table.colors.index(black)
+    # the game doesn't call a wrong first hit, a pot of ours keeps the turn
+    assert next_group(table, outcome(table, ["solid"], "stripes", [solid]), "solids") == (True, "solids")
+    assert next_group(table, outcome(table, ["stripe"], "stripes", [stripe]), "solids") == (False, "solids")
+    assert next_group(table, outcome(table, ["solid", "cue"], "solids", [solid]), "solids") == (False, "solids")
+    # an open table goes to the only kind potted
+    assert next_group(table, outcome(table, ["stripe"], "solids", [stripe]), None) == (True, "stripes")
+    assert next_group(table, outcome(table, ["stripe", "solid"], "solids", [solid, stripe]), None) == (True, None)
+    assert next_group(table, outcome(table, [], "solids"), None) == (False, None)
+    # the 8-ball ends the game either way
+    assert next_group(table, outcome(table, ["8ball"], "8ball", [eight]), "solids")[0] is False
@@ -0,0 +1,86 @@
+#simulate_shots() against playing each shot on its own TableState with
+#run_game's physics loop (TableState.advance())
+import math
+import random
+
+import numpy as np
+
+import physics
+from batch_sim import TableBatch, simulate_shots
+from table_state import TableState
+from helpers import assert_same_shot, new_info, random_balls, settled_rack
+
+
+def one_by_one(table, vx, vy, cue_ball_in_hand=False, substeps=physics.SUBSTEPS):
+    #(final table, potted, collision_info, ticks) of one shot
+    table = table.copy()
+    table.vx[0], table.vy[0] = vx, vy
+    table.wake([0])
+    info = new_info()
+    potted = []
+    steps = 0
+    while not table.all_stopped():
+        steps += 1
+        potted += table.advance(cue_ball_in_hand, 1 / substeps, info)
+    return table, potted, info, -(-steps // substeps)
+
+
+def random_shots(rng, count, spread=math.pi):
+    shots = []
+    for _ in range(count):
+        angle, speed = rng.uniform(-spread, spread), rng.uniform(0.6, 12)
+        shots.append((math.cos(angle) * speed, math.sin(angle) * speed))
+    return shots
+
+
+def check_same(table, shots, cue_ball_in_hand=False, substeps=physics.SUBSTEPS):
+    batch = simulate_shots(table, shots, cue_ball_in_hand, substeps=substeps)
+    for k, (vx, vy) in enumerate(shots):
+        *expected, ticks = one_by_one(table, vx, vy, cue_ball_in_hand, substeps)
+        assert_same_shot((batch.table(k), batch.potted[k], batch.collision_info[k]), expected)
+        assert batch.ticks[k] == ticks
+
+
+def test_breaks_match_one_by_one():
+    rng = random.Random(31)
+    check_same(settled_rack(), random_shots(rng, 24, spread=0.3))
+
+
+def test_any_direction_matches_one_by_one():
+    rng = random.Random(32)
+    check_same(settled_rack(), random_shots(rng, 24))
+
+
+def test_open_tables_match_one_by_one():
+    rng = random.Random(33)
+    for count in (2, 7, 16):
+        table = TableState.from_balls(random_balls(rng, count))
+        check_same(table, random_shots(rng, 8))
+
+
+def test_other_substeps_match_one_by_one():
+    rng = random.Random(34)
+    for substeps in (1, 3):
+        check_same(settled_rack(), random_shots(rng, 8, spread=0.3), substeps=substeps)
+
+
+def test_cue_ball_in_hand_matches_one_by_one():
+    rng = random.Random(35)
+    table = TableState.from_balls(random_balls(rng, 10))
+    table.vx[4], table.vy[4] = -7.0, 3.0
+    table.wake([4])
+    check_same(table, random_shots(rng, 6), cue_ball_in_hand=True)
+
+
+def test_tick_matches_run():
+    rng = random.Random(36)
+    shots = random_shots(rng, 6, spread=0.3)
+    expected = simulate_shots(settled_rack(), shots)
+    batch = TableBatch.from_table(settled_rack(), len(shots))
+    batch.vx[:, 0], batch.vy[:, 0] = np.asarray(shots).T
+    batch.wake([0])
+    while batch.running.any():
+        batch.tick()
+    assert np.array_equal(batch.x, expected.x) and np.array_equal(batch.y, expected.y)
+    assert batch.potted == expected.potted
+    assert np.array_equal(batch.ticks, expected.ticks)
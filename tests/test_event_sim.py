@@ -0,0 +1,61 @@
+#event_sim.resolve_shot() against running every tick of the shot
+import math
+import random
+
+import physics
+from table_state import TableState
+from event_sim import resolve_shot, potted_in, clearance
+from helpers import assert_same_shot, every_tick, new_info, random_balls, settled_rack, strike
+
+
+def check_same(table, cue_ball_in_hand=False, substeps=physics.SUBSTEPS):
+    expected = every_tick(table, cue_ball_in_hand, substeps)
+    info = new_info()
+    final, events = resolve_shot(table, cue_ball_in_hand, info, substeps=substeps)
+    pockets = [(e["tick"], e["potted"]) for e in events if e["type"] == "pocket"]  # on the same tick too
+    assert_same_shot((final, pockets, info), expected)
+    assert potted_in(events) == [label for _, label in expected[1]]
+
+
+def test_breaks_match_every_tick():
+    rng = random.Random(5)
+    rack = settled_rack()
+    for _ in range(12):
+        check_same(strike(rack, rng.uniform(-0.3, 0.3), rng.uniform(0.6, 12)))
+
+
+def test_any_direction_matches_every_tick():
+    rng = random.Random(6)
+    rack = settled_rack()
+    for _ in range(12):
+        check_same(strike(rack, rng.uniform(-math.pi, math.pi), rng.uniform(0.6, 12)))
+
+
+def test_open_tables_match_every_tick():
+    rng = random.Random(7)
+    for count in (2, 6, 11, 16):
+        table = TableState.from_balls(random_balls(rng, count))
+        for _ in range(3):
+            check_same(strike(table, rng.uniform(-math.pi, math.pi), rng.uniform(0.6, 12)))
+
+
+def test_other_substeps_match_every_tick():
+    rng = random.Random(10)
+    rack = settled_rack()
+    for substeps in (1, 3):
+        for _ in range(4):
+            check_same(strike(rack, rng.uniform(-0.3, 0.3), rng.uniform(0.6, 12)), substeps=substeps)
+
+
+def test_cue_ball_in_hand_matches_every_tick():
+    rng = random.Random(8)
+    table = TableState.from_balls(random_balls(rng, 8))
+    table.vx[3], table.vy[3] = 6.0, -4.0
+    table.wake([3])
+    check_same(table, cue_ball_in_hand=True)
+
+
+def test_clearance_is_zero_when_touching():
+    table = TableState.from_balls(random_balls(random.Random(9), 4))
+    table.x[1], table.y[1] = table.x[0] + physics.ball_radius * 2 - 1, table.y[0]
+    assert clearance(table) == 0.0
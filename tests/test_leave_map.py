@@ -0,0 +1,64 @@
+#LeaveMap.update() / value_after() against a map built from scratch
+import random
+
+import numpy as np
+
+from physics import black
+from leave_map import LeaveMap
+from table_state import TableState
+from helpers import random_balls
+
+
+def groups(table):
+    solids = [i for i in range(1, len(table)) if not table.is_striped[i] and table.colors[i] != black]
+    stripes = [i for i in range(1, len(table)) if table.is_striped[i]]
+    eight = [i for i in range(1, len(table)) if table.colors[i] == black]
+    return solids, stripes, eight
+
+
+def nudge(table, rng, balls):
+    #move a few balls a little and pot one, like a shot would
+    table = table.copy()
+    for i in balls:
+        table.x[i] += rng.uniform(-20, 20)
+        table.y[i] += rng.uniform(-20, 20)
+    table.alive[balls[-1]] = False
+    return table
+
+
+def check_same(leave, table, targets, rng):
+    updated = leave.update(table, targets)
+    fresh = LeaveMap(table, targets)
+    assert sorted(updated.shot_target.tolist()) == sorted(fresh.shot_target.tolist())
+    assert np.array_equal(updated.values, fresh.values)
+    for k in rng.sample(range(len(fresh.cells)), 40):
+        # the cue ball stopping in cell k
+        table.x[0], table.y[0] = fresh.cell_x[k], fresh.cell_y[k]
+        assert leave.value_after(table, targets) == fresh.values[k]
+    return updated
+
+
+def test_update_follows_target_changes():
+    rng = random.Random(21)
+    table = TableState.from_balls(random_balls(rng, 16))
+    solids, stripes, eight = groups(table)
+    leave = LeaveMap(table, solids + stripes)
+
+    # open table -> solids (targets shrink, nothing moved)
+    leave = check_same(leave, table.copy(), solids, rng)
+    # a shot moves a few balls and pots a solid
+    table = nudge(table, rng, [stripes[0], solids[1], solids[0]])
+    leave = check_same(leave, table.copy(), solids[1:], rng)
+    # solids cleared -> the 8-ball (a new target, built from scratch)
+    table = nudge(table, rng, [stripes[1]] + solids[1:])
+    check_same(leave, table.copy(), eight, rng)
+
+
+def test_update_drops_old_targets_for_other_group():
+    rng = random.Random(22)
+    table = TableState.from_balls(random_balls(rng, 16))
+    solids, stripes, _ = groups(table)
+    leave = LeaveMap(table, solids + stripes)
+    check_same(leave, table.copy(), stripes, rng)
+    moved = nudge(table, rng, [solids[2], stripes[3]])
+    check_same(leave, moved, stripes[:3], rng)
@@ -0,0 +1,59 @@
+#OcclusionIndex against testing the segment against every ball
+import random
+
+import physics
+from occlusion import OcclusionIndex
+from table_state import TableState
+from helpers import random_balls, settled_rack
+
+
+def brute_force(table, x0, y0, x1, y1, ignore=()):
+    #no live ball but the cue ball and ignore within two radii of the segment
+    dx, dy = x1 - x0, y1 - y0
+    length_sq = dx * dx + dy * dy
+    if length_sq == 0:
+        return True
+    for i in range(len(table)):
+        if not table.alive[i] or table.is_cue[i] or i in ignore:
+            continue
+        bx, by = table.x[i].item() - x0, table.y[i].item() - y0
+        t = min(max((bx * dx + by * dy) / length_sq, 0.0), 1.0)
+        ex, ey = bx - t * dx, by - t * dy
+        if ex * ex + ey * ey < (physics.ball_radius * 2) ** 2:
+            return False
+    return True
+
+
+def random_point(rng):
+    return (rng.uniform(physics.left_bound, physics.right_bound),
+            rng.uniform(physics.top_bound, physics.BOTTOM_BOUND))
+
+
+def check_same(table, rng, queries=1500):
+    index = OcclusionIndex(table)
+    for _ in range(queries):
+        origin = rng.randrange(len(index.origins))
+        x, y = random_point(rng)
+        if rng.random() < 0.5:
+            # right next to a ball, where the shadow edges matter
+            i = rng.randrange(len(table))
+            x = table.x[i].item() + rng.uniform(-3, 3) * physics.ball_radius
+            y = table.y[i].item() + rng.uniform(-3, 3) * physics.ball_radius
+        ignore = tuple(rng.sample(range(len(table)), rng.randrange(3)))
+        ox, oy = index.origins[origin]
+        assert index.clear(origin, x, y, ignore) == brute_force(table, ox, oy, x, y, ignore)
+
+        (x0, y0), (x1, y1) = random_point(rng), random_point(rng)
+        assert index.segment_clear(x0, y0, x1, y1, ignore) == brute_force(table, x0, y0, x1, y1, ignore)
+
+
+def test_rack_matches_brute_force():
+    check_same(settled_rack(), random.Random(51))
+
+
+def test_open_tables_match_brute_force():
+    rng = random.Random(52)
+    for count in (2, 6, 11, 16):
+        table = TableState.from_balls(random_balls(rng, count))
+        table.alive[rng.randrange(1, count)] = False
+        check_same(table, rng)
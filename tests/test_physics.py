@@ -0,0 +1,41 @@
+#closed form lookahead (ticks_to_rest / state_at / stop_position) against
+#stepping a lone ball with Ball.move(dt)
+import math
+import random
+
+import pytest
+
+import physics
+
+
+def lone_balls(rng, count):
+    #random spots and velocities, a few of them starting past a cushion
+    balls = []
+    for _ in range(count):
+        x = rng.uniform(physics.left_bound, physics.right_bound)
+        y = rng.uniform(physics.top_bound, physics.BOTTOM_BOUND)
+        ball = physics.Ball(x, y, physics.white, True, False)
+        angle = rng.uniform(-math.pi, math.pi)
+        speed = rng.uniform(0.5, 30)
+        ball.vx, ball.vy = math.cos(angle) * speed, math.sin(angle) * speed
+        balls.append(ball)
+    return balls
+
+
+@pytest.mark.parametrize("dt", [1, 1 / physics.SUBSTEPS])
+def test_closed_form_matches_stepping(dt):
+    rng = random.Random(5)
+    for ball in lone_balls(rng, 40):
+        start = physics.Ball(ball.x, ball.y, ball.color, True, False)
+        start.vx, start.vy = ball.vx, ball.vy
+        steps = 0
+        while ball.vx != 0 or ball.vy != 0:
+            ball.move(dt)
+            steps += 1
+            if steps % 37 == 0:
+                x, y, vx, vy = physics.state_at(start, steps, dt)
+                assert (x, y) == pytest.approx((ball.x, ball.y), abs=1e-6)
+                assert (vx, vy) == pytest.approx((ball.vx, ball.vy), abs=1e-9)
+
+        assert physics.ticks_to_rest(start, dt) == steps
+        assert physics.stop_position(start, dt) == pytest.approx((ball.x, ball.y), abs=1e-6)
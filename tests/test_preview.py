@@ -0,0 +1,59 @@
+#ShotPreview against run_game's physics loop
+import math
+import random
+
+import physics
+from preview import ShotPreview
+from shot_cache import ShotCache
+from table_state import TableState
+from helpers import assert_same_shot, every_tick, random_balls, settled_rack, strike
+
+
+def finish(preview, table, vx, vy):
+    preview.aim(("shot", vx, vy), table, vx, vy)
+    while not preview.work(1.0):
+        pass
+    return preview.result
+
+
+def check_same(table, angle, speed, substeps=physics.SUBSTEPS):
+    vx, vy = math.cos(angle) * speed, math.sin(angle) * speed
+    result = finish(ShotPreview(max_ticks=20000, timestep=physics.FixedTimestep(substeps)), table, vx, vy)
+    expected, potted, info = every_tick(strike(table, angle, speed), substeps=substeps)
+    final = result["table"]
+    assert_same_shot((final, result["potted"], result["collision_info"]),
+                     (expected, [label for _, label in potted], info))
+    for i, path in result["paths"].items():
+        if final.alive[i]:
+            assert path[-1] == (final.x[i].item(), final.y[i].item())
+
+
+def test_breaks_match_run_game():
+    rng = random.Random(11)
+    rack = settled_rack()
+    for _ in range(8):
+        check_same(rack, rng.uniform(-0.3, 0.3), rng.uniform(0.6, 12))
+
+
+def test_open_tables_match_run_game():
+    rng = random.Random(12)
+    for count in (3, 9, 16):
+        table = TableState.from_balls(random_balls(rng, count))
+        for _ in range(3):
+            check_same(table, rng.uniform(-math.pi, math.pi), rng.uniform(0.6, 12))
+
+
+def test_other_substeps_match_run_game():
+    rng = random.Random(13)
+    rack = settled_rack()
+    for substeps in (1, 3):
+        check_same(rack, rng.uniform(-0.3, 0.3), rng.uniform(6, 12), substeps)
+
+
+def test_cached_preview_is_reused():
+    cache = ShotCache()
+    table = settled_rack()
+    first = finish(ShotPreview(cache=cache), table, 10.0, 0.5)
+    again = ShotPreview(cache=cache)
+    again.aim("other key", table, 10.0, 0.5)
+    assert again.ready() and again.result is first
@@ -0,0 +1,78 @@
+#ShotCache against resolving every shot afresh
+import math
+import random
+
+import physics
+import shot_cache
+from ai_search import evaluate
+from event_sim import resolve_shot, potted_in
+from shot_cache import ShotCache, table_key
+from helpers import assert_same_shot, new_info, settled_rack, strike
+
+
+def fresh(table, angle, speed):
+    info = new_info()
+    final, events = resolve_shot(strike(table, angle, speed), collision_info=info)
+    return final, potted_in(events), info
+
+
+def check_outcome(outcome, expected):
+    assert_same_shot((outcome["table"], outcome["potted"], outcome["collision_info"]), expected)
+
+
+def test_cached_outcomes_match_fresh_resolve():
+    rng = random.Random(41)
+    cache = ShotCache()
+    rack = settled_rack()
+    shots = [(rng.uniform(-math.pi, math.pi), rng.uniform(0.6, 12)) for _ in range(10)]
+    for _ in range(2):
+        for angle, speed in shots:
+            outcome = cache.resolve(rack, math.cos(angle) * speed, math.sin(angle) * speed)
+            check_outcome(outcome, fresh(rack, angle, speed))
+    assert cache.stats()["misses"] == len(shots)
+    assert cache.stats()["hits"] == len(shots)
+
+
+def test_search_outcomes_match_fresh_resolve():
+    #evaluate() fills the shared cache from simulate_shots() batches
+    rng = random.Random(42)
+    rack = settled_rack()
+    shots = [(rng.uniform(-0.3, 0.3), rng.choice((45, 70, 95))) for _ in range(6)]
+    shot_cache.outcomes.clear()
+    evaluate(rack, None, shots)
+    for angle, power in shots:
+        speed = power * physics.cue_power_multiplier
+        key = shot_cache.outcomes.key(rack, math.cos(angle) * speed, math.sin(angle) * speed)
+        check_outcome(shot_cache.outcomes.get(key), fresh(rack, angle, speed))
+    shot_cache.outcomes.clear()
+
+
+def test_key_tells_shots_and_tables_apart():
+    cache = ShotCache()
+    rack = settled_rack()
+    key = cache.key(rack, 10.0, 1.0)
+    assert cache.key(rack.copy(), 10.0, 1.0) == key
+    assert cache.key(rack, 10.0, 1.0 + 1e-5) != key
+    assert cache.key(rack, 10.0, 1.0, cue_ball_in_hand=True) != key
+    assert cache.key(rack, 10.0, 1.0, substeps=physics.SUBSTEPS + 1) != key
+
+    close = rack.copy()
+    close.x[3] += shot_cache.POSITION_STEP / 10
+    assert table_key(close) == table_key(rack)
+    moved = rack.copy()
+    moved.x[3] += shot_cache.POSITION_STEP * 2
+    assert table_key(moved) != table_key(rack)
+    potted = rack.copy()
+    potted.alive[3] = False
+    assert table_key(potted) != table_key(rack)
+
+
+def test_least_recently_used_goes_first():
+    cache = ShotCache(max_entries=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1
+    cache.put("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1 and cache.get("c") == 3
+    assert len(cache) == 2
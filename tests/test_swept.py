@@ -0,0 +1,89 @@
+#swept_step() / event_sim.swept_shot() against the overlap checks: hard
+#shots that skip through things between steps, and slow shots that don't
+import math
+import random
+
+import numpy as np
+import pytest
+
+import physics
+from event_sim import swept_shot
+from table_state import TableState
+from helpers import every_tick, new_info, random_balls, settled_rack, strike
+
+
+def test_hard_shot_does_not_pass_through_a_ball():
+    def balls():
+        cue = physics.Ball(200, 250, physics.white, is_cue=True)
+        cue.vx = 120
+        return [cue, physics.Ball(260, 250, physics.yellow)]
+
+    # one Ball.move() jumps the cue ball clean over the other one
+    stepped = balls()
+    info = new_info()
+    stepped[0].move()
+    physics.check_collisions(stepped, False, info)
+    assert info["first_hit"] is None and stepped[0].x > stepped[1].x
+
+    swept = balls()
+    info = new_info()
+    physics.swept_step(swept, 1, False, info)
+    assert info["first_hit"] == "solids" and info["hit_ball_index"] == 1
+    assert swept[0].x < swept[1].x and swept[1].vx > 0
+
+
+def test_hard_shot_bounces_off_every_cushion_on_the_way():
+    #3000 px in one step: 90 -> 810 and back twice, then 480 px more from
+    #x = 90, instead of being clamped on the first cushion
+    ball = physics.Ball(450, 250, physics.white, is_cue=True)
+    ball.vx = 3000
+    assert physics.swept_step([ball]) == []
+    assert ball.x == pytest.approx(90 + 480)
+    assert ball.vx == pytest.approx(3000 * physics.friction)
+
+
+def test_ball_crossing_a_pocket_inside_a_step_is_potted():
+    #along the top cushion, straight over the middle pocket
+    def ball():
+        ball = physics.Ball(380, physics.top_bound + physics.ball_radius, physics.yellow)
+        ball.vx = 150
+        return ball
+
+    stepped = ball()
+    stepped.move()
+    assert physics.check_pockets([stepped]) == []
+
+    swept = ball()
+    assert physics.swept_step([swept]) == ["solid"]
+    assert not swept.alive
+
+
+def test_slow_shots_agree_with_the_frame_loop():
+    #cue ball at another ball, close to full: same first hit and pots, and
+    #a few px at most apart (cushions reflect instead of clamping)
+    rng = random.Random(3)
+    for _ in range(20):
+        table = TableState.from_balls(random_balls(rng, 2))
+        angle = math.atan2(table.y[1] - table.y[0], table.x[1] - table.x[0]) + rng.uniform(-0.03, 0.03)
+        table = strike(table, angle, rng.uniform(1, 6))
+
+        expected, potted, expected_info = every_tick(table)
+        info = new_info()
+        final, swept_potted = swept_shot(table, False, info)
+
+        assert swept_potted == [label for _, label in potted]
+        assert info["first_hit"] == expected_info["first_hit"]
+        assert info["hit_ball_index"] == expected_info["hit_ball_index"]
+        assert np.hypot(final.x - expected.x, final.y - expected.y).max() < 3
+
+
+def test_first_hit_matches_check_collisions_on_the_rack():
+    rng = random.Random(2)
+    rack = settled_rack()
+    for _ in range(6):
+        table = strike(rack, rng.uniform(-0.2, 0.2), rng.uniform(4, 8))
+        _, _, expected_info = every_tick(table)
+        info = new_info()
+        swept_shot(table, False, info)
+        assert info["first_hit"] == expected_info["first_hit"]
+        assert info["hit_ball_index"] == expected_info["hit_ball_index"]
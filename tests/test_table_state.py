@@ -0,0 +1,114 @@
+#TableState (vectorized collide/pocket/step) against the scalar
+#check_collisions() / check_pockets() / Ball.move() it replaces
+import math
+import random
+
+import physics
+from table_state import BROADPHASE_MIN_BALLS, TableState
+from helpers import assert_same_shot, new_info, random_balls
+
+
+def scalar_shot(balls, ticks, dt=1):
+    #the baseline frame loop, collision_info and potted list per step
+    info = new_info()
+    potted = []
+    for _ in range(round(ticks / dt)):
+        physics.check_collisions(balls, False, info)
+        potted.append(physics.check_pockets(balls))
+        for ball in balls:
+            if ball.alive:
+                ball.move(dt)
+    return info, potted
+
+
+def table_shot(table, ticks, dt=1):
+    info = new_info()
+    potted = []
+    for _ in range(round(ticks / dt)):
+        table.collide(False, info)
+        potted.append(table.pocket())
+        table.step(dt)
+    return info, potted
+
+
+def drifting_grid(rng, rows, cols):
+    #cue on the left of a rows x cols grid of slowly drifting balls, so they
+    #all stay awake and the broadphase sweeps the whole table every tick
+    protos = physics.create_balls()
+    cue = protos[0]
+    balls = [physics.Ball(physics.left_bound + 60, cue.y, cue.color, True, False)]
+    gap = physics.ball_radius * 2 + 1
+    for row in range(rows):
+        for col in range(cols):
+            proto = protos[1 + (row * cols + col) % 15]
+            ball = physics.Ball(physics.left_bound + 200 + col * gap + rng.uniform(-0.4, 0.4),
+                                physics.top_bound + 40 + row * gap + rng.uniform(-0.4, 0.4),
+                                proto.color, False, proto.is_striped)
+            ball.vx, ball.vy = rng.uniform(-0.3, 0.3), rng.uniform(-0.3, 0.3)
+            balls.append(ball)
+    return balls
+
+
+def check_same(balls, shots, ticks=400, dt=1):
+    for angle, speed in shots:
+        scalar = [physics.Ball(b.x, b.y, b.color, b.is_cue, b.is_striped) for b in balls]
+        for copy, ball in zip(scalar, balls):
+            copy.vx, copy.vy = ball.vx, ball.vy
+        scalar[0].vx, scalar[0].vy = math.cos(angle) * speed, math.sin(angle) * speed
+        table = TableState.from_balls(scalar)
+
+        scalar_info, scalar_potted = scalar_shot(scalar, ticks, dt)
+        table_info, table_potted = table_shot(table, ticks, dt)
+        assert_same_shot((table, table_potted, table_info), (scalar, scalar_potted, scalar_info))
+
+
+def test_breaks_match_scalar_loop():
+    rng = random.Random(3)
+    shots = [(rng.uniform(-0.3, 0.3), rng.uniform(4, 12)) for _ in range(6)]
+    check_same(physics.create_balls(), shots)
+
+
+def test_open_tables_match_scalar_loop():
+    rng = random.Random(4)
+    for count in (2, 5, 9, 16):
+        shots = [(rng.uniform(-math.pi, math.pi), rng.uniform(2, 12)) for _ in range(3)]
+        check_same(random_balls(rng, count), shots)
+
+
+def test_substeps_match_scalar_loop():
+    #the game's steps: SUBSTEPS of Ball.move(1 / SUBSTEPS) per tick
+    rng = random.Random(6)
+    dt = 1 / physics.SUBSTEPS
+    shots = [(rng.uniform(-0.3, 0.3), rng.uniform(4, 12)) for _ in range(3)]
+    check_same(physics.create_balls(), shots, dt=dt)
+    for count in (5, 16):
+        shots = [(rng.uniform(-math.pi, math.pi), rng.uniform(2, 12)) for _ in range(2)]
+        check_same(random_balls(rng, count), shots, dt=dt)
+
+
+def test_broadphase_tables_match_scalar_loop():
+    #above BROADPHASE_MIN_BALLS, with the cue sent between two rows so it can
+    #touch two balls in the same tick and the pair order decides first_hit
+    rng = random.Random(0)
+    gap = physics.ball_radius * 2 + 1
+    for _ in range(3):
+        balls = drifting_grid(rng, 10, 10)
+        balls[0].y = physics.top_bound + 40 + (rng.randrange(9) + 0.5) * gap
+        check_same(balls, [(0.0, rng.uniform(5, 12))], ticks=150)
+
+
+def test_broadphase_first_hit_in_scalar_order():
+    #the cue touches ball 1 in the cell above it and ball 2 in the cell to its
+    #right in the same tick, the scalar loop reports ball 1. The other balls
+    #are spread out far away, just to get over BROADPHASE_MIN_BALLS
+    protos = physics.create_balls()
+    cue = physics.Ball(410, 250, protos[0].color, True, False)
+    balls = [cue,
+             physics.Ball(410, 250 - physics.ball_radius * 1.85, protos[1].color, False, False),
+             physics.Ball(410 + physics.ball_radius * 1.85, 250, protos[2].color, False, True)]
+    for x in (130, 175, 220, 265, 310, 560, 605, 650, 695, 740):
+        for y in (110, 155, 200, 245, 290, 335, 380):
+            proto = protos[1 + len(balls) % 15]
+            balls.append(physics.Ball(x, y, proto.color, False, proto.is_striped))
+    assert len(balls) > BROADPHASE_MIN_BALLS
+    check_same(balls, [(0.0, 1.0)], ticks=5)
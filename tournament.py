@@ -0,0 +1,213 @@
+#headless AI vs AI tournament
+#plays whole games of 8-ball between two computer players with no window:
+#the same AI code (ai_player.py, ai_search.py), the same rules (rules.py)
+#and shots played out headlessly instead of frame by frame, through the
+#shot cache so the hard AI's shot, already played in its search, isn't
+#simulated again. Games are
+#seeded (one seed per game) and spread over a process pool, and the results
+#are summed up as win rates, shots per game and foul rates with 95%
+#confidence intervals, so changes to the AI or the physics can be measured
+#over thousands of games instead of judged from a few.
+import argparse
+import math
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from physics import cue_power_multiplier
+import shot_cache
+from ai_search import ShotSearch
+from ai_player import get_ai_shot, ai_place_ball
+from rules import resolve_turn, player_group
+from break_book import opening_table, load_book
+
+MAX_SHOTS = 300  #a game still going after this many shots is called unfinished
+SEARCH_SHOTS = 12  #candidates the hard AI scores per turn (its thinking time, counted in shots so runs repeat)
+Z = 1.96  #95% confidence
+
+def think(search, table, group, search_shots):
+    #the hard AI's SearchJob after scoring search_shots candidates (None
+    #for no limit), or None if it has nothing to aim at
+    job = search.begin(table, group)
+    if job is None:
+        return None
+    while not job.done() and (search_shots is None or job.scored < search_shots):
+        job.step()
+    job.cancel()
+    return job
+
+
+def play_game(seed, players=("easy", "hard"), search_shots=SEARCH_SHOTS, depth=1, max_shots=MAX_SHOTS,
+              book=True):
+    """
+    One game between players[0] (player 1, breaks) and players[1], each
+    "easy" or "hard". Everything random comes from seed. With book the hard
+    AI breaks from the opening book (break_book.py) if it has been built.
+    Returns
+        {"seed", "players", "winner" (1, 2 or None if unfinished),
+         "early_8ball" (the loser potted the 8-ball too early),
+         "shots": [player 1, player 2], "fouls": [...], "scores": [...]}
+    Fouls are scratches (the cue ball potted, the opponent gets ball in
+    hand), the only foul the game calls.
+    """
+    random.seed(seed)  # get_ai_shot() and FreeSpace use the random module
+    shot_cache.outcomes.clear()  # a cache hit from another game could change this one
+    # one turn's search_shots candidates go into one simulate_shots() batch
+    search = ShotSearch(workers=0, chunk_size=search_shots or SEARCH_SHOTS, depth=depth,
+                        book=load_book() if book else None, background=False)
+    table = opening_table()
+    balls = table.ball_views()
+    p1_group = None
+    player_turn = 1
+    ball_in_hand = False
+    result = {"seed": seed, "players": tuple(players), "winner": None, "early_8ball": False,
+              "shots": [0, 0], "fouls": [0, 0], "scores": [0, 0]}
+
+    for _ in range(max_shots):
+        difficulty = players[player_turn - 1]
+        group = player_group(p1_group, player_turn)
+        if ball_in_hand:
+            ai_place_ball(balls, table, difficulty, group)
+            ball_in_hand = False
+
+        job = think(search, table, group, search_shots) if difficulty == "hard" else None
+        angle, power = get_ai_shot(balls, difficulty, group, job)
+        speed = power * cue_power_multiplier
+        outcome = shot_cache.outcomes.resolve(table, math.cos(angle) * speed, math.sin(angle) * speed)
+        table = outcome["table"].copy()  # the cached one is shared
+        balls = table.ball_views()
+
+        turn = resolve_turn(outcome["potted"], player_turn, p1_group, balls)
+        seat = player_turn - 1
+        result["shots"][seat] += 1
+        result["scores"][seat] += turn["scored"]
+        p1_group = turn["p1_group"]
+        if turn["ball_in_hand"]:
+            result["fouls"][seat] += 1
+            ball_in_hand = True
+            balls[0].alive = True
+        if turn["winner"] is not None:
+            result["winner"] = turn["winner"]
+            result["early_8ball"] = turn["early_8ball"]
+            break
+        player_turn = turn["player_turn"]
+    return result
+
+
+def _play(job):
+    seed, players, options = job
+    return play_game(seed, players, **options)
+
+
+def wilson(hits, n, z=Z):
+    #confidence interval for a rate of hits out of n
+    if n == 0:
+        return 0.0, 0.0
+    p = hits / n
+    scale = 1 + z * z / n
+    centre = (p + z * z / (2 * n)) / scale
+    half = z * math.sqrt(p * (1 - p) / n + z * z / (4 * n * n)) / scale
+    return centre - half, centre + half
+
+
+def mean_interval(values, z=Z):
+    #(mean, low, high) with the normal approximation
+    n = len(values)
+    if n == 0:
+        return 0.0, 0.0, 0.0
+    mean = sum(values) / n
+    if n == 1:
+        return mean, mean, mean
+    sd = math.sqrt(sum((v - mean) ** 2 for v in values) / (n - 1))
+    half = z * sd / math.sqrt(n)
+    return mean, mean - half, mean + half
+
+
+def run_tournament(games, players=("easy", "hard"), workers=None, seed=0, **options):
+    """
+    Play games seeded seed, seed + 1, ... between the two players, taking
+    turns at breaking (players[0] is player 1 in even games, player 2 in
+    odd ones), on workers processes (None = every core, 0 = this process).
+    options go to play_game(). Returns the summary from summarize().
+    """
+    jobs = [(seed + k, tuple(players) if k % 2 == 0 else tuple(players[::-1]), options)
+            for k in range(games)]
+    workers = os.cpu_count() if workers is None else workers
+    start = time.perf_counter()
+    if workers:
+        with ProcessPoolExecutor(workers) as executor:
+            results = list(executor.map(_play, jobs, chunksize=max(1, games // (workers * 8))))
+    else:
+        results = [_play(job) for job in jobs]
+    summary = summarize(results)
+    summary["seconds"] = time.perf_counter() - start
+    return summary
+
+
+def summarize(results):
+    """
+    Win rate, foul rate (per shot) and early 8-ball losses for each of the
+    two entrants (entrant 0 is whoever was player 1 in the first game, in
+    odd games the seats are swapped), plus shots per game.
+    """
+    entrants = [{"name": name, "wins": 0, "shots": 0, "fouls": 0, "early_8ball": 0}
+                for name in results[0]["players"]] if results else []
+    unfinished = 0
+    for k, game in enumerate(results):
+        order = (0, 1) if k % 2 == 0 else (1, 0)  # entrant in seat 1, seat 2
+        for seat, entrant in enumerate(order):
+            entrants[entrant]["shots"] += game["shots"][seat]
+            entrants[entrant]["fouls"] += game["fouls"][seat]
+        if game["winner"] is None:
+            unfinished += 1
+            continue
+        winner = order[game["winner"] - 1]
+        entrants[winner]["wins"] += 1
+        if game["early_8ball"]:
+            entrants[1 - winner]["early_8ball"] += 1
+
+    n = len(results)
+    for entrant in entrants:
+        entrant["win_rate"] = entrant["wins"] / n if n else 0.0
+        entrant["win_interval"] = wilson(entrant["wins"], n)
+        entrant["foul_rate"] = entrant["fouls"] / entrant["shots"] if entrant["shots"] else 0.0
+        entrant["foul_interval"] = wilson(entrant["fouls"], entrant["shots"])
+    return {
+        "games": n,
+        "unfinished": unfinished,
+        "entrants": entrants,
+        "shots_per_game": mean_interval([sum(game["shots"]) for game in results]),
+    }
+
+
+def report(summary):
+    lines = [f"{summary['games']} games in {summary['seconds']:.1f}s "
+             f"({summary['games'] / max(summary['seconds'], 1e-9):.2f} games/s), "
+             f"{summary['unfinished']} unfinished"]
+    for k, entrant in enumerate(summary["entrants"]):
+        low, high = entrant["win_interval"]
+        foul_low, foul_high = entrant["foul_interval"]
+        lines.append(f"  {k}: {entrant['name']:<5} wins {entrant['win_rate']:6.1%} [{low:.1%}, {high:.1%}]"
+                     f"  fouls/shot {entrant['foul_rate']:6.1%} [{foul_low:.1%}, {foul_high:.1%}]"
+                     f"  early 8-ball losses {entrant['early_8ball']}")
+    mean, low, high = summary["shots_per_game"]
+    lines.append(f"  shots per game {mean:.1f} [{low:.1f}, {high:.1f}]")
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Play the computer players against each other.")
+    parser.add_argument("--games", type=int, default=200)
+    parser.add_argument("--players", nargs=2, default=["easy", "hard"], choices=["easy", "hard"])
+    parser.add_argument("--workers", type=int, default=None, help="processes (default every core, 0 = none)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--search-shots", type=int, default=SEARCH_SHOTS,
+                        help="candidates the hard AI scores per turn (0 = all of them)")
+    parser.add_argument("--depth", type=int, default=1, help="hard AI lookahead, see ai_search")
+    parser.add_argument("--max-shots", type=int, default=MAX_SHOTS)
+    parser.add_argument("--no-book", action="store_true", help="search the break instead of using break_book.bin")
+    args = parser.parse_args()
+    print(report(run_tournament(args.games, args.players, args.workers, args.seed,
+                                search_shots=args.search_shots or None, depth=args.depth,
+                                max_shots=args.max_shots, book=not args.no_book)))